@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from app import db
+from app.diagnostics import instrumented
+
+
+@dataclass
+class LinkFocus:
+    linked_type: str
+    linked_id: str | None
+    sessions: int
+    focus_seconds: int
+
+
+@dataclass
+class PomodoroSummary:
+    today_seconds: int
+    week_seconds: int
+    total_seconds: int
+    total_sessions: int
+    current_streak: int
+    longest_streak: int
+    cycles_completed: int
+    cycles_started: int
+    top_links: list[LinkFocus] = field(default_factory=list)
+
+    @property
+    def cycle_completion_rate(self) -> float:
+        if not self.cycles_started:
+            return 0.0
+        return self.cycles_completed / self.cycles_started
+
+
+def iso_week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _daily_rows(start_date: str | None, end_date: str | None) -> list:
+    query = "SELECT day, SUM(sessions) AS sessions, SUM(focus_seconds) AS focus_seconds FROM pomodoro_daily"
+    params: list[str] = []
+    if start_date and end_date:
+        query += " WHERE day BETWEEN ? AND ?"
+        params.extend([start_date, end_date])
+    query += " GROUP BY day ORDER BY day"
+    return db.get_manager().read().execute(query, params).fetchall()
+
+
+def focus_by_day(start_date: str | None = None, end_date: str | None = None) -> dict[str, int]:
+    return {row["day"]: row["focus_seconds"] for row in _daily_rows(start_date, end_date)}
+
+
+def focus_by_week(start_date: str | None = None, end_date: str | None = None) -> dict[str, int]:
+    weeks: dict[str, int] = {}
+    for day, seconds in focus_by_day(start_date, end_date).items():
+        key = iso_week_key(date.fromisoformat(day))
+        weeks[key] = weeks.get(key, 0) + seconds
+    return weeks
+
+
+def focus_by_link(
+    start_date: str | None = None, end_date: str | None = None, limit: int | None = None
+) -> list[LinkFocus]:
+    query = """
+        SELECT linked_type, linked_id, SUM(sessions) AS sessions, SUM(focus_seconds) AS focus_seconds
+        FROM pomodoro_daily
+    """
+    params: list[object] = []
+    if start_date and end_date:
+        query += " WHERE day BETWEEN ? AND ?"
+        params.extend([start_date, end_date])
+    query += " GROUP BY linked_type, linked_id ORDER BY focus_seconds DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    rows = db.get_manager().read().execute(query, params).fetchall()
+    return [
+        LinkFocus(row["linked_type"], row["linked_id"] or None, row["sessions"], row["focus_seconds"])
+        for row in rows
+    ]
+
+
+def streaks(active_days: list[str], today: date) -> tuple[int, int]:
+    longest = 0
+    run = 0
+    previous: date | None = None
+    for day in map(date.fromisoformat, active_days):
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    # A streak is still alive if the last active day is today or yesterday.
+    current = run if previous is not None and (today - previous).days <= 1 else 0
+    return current, longest
+
+
+def cycle_counts(sessions_per_day: list[int], cycles_before_long_break: int) -> tuple[int, int]:
+    size = max(cycles_before_long_break, 1)
+    completed = sum(count // size for count in sessions_per_day)
+    started = sum(-(-count // size) for count in sessions_per_day)
+    return completed, started
+
+
+@instrumented
+def summary(cycles_before_long_break: int, today: date | None = None) -> PomodoroSummary:
+    """Focus totals and streaks; pomodoro_daily buckets sessions by local day, like ``today``."""
+    today = today or date.today()
+    rows = _daily_rows(None, None)
+    week_start = today - timedelta(days=today.weekday())
+    today_iso = today.isoformat()
+    week_start_iso = week_start.isoformat()
+    current, longest = streaks([row["day"] for row in rows], today)
+    completed, started = cycle_counts([row["sessions"] for row in rows], cycles_before_long_break)
+    return PomodoroSummary(
+        today_seconds=sum(row["focus_seconds"] for row in rows if row["day"] == today_iso),
+        week_seconds=sum(row["focus_seconds"] for row in rows if week_start_iso <= row["day"] <= today_iso),
+        total_seconds=sum(row["focus_seconds"] for row in rows),
+        total_sessions=sum(row["sessions"] for row in rows),
+        current_streak=current,
+        longest_streak=longest,
+        cycles_completed=completed,
+        cycles_started=started,
+        top_links=focus_by_link(limit=3),
+    )
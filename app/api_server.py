@@ -0,0 +1,361 @@
+"""Local JSON API over planner.db for the PWA and scripts.
+
+    python -m app.api_server --port 8765
+
+    GET /notes?from=2024-01-01&to=2024-01-31
+    GET /weeks/2024-W05
+    GET /tasks?from=2024-01-01&to=2024-01-31    (add &overdue=1 for everything open before "to")
+    GET /search?q=отчёт&limit=50&offset=0
+    GET /sessions?limit=50
+    GET /changes?since=<version>&timeout=25     (long poll)
+
+Only requests addressed to localhost/127.0.0.1 on the server's port are
+answered (no DNS rebinding), and cross-origin reads are allowed only for the
+PWA's origin plus those given by --allow-origin or the ``api`` setting
+(``{"allowed_origins": [...]}``).
+
+Data responses carry a weak ETag built from the change_log version of the
+rows they cover, so a conditional request for an unchanged range is answered
+with 304 after one indexed lookup. Every SQLite call runs on the db
+executor's reader threads; the event loop only parses HTTP and waits.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Iterable
+from urllib.parse import parse_qs, urlsplit
+
+from app import db
+from app.change_watch import ChangeWatcher
+from app.db_executor import get_executor
+from app.diagnostics import diagnostics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Where start_web_planner.bat serves the PWA.
+PWA_ORIGINS = ("http://127.0.0.1:8765", "http://localhost:8765")
+LONG_POLL_SECONDS = 25.0
+MAX_LONG_POLL_SECONDS = 60.0
+MAX_HEADER_BYTES = 64 * 1024
+MAX_PAGE = 1000
+
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class BadRequest(Exception):
+    pass
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: Any = None
+    etag: str | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+async def _read(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.wrap_future(get_executor().submit_read(fn, *args))
+
+
+def _param(params: dict[str, list[str]], name: str, default: str | None = None) -> str:
+    values = params.get(name)
+    if values:
+        return values[0]
+    if default is None:
+        raise BadRequest(f"missing parameter {name!r}")
+    return default
+
+
+def _date_param(params: dict[str, list[str]], name: str, default: str | None = None) -> str:
+    value = _param(params, name, default)
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise BadRequest(f"{name} must be YYYY-MM-DD") from None
+
+
+def _int_param(params: dict[str, list[str]], name: str, default: int, maximum: int) -> int:
+    try:
+        value = int(_param(params, name, str(default)))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+    return max(0, min(value, maximum))
+
+
+def week_range(week_key: str) -> tuple[str, str]:
+    year, _, week = week_key.partition("-W")
+    try:
+        monday = date.fromisocalendar(int(year), int(week), 1)
+    except ValueError:
+        raise BadRequest("week must look like 2024-W05") from None
+    return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ChangeFeed:
+    """Wakes long-poll requests when planner.db changes.
+
+    A ChangeWatcher notices commits from any connection or process (the
+    desktop app, the CLI) through PRAGMA data_version; waiters block on an
+    asyncio.Event, not on a thread.
+    """
+
+    def __init__(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._watcher = ChangeWatcher(self._changed_in_thread)
+        self._watcher.start()
+        self._version = self._watcher.version
+
+    def close(self) -> None:
+        self._watcher.stop()
+
+    def _changed_in_thread(self, changes: list[db.Change]) -> None:
+        self._loop.call_soon_threadsafe(self._changed, changes[-1].version)
+
+    def _changed(self, version: int) -> None:
+        self._version = version
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, since: int, timeout: float) -> dict:
+        changes = await _read(db.changes_since, since)
+        if not changes:
+            try:
+                await asyncio.wait_for(self._wait_for_version_above(since), timeout)
+                changes = await _read(db.changes_since, since)
+            except asyncio.TimeoutError:
+                pass
+        version = changes[-1].version if changes else max(since, self._version)
+        return {"version": version, "changes": [asdict(change) for change in changes]}
+
+    async def _wait_for_version_above(self, since: int) -> None:
+        while self._version <= since:
+            await self._event.wait()
+
+
+class ApiServer:
+    def __init__(
+        self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, allowed_origins: Iterable[str] = PWA_ORIGINS
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._allowed_origins = {origin.rstrip("/").lower() for origin in allowed_origins}
+        self._allowed_hosts = {f"{name}:{port}" for name in ("127.0.0.1", "localhost", host.lower())}
+        self._feed: ChangeFeed | None = None
+        self._routes: dict[str, Callable[[dict[str, list[str]], dict[str, str]], Awaitable[Response]]] = {
+            "/notes": self._notes,
+            "/tasks": self._tasks,
+            "/search": self._search,
+            "/sessions": self._sessions,
+            "/changes": self._changes,
+        }
+
+    async def serve(self) -> None:
+        self._feed = ChangeFeed()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        logger.info("API listening on http://%s:%s", self.host, self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._feed.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._send(writer, Response(400, {"error": "malformed request line"}), keep_alive=False)
+                    return
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._send(writer, await self._dispatch(method, target, headers), keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, headers: dict[str, str]) -> Response:
+        # The API hands out every note: a page on another site must not read
+        # it, whether through CORS or through a DNS name rebound to 127.0.0.1.
+        if headers.get("host", "").lower() not in self._allowed_hosts:
+            return Response(403, {"error": "unknown host"})
+        origin = headers.get("origin")
+        if origin is not None and origin.lower() not in self._allowed_origins:
+            return Response(403, {"error": "origin not allowed"})
+        response = await self._route(method, target, headers)
+        if origin is not None:
+            # Lets the PWA revalidate with If-None-Match.
+            response.headers.update(
+                {
+                    "Access-Control-Allow-Origin": origin,
+                    "Access-Control-Allow-Headers": "If-None-Match",
+                    "Access-Control-Expose-Headers": "ETag",
+                }
+            )
+        return response
+
+    async def _route(self, method: str, target: str, headers: dict[str, str]) -> Response:
+        if method == "OPTIONS":
+            return Response(204)
+        if method != "GET":
+            return Response(405, {"error": "only GET is supported"}, headers={"Allow": "GET, OPTIONS"})
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        try:
+            if path.startswith("/weeks/"):
+                start, end = week_range(path.removeprefix("/weeks/"))
+                params, path = {"from": [start], "to": [end]}, "/notes"
+            handler = self._routes.get(path)
+            if handler is None:
+                return Response(404, {"error": f"unknown path {path}"})
+            return await handler(params, headers)
+        except BadRequest as error:
+            return Response(400, {"error": str(error)})
+        except Exception:
+            logger.exception("API request failed: %s %s", method, target)
+            return Response(500, {"error": "internal error"})
+
+    async def _conditional(
+        self,
+        headers: dict[str, str],
+        etag: str,
+        load: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        # The ETag is checked before the data is read: an unchanged range
+        # costs one change_log lookup.
+        if etag_matches(headers.get("if-none-match", ""), etag):
+            return Response(304, etag=etag)
+        return Response(200, await load(), etag=etag)
+
+    async def _notes(self, params: dict[str, list[str]], headers: dict[str, str]) -> Response:
+        start, end = _date_param(params, "from"), _date_param(params, "to")
+        version = await _read(db.keys_version, "note_entries", start, end)
+
+        async def load() -> list[dict]:
+            return [asdict(note) for note in await _read(db.list_notes, start, end)]
+
+        return await self._conditional(headers, f'W/"notes-{version}"', load)
+
+    async def _tasks(self, params: dict[str, list[str]], headers: dict[str, str]) -> Response:
+        today = date.today().isoformat()
+        end = _date_param(params, "to", today)
+        if _param(params, "overdue", "0") not in ("0", ""):
+            version = await _read(db.keys_version, "task_items", "", end)
+            tasks_call: tuple = (db.list_overdue_tasks, end)
+        else:
+            start = _date_param(params, "from", today)
+            version = await _read(db.keys_version, "task_items", start, end)
+            tasks_call = (db.list_open_tasks, start, end)
+
+        async def load() -> list[dict]:
+            return [asdict(task) for task in await _read(*tasks_call)]
+
+        return await self._conditional(headers, f'W/"tasks-{version}"', load)
+
+    async def _search(self, params: dict[str, list[str]], headers: dict[str, str]) -> Response:
+        query = _param(params, "q")
+        limit = _int_param(params, "limit", db.SEARCH_PAGE_SIZE, MAX_PAGE)
+        offset = _int_param(params, "offset", 0, 1_000_000)
+        version = await _read(db.table_version, "note_entries")
+
+        async def load() -> list[dict]:
+            return [asdict(hit) for hit in await _read(db.search_notes_page, query, limit, offset)]
+
+        return await self._conditional(headers, f'W/"search-{version}"', load)
+
+    async def _sessions(self, params: dict[str, list[str]], headers: dict[str, str]) -> Response:
+        limit = _int_param(params, "limit", 50, MAX_PAGE)
+        version = await _read(db.table_version, "pomodoro_sessions")
+
+        async def load() -> list[dict]:
+            return [dict(row) for row in await _read(db.list_pomodoro_sessions, limit)]
+
+        return await self._conditional(headers, f'W/"sessions-{version}"', load)
+
+    async def _changes(self, params: dict[str, list[str]], headers: dict[str, str]) -> Response:
+        since = _int_param(params, "since", 0, 2**62)
+        try:
+            timeout = min(float(_param(params, "timeout", str(LONG_POLL_SECONDS))), MAX_LONG_POLL_SECONDS)
+        except ValueError:
+            raise BadRequest("timeout must be a number") from None
+        return Response(200, await self._feed.wait(since, max(timeout, 0.0)))
+
+    async def _send(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        payload = b"" if response.body is None else json.dumps(response.body, ensure_ascii=False).encode("utf-8")
+        headers = {
+            "Content-Length": str(len(payload)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            "Cache-Control": "no-cache",
+            "Vary": "Origin",
+            **response.headers,
+        }
+        if payload:
+            headers["Content-Type"] = "application/json; charset=utf-8"
+        if response.etag is not None:
+            headers["ETag"] = response.etag
+        head = f"HTTP/1.1 {response.status} {REASONS[response.status]}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.api_server", description="Локальный HTTP API планировщика")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--allow-origin",
+        action="append",
+        default=[],
+        help="ещё один origin, которому можно читать API из браузера (кроме PWA)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    diagnostics.load_config({})
+    db.init_db()
+    diagnostics.load_config(db.get_setting("diagnostics", {}))
+    origins = [*PWA_ORIGINS, *db.get_setting("api", {}).get("allowed_origins", []), *args.allow_origin]
+    try:
+        asyncio.run(ApiServer(args.host, args.port, origins).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+ARCHIVE_DIRNAME = "Archive"
+ARCHIVE_NAME_RE = re.compile(r"^planner_(\d{4})\.db$")
+# SQLite allows 10 attached databases per connection by default.
+MAX_ATTACHED = 8
+
+_years_cache: dict[Path, tuple[int, list[int]]] = {}
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.note_entries (
+        date TEXT PRIMARY KEY,
+        content TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.task_items (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        text TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'undone',
+        position INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.pomodoro_sessions (
+        id INTEGER PRIMARY KEY,
+        start_time TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        break_duration INTEGER NOT NULL,
+        linked_type TEXT NOT NULL,
+        linked_id TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_task_items_date ON task_items(date, position)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_pomodoro_start_time ON pomodoro_sessions(start_time)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.note_fts
+    USING fts5(date, content, content='note_entries', content_rowid='rowid')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {schema}.note_entries_ai
+    AFTER INSERT ON note_entries BEGIN
+        INSERT INTO note_fts(rowid, date, content) VALUES (new.rowid, new.date, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {schema}.note_entries_ad
+    AFTER DELETE ON note_entries BEGIN
+        INSERT INTO note_fts(note_fts, rowid, date, content) VALUES ('delete', old.rowid, old.date, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {schema}.note_entries_au
+    AFTER UPDATE ON note_entries BEGIN
+        INSERT INTO note_fts(note_fts, rowid, date, content) VALUES ('delete', old.rowid, old.date, old.content);
+        INSERT INTO note_fts(rowid, date, content) VALUES (new.rowid, new.date, new.content);
+    END
+    """,
+]
+
+
+@dataclass
+class ArchiveConfig:
+    keep_years: int = 0
+
+    @classmethod
+    def from_setting(cls, data: dict) -> ArchiveConfig:
+        return cls(keep_years=max(0, int(data.get("keep_years", cls.keep_years))))
+
+    def to_setting(self) -> dict:
+        return {"keep_years": self.keep_years}
+
+    def cutoff(self, today: date | None = None) -> str | None:
+        """First date that stays in planner.db; None while archiving is off."""
+        if self.keep_years <= 0:
+            return None
+        today = today or date.today()
+        return date(today.year - self.keep_years + 1, 1, 1).isoformat()
+
+
+def archive_dir(data_dir: Path) -> Path:
+    return data_dir / ARCHIVE_DIRNAME
+
+
+def archive_path(data_dir: Path, year: int) -> Path:
+    return archive_dir(data_dir) / f"planner_{year}.db"
+
+
+def schema_name(year: int) -> str:
+    return f"archive_{year}"
+
+
+def archive_years(data_dir: Path) -> list[int]:
+    """Years that have an archive file, oldest first.
+
+    Asked on every read that might need an archive, so the listing is cached
+    until the directory's mtime changes (a file was added or removed).
+    """
+    directory = archive_dir(data_dir)
+    try:
+        mtime = directory.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _years_cache.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return list(cached[1])
+    years = []
+    for path in directory.iterdir():
+        match = ARCHIVE_NAME_RE.match(path.name)
+        if match:
+            years.append(int(match.group(1)))
+    years.sort()
+    _years_cache[directory] = (mtime, years)
+    return list(years)
+
+
+def years_between(years: list[int], start_date: str | None, end_date: str | None) -> list[int]:
+    first = int(start_date[:4]) if start_date else None
+    last = int(end_date[:4]) if end_date else None
+    return [year for year in years if (first is None or year >= first) and (last is None or year <= last)]
+
+
+def create_schema(conn: sqlite3.Connection, schema: str) -> None:
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement.format(schema=schema))
+
+
+def attached_schemas(conn: sqlite3.Connection) -> list[str]:
+    return [row[1] for row in conn.execute("PRAGMA database_list") if row[1] not in ("main", "temp")]
+
+
+def attach(conn: sqlite3.Connection, data_dir: Path, year: int) -> str | None:
+    """Attach the archive for ``year`` to ``conn`` (once) and return its schema name.
+
+    Returns None when the archive cannot be attached right now: ATTACH is not
+    allowed inside a transaction, so reads issued from within a write only
+    see archives that were already attached.
+    """
+    schema = schema_name(year)
+    attached = attached_schemas(conn)
+    if schema in attached:
+        return schema
+    if conn.in_transaction:
+        return None
+    for stale in attached[: max(0, len(attached) - MAX_ATTACHED + 1)]:
+        try:
+            conn.execute(f"DETACH DATABASE {stale}")
+        except sqlite3.OperationalError:
+            # Still in use by an open cursor on this connection.
+            continue
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(archive_path(data_dir, year)),))
+    return schema
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import re
+import shutil
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app import archive, db
+from app.diagnostics import instrumented
+
+BACKUP_DIRNAME = "Backups"
+MANIFEST_FILENAME = "backups.json"
+COMPRESSION_SUFFIXES = {"xz": ".db.xz", "gz": ".db.gz", "none": ".db"}
+LZMA_PRESET = 3
+CHUNK_SIZE = 1 << 20
+# Microseconds keep a manual backup from overwriting a scheduled one taken in
+# the same second; names without them come from older versions.
+BACKUP_NAME_RE = re.compile(r"^planner_(\d{8}_\d{6})(?:_(\d{6}))?\.db(\.xz|\.gz)?$")
+
+ProgressCallback = Callable[[int, int], None]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackupConfig:
+    interval_minutes: int = 60
+    compression: str = "xz"
+    keep_hourly: int = 24
+    keep_daily: int = 7
+    keep_weekly: int = 8
+
+    @classmethod
+    def from_setting(cls, data: dict) -> BackupConfig:
+        defaults = cls()
+        compression = data.get("compression", defaults.compression)
+        return cls(
+            interval_minutes=data.get("interval_minutes", defaults.interval_minutes),
+            compression=compression if compression in COMPRESSION_SUFFIXES else defaults.compression,
+            keep_hourly=data.get("keep_hourly", defaults.keep_hourly),
+            keep_daily=data.get("keep_daily", defaults.keep_daily),
+            keep_weekly=data.get("keep_weekly", defaults.keep_weekly),
+        )
+
+    def to_setting(self) -> dict:
+        return {
+            "interval_minutes": self.interval_minutes,
+            "compression": self.compression,
+            "keep_hourly": self.keep_hourly,
+            "keep_daily": self.keep_daily,
+            "keep_weekly": self.keep_weekly,
+        }
+
+
+def get_backup_dir() -> Path:
+    backup_dir = db.get_data_dir() / BACKUP_DIRNAME
+    backup_dir.mkdir(exist_ok=True)
+    return backup_dir
+
+
+def list_backups(backup_dir: Path | None = None) -> list[tuple[datetime, Path]]:
+    backups = []
+    for path in (backup_dir or get_backup_dir()).iterdir():
+        match = BACKUP_NAME_RE.match(path.name)
+        if match:
+            moment = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+            backups.append((moment.replace(microsecond=int(match.group(2) or 0)), path))
+    return sorted(backups, reverse=True)
+
+
+def backups_to_keep(timestamps: Iterable[datetime], config: BackupConfig) -> set[datetime]:
+    """Newest backup overall plus the newest one in each of the latest N hours, days and ISO weeks."""
+    ordered = sorted(timestamps, reverse=True)
+    keep = set(ordered[:1])
+    tiers: list[tuple[int, Callable[[datetime], object]]] = [
+        (config.keep_hourly, lambda moment: (moment.date(), moment.hour)),
+        (config.keep_daily, lambda moment: moment.date()),
+        (config.keep_weekly, lambda moment: moment.isocalendar()[:2]),
+    ]
+    for limit, bucket_of in tiers:
+        seen: set[object] = set()
+        for moment in ordered:
+            bucket = bucket_of(moment)
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.add(bucket)
+            keep.add(moment)
+    return keep
+
+
+def prune_backups(config: BackupConfig, backup_dir: Path | None = None) -> list[Path]:
+    backups = list_backups(backup_dir)
+    keep = backups_to_keep((moment for moment, _ in backups), config)
+    removed = []
+    for moment, path in backups:
+        if moment not in keep:
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    return removed
+
+
+def _load_manifest(backup_dir: Path) -> dict:
+    try:
+        return json.loads((backup_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(backup_dir: Path, manifest: dict) -> None:
+    path = backup_dir / MANIFEST_FILENAME
+    partial_path = path.with_name(path.name + ".part")
+    partial_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    partial_path.replace(path)
+
+
+def _db_fingerprint() -> dict[str, list[int] | None]:
+    # The manifest lives outside the database, so recording a backup does not
+    # itself count as a change.
+    fingerprint: dict[str, list[int] | None] = {}
+    db_path = db.get_db_path()
+    for name, path in (("db", db_path), ("wal", db_path.with_name(db_path.name + "-wal"))):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            fingerprint[name] = None
+        else:
+            fingerprint[name] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprint
+
+
+def _file_fingerprint(path: Path) -> list[int]:
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def backup_archives(backup_dir: Path, manifest: dict) -> list[Path]:
+    """Copy yearly archives that changed since their last copy into Backups/Archive/.
+
+    Archives are only written when a year is archived, so a regular backup
+    copies nothing but planner.db; each archive is copied once per change and
+    a single copy is kept, since archiving never deletes from it.
+    """
+    data_dir = db.get_data_dir()
+    target_dir = archive.archive_dir(backup_dir)
+    copied_fingerprints = manifest.setdefault("archives", {})
+    copied = []
+    for year in archive.archive_years(data_dir):
+        source_path = archive.archive_path(data_dir, year)
+        target_path = archive.archive_path(backup_dir, year)
+        fingerprint = _file_fingerprint(source_path)
+        if copied_fingerprints.get(str(year)) == fingerprint and target_path.exists():
+            continue
+        target_dir.mkdir(exist_ok=True)
+        partial_path = target_path.with_name(target_path.name + ".part")
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(partial_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        partial_path.replace(target_path)
+        copied_fingerprints[str(year)] = fingerprint
+        copied.append(target_path)
+    return copied
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress(source: Path, target: Path, compression: str, progress: Callable[[int], None]) -> None:
+    partial_path = target.with_name(target.name + ".part")
+    if compression == "xz":
+        output = lzma.open(partial_path, "wb", preset=LZMA_PRESET)
+    elif compression == "gz":
+        output = gzip.open(partial_path, "wb")
+    else:
+        output = partial_path.open("wb")
+    with source.open("rb") as handle, output:
+        done = 0
+        while chunk := handle.read(CHUNK_SIZE):
+            output.write(chunk)
+            done += len(chunk)
+            progress(done)
+    partial_path.replace(target)
+
+
+@instrumented
+def create_backup(
+    config: BackupConfig | None = None,
+    progress: ProgressCallback | None = None,
+    *,
+    skip_unchanged: bool = False,
+) -> Path | None:
+    """Snapshot planner.db into Backups/, compress it and apply retention.
+
+    Yearly archives are copied separately, and only when they changed.
+
+    With ``skip_unchanged`` nothing is written when the database has not
+    changed since the last backup; ``None`` is returned in that case.
+    """
+    config = config or BackupConfig()
+    backup_dir = get_backup_dir()
+    manifest = _load_manifest(backup_dir)
+    if backup_archives(backup_dir, manifest):
+        _save_manifest(backup_dir, manifest)
+    fingerprint = _db_fingerprint()
+    last_backup = manifest.get("file")
+    has_last_backup = bool(last_backup) and (backup_dir / last_backup).exists()
+    if skip_unchanged and has_last_backup and manifest.get("fingerprint") == fingerprint:
+        return None
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    snapshot_path = backup_dir / f".planner_{timestamp}.snapshot"
+    target_path = backup_dir / f"planner_{timestamp}{COMPRESSION_SUFFIXES[config.compression]}"
+    try:
+        # Page copy and compression each account for half of the reported progress.
+        db.backup_database(snapshot_path, (lambda done, total: progress(done, total * 2)) if progress else None)
+        digest = _sha256(snapshot_path)
+        if skip_unchanged and has_last_backup and manifest.get("sha256") == digest:
+            manifest["fingerprint"] = fingerprint
+            _save_manifest(backup_dir, manifest)
+            return None
+        size = snapshot_path.stat().st_size
+        _compress(
+            snapshot_path,
+            target_path,
+            config.compression,
+            (lambda done: progress(size + done, size * 2)) if progress else (lambda done: None),
+        )
+    finally:
+        snapshot_path.unlink(missing_ok=True)
+
+    _save_manifest(
+        backup_dir, {**manifest, "file": target_path.name, "sha256": digest, "fingerprint": fingerprint}
+    )
+    removed = prune_backups(config, backup_dir)
+    if removed:
+        logger.info("Pruned %d old backups", len(removed))
+    return target_path
+
+
+def restore_backup(backup_path: Path, target_path: Path) -> None:
+    """Decompress a backup into a standalone database file."""
+    if backup_path.suffix == ".xz":
+        source = lzma.open(backup_path, "rb")
+    elif backup_path.suffix == ".gz":
+        source = gzip.open(backup_path, "rb")
+    else:
+        source = backup_path.open("rb")
+    with source, target_path.open("wb") as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
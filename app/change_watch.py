@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable
+
+from app import db
+
+POLL_SECONDS = 0.3
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeWatcher:
+    """Reports rows of planner.db changed by this or any other process.
+
+    Idle cost is one ``PRAGMA data_version`` per POLL_SECONDS on the
+    watcher's own reader connection; change_log is read only after that
+    value moves, and only for entries newer than the last version seen.
+    Callers receive each batch of db.Change once, on the watcher thread,
+    after caches holding the changed rows have been dropped.
+    """
+
+    def __init__(self, on_change: Callable[[list[db.Change]], None], interval: float = POLL_SECONDS) -> None:
+        self._on_change = on_change
+        self._interval = interval
+        self._version = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._version = db.change_version()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-change-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            conn = db.get_manager().read()
+            seen = db.data_version(conn)
+            # Catch up on commits made between start() and the first pragma.
+            self._report_changes()
+            while not self._stop.wait(self._interval):
+                current = db.data_version(conn)
+                if current != seen:
+                    seen = current
+                    self._report_changes()
+        except Exception:
+            logger.exception("Change watcher stopped")
+
+    def _report_changes(self) -> None:
+        while True:
+            changes = db.changes_since(self._version)
+            if not changes:
+                return
+            self._version = changes[-1].version
+            db.invalidate_changed(changes)
+            self._on_change(changes)
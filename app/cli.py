@@ -0,0 +1,267 @@
+"""Command-line access to planner.db without the desktop UI.
+
+    python -m app.cli append today "- [ ] позвонить"
+    python -m app.cli tasks --from 2024-01-01 --to 2024-01-31
+    python -m app.cli search отчёт
+    python -m app.cli export ~/planner.ndjson
+    python -m app.cli batch < changes.ndjson
+    python -m app.cli archive --keep-years 2
+
+Only app.db is imported up front; never import Qt from here, directly or
+through app.ui / app.pomodoro, so scripts start fast.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import asdict
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+
+from app import db
+from app.diagnostics import diagnostics
+
+DEFAULT_CYCLES_BEFORE_LONG_BREAK = 4
+
+
+class CliError(Exception):
+    pass
+
+
+def parse_day(value: str) -> str:
+    if value == "today":
+        return date.today().isoformat()
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD or 'today', got {value!r}") from None
+
+
+def _text_argument(value: str) -> str:
+    return sys.stdin.read() if value == "-" else value
+
+
+def _print_json(record: object) -> None:
+    print(json.dumps(record, ensure_ascii=False))
+
+
+def cmd_add(args: argparse.Namespace) -> None:
+    db.write_note(args.date, _text_argument(args.text))
+
+
+def cmd_append(args: argparse.Namespace) -> None:
+    db.append_to_note(args.date, _text_argument(args.text))
+
+
+def cmd_tasks(args: argparse.Namespace) -> None:
+    if args.overdue:
+        tasks = db.list_overdue_tasks(args.end)
+    else:
+        tasks = db.list_open_tasks(args.start, args.end)
+    for task in tasks:
+        if args.json:
+            _print_json(asdict(task))
+        else:
+            print(f"{task.date}  [{'x' if task.status == 'done' else ' '}] {task.text}")
+
+
+def cmd_search(args: argparse.Namespace) -> None:
+    for hit in db.search_notes_page(args.query, limit=args.limit):
+        if args.json:
+            _print_json(asdict(hit))
+        else:
+            print(f"{hit.date}  {' '.join(hit.snippet.split())}")
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    from app import exporter
+
+    target = args.target
+    if target.suffix == ".json":
+        exporter.export_database_to_json(target)
+    elif target.suffix == ".ndjson":
+        exporter.export_database_to_ndjson(target)
+    else:
+        if args.start is None or args.end is None:
+            raise CliError("Markdown export to a directory needs --from and --to")
+        result = exporter.export_range_to_markdown(
+            date.fromisoformat(args.start), date.fromisoformat(args.end), target
+        )
+        print(f"written {result.written}, unchanged {result.unchanged}", file=sys.stderr)
+
+
+def cmd_import(args: argparse.Namespace) -> None:
+    from app import exporter
+
+    if args.source == "-":
+        exporter.import_ndjson_stream(sys.stdin)
+    else:
+        exporter.import_database_from_json(Path(args.source))
+
+
+def cmd_backup(args: argparse.Namespace) -> None:
+    if args.output is not None:
+        db.backup_database(args.output)
+        print(args.output)
+        return
+    from app import backup
+
+    path = backup.create_backup(backup.BackupConfig.from_setting(db.get_setting("backup", {})))
+    print(path)
+
+
+def cmd_archive(args: argparse.Namespace) -> None:
+    from app import archive
+
+    if args.before is not None:
+        moved = db.archive_before(args.before)
+    else:
+        keep_years = args.keep_years
+        if keep_years is None:
+            keep_years = archive.ArchiveConfig.from_setting(db.get_setting("archive", {})).keep_years
+        if keep_years <= 0:
+            raise CliError("archiving is off: pass --keep-years N or --before DATE")
+        moved = db.archive_old_data(archive.ArchiveConfig(keep_years=keep_years))
+    print(f"moved {moved} rows", file=sys.stderr)
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    from app import analytics
+
+    today = date.today()
+    # PomodoroConfig lives next to the Qt timer, so read the raw setting.
+    cycles = db.get_setting("pomodoro", {}).get("cycles", DEFAULT_CYCLES_BEFORE_LONG_BREAK)
+    focus = analytics.summary(cycles, today)
+    stats = {
+        "rows": db.count_rows(),
+        "open_tasks": len(db.list_open_tasks("0000-01-01", "9999-12-31")),
+        "overdue_tasks": len(db.list_overdue_tasks(today.isoformat())),
+        "focus_today_minutes": focus.today_seconds // 60,
+        "focus_week_minutes": focus.week_seconds // 60,
+        "focus_total_minutes": focus.total_seconds // 60,
+        "sessions": focus.total_sessions,
+        "current_streak": focus.current_streak,
+    }
+    if args.json:
+        _print_json(stats)
+        return
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            value = ", ".join(f"{name} {count}" for name, count in value.items())
+        print(f"{key}: {value}")
+
+
+def apply_batch(lines: Iterable[str]) -> int:
+    """Apply NDJSON operations in one transaction; any bad line rolls back all of them.
+
+    {"op": "add", "date": "2024-05-01", "content": "..."}
+    {"op": "append", "date": "today", "text": "- [ ] ..."}
+    {"op": "setting", "key": "backup", "value": {...}}
+    """
+    applied = 0
+    with db.get_manager().write():
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                op = record["op"]
+                if op == "add":
+                    db.write_note(parse_day(record["date"]), record["content"])
+                elif op == "append":
+                    db.append_to_note(parse_day(record["date"]), record["text"])
+                elif op == "setting":
+                    db.set_setting(record["key"], record["value"])
+                else:
+                    raise CliError(f"unknown op {op!r}")
+            except (ValueError, KeyError, TypeError, argparse.ArgumentTypeError, CliError) as error:
+                raise CliError(f"line {number}: {error}") from error
+            applied += 1
+    return applied
+
+
+def cmd_batch(args: argparse.Namespace) -> None:
+    applied = apply_batch(args.input)
+    print(f"applied {applied}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Taskmenedger без графического интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_range(command: argparse.ArgumentParser, default: str | None) -> None:
+        command.add_argument("--from", dest="start", type=parse_day, default=default)
+        command.add_argument("--to", dest="end", type=parse_day, default=default)
+
+    for name, handler, help_text in (
+        ("add", cmd_add, "заменить заметку дня"),
+        ("append", cmd_append, "дописать строку в заметку дня"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("date", type=parse_day)
+        command.add_argument("text", help="текст или '-' для чтения из stdin")
+        command.set_defaults(handler=handler)
+
+    command = commands.add_parser("tasks", help="незавершённые задачи за период")
+    add_range(command, date.today().isoformat())
+    command.add_argument("--overdue", action="store_true", help="все незавершённые задачи до --to")
+    command.add_argument("--json", action="store_true")
+    command.set_defaults(handler=cmd_tasks)
+
+    command = commands.add_parser("search", help="полнотекстовый поиск по заметкам")
+    command.add_argument("query")
+    command.add_argument("--limit", type=int, default=db.SEARCH_PAGE_SIZE)
+    command.add_argument("--json", action="store_true")
+    command.set_defaults(handler=cmd_search)
+
+    command = commands.add_parser("export", help="экспорт в .json, .ndjson или Markdown-каталог")
+    command.add_argument("target", type=Path)
+    add_range(command, None)
+    command.set_defaults(handler=cmd_export)
+
+    command = commands.add_parser("import", help="импорт .json/.ndjson или NDJSON из stdin ('-')")
+    command.add_argument("source")
+    command.set_defaults(handler=cmd_import)
+
+    command = commands.add_parser("backup", help="резервная копия в Backups/ или в --output")
+    command.add_argument("--output", type=Path)
+    command.set_defaults(handler=cmd_backup)
+
+    command = commands.add_parser("archive", help="перенести старые годы в Archive/planner_<год>.db")
+    command.add_argument("--keep-years", type=int, help="сколько последних лет оставить в planner.db")
+    command.add_argument("--before", type=parse_day, help="архивировать всё раньше этой даты")
+    command.set_defaults(handler=cmd_archive)
+
+    command = commands.add_parser("stats", help="сводка по базе и помодоро")
+    command.add_argument("--json", action="store_true")
+    command.set_defaults(handler=cmd_stats)
+
+    command = commands.add_parser("batch", help="применить NDJSON-операции из stdin одной транзакцией")
+    command.add_argument("input", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default=sys.stdin)
+    command.set_defaults(handler=cmd_batch)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s %(message)s")
+    diagnostics.load_config({})
+    db.init_db()
+    diagnostics.load_config(db.get_setting("diagnostics", {}))
+    try:
+        args.handler(args)
+    except CliError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        return 0
+    finally:
+        diagnostics.dump_to_log()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
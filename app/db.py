@@ -1,21 +1,68 @@
+import atexit
+import copy
+import heapq
+import itertools
 import json
 import logging
 import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date as date_cls, datetime, timedelta
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from app import archive, revisions
+from app.db_executor import get_executor, shutdown_executor
+from app.diagnostics import diagnostics, instrumented
+from app.notes import parse_tasks
+from app.revisions import NoteRevision
 
 APP_NAME = "Taskmenedger"
 DB_FILENAME = "planner.db"
-CURRENT_SCHEMA_VERSION = 1
+CURRENT_SCHEMA_VERSION = 8
+STATEMENT_CACHE_SIZE = 256
+NOTE_CACHE_SIZE = 256
+NOTE_PREVIEW_LENGTH = 120
+SEARCH_PAGE_SIZE = 50
+SNIPPET_TOKENS = 16
+ITER_BATCH_SIZE = 500
+CHANGES_PAGE_SIZE = 1000
+ARCHIVED_TABLES = ("note_entries", "task_items", "pomodoro_sessions")
+# Table -> SQL expression (over the trigger row alias) naming the changed key.
+CHANGE_TRACKED_TABLES = {
+    "note_entries": "{row}.date",
+    "task_items": "{row}.date",
+    "pomodoro_sessions": "substr({row}.start_time, 1, 10)",
+    "settings": "{row}.key",
+}
+# start_time is stored in UTC; focus statistics count sessions on the local day.
+SESSION_DAY_SQL = "date({row}.start_time, 'localtime')"
+BACKUP_PAGES = 256
+BACKUP_RESTARTS = 3
+BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 5
+WRITE_RETRY_BASE_SECONDS = 0.05
+# Idle checkpoints normally keep the WAL far smaller; these are backstops
+# for processes that never go idle.
+WAL_AUTOCHECKPOINT_PAGES = 4000
+JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+CHECKPOINT_IDLE_SECONDS = 10.0
 
 logger = logging.getLogger(__name__)
 
 
 def get_data_dir() -> Path:
     portable_flag = Path(__file__).resolve().parent.parent / "portable.flag"
-    if os.getenv("TASKMENEDGER_PORTABLE") == "1" or portable_flag.exists():
+    if os.getenv("TASKMENEDGER_DATA_DIR"):
+        data_dir = Path(os.environ["TASKMENEDGER_DATA_DIR"])
+    elif os.getenv("TASKMENEDGER_PORTABLE") == "1" or portable_flag.exists():
         data_dir = Path(__file__).resolve().parent.parent / "data"
     else:
         appdata = os.getenv("APPDATA") or str(Path.home() / "AppData" / "Roaming")
@@ -28,18 +75,264 @@ def get_db_path() -> Path:
     return get_data_dir() / DB_FILENAME
 
 
-def connect_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
+def configure_connection(conn: sqlite3.Connection) -> None:
+    # busy_timeout makes SQLite wait for a competing writer instead of failing
+    # at once with "database is locked"; NORMAL is durable enough under WAL
+    # (a power cut can lose the last commits, never corrupt the file).
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+    conn.execute(f"PRAGMA journal_size_limit = {JOURNAL_SIZE_LIMIT}")
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is None:
+        return "locked" in str(error) or "busy" in str(error)
+    return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+def _retry_busy(operation: Callable[[], object], what: str) -> None:
+    """Run ``operation``, retrying with jittered exponential backoff while the database is busy."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            operation()
+            return
+        except sqlite3.OperationalError as error:
+            if not _is_busy(error) or attempt == WRITE_RETRIES:
+                raise
+            delay = WRITE_RETRY_BASE_SECONDS * 2**attempt * random.uniform(0.5, 1.5)
+            diagnostics.count("write_retries")
+            logger.warning("%s: database busy, retrying in %.0f ms", what, delay * 1000)
+            time.sleep(delay)
+
+
+class ConnectionManager:
+    """Owns one writer connection and per-thread reader connections for planner.db.
+
+    Connections stay open for the process lifetime, so pragmas are applied once
+    and sqlite3's per-connection statement cache keeps prepared statements hot.
+    The database runs in WAL mode: readers never block the writer, and the
+    writer checkpoints the WAL when the app reports an idle moment.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._write_lock = threading.RLock()
+        self._write_owner: int | None = None
+        self._write_depth = 0
+        self._writer: sqlite3.Connection | None = None
+        self._after_commit: list[Callable[[], None]] = []
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        self._wal_enabled = False
+        self._last_commit = time.monotonic()
+        self._commits_since_checkpoint = 0
+
+    def _open(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection manager is closed")
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        if not self._wal_enabled:
+            self._enable_wal(conn)
+        diagnostics.count("connections_opened")
+        return conn
+
+    def _enable_wal(self, conn: sqlite3.Connection) -> None:
+        # journal_mode is stored in the file, so this converts an existing
+        # database once; later calls are no-ops.
+        try:
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        except sqlite3.OperationalError as error:
+            logger.warning("Could not switch planner.db to WAL: %s", error)
+            return
+        if mode.lower() != "wal":
+            logger.warning("planner.db stays in %s journal mode", mode)
+        self._wal_enabled = True
+
+    @contextmanager
+    def write(self, attach_years: Iterable[int] = ()) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction; ``attach_years`` archives are attached first.
+
+        ATTACH is impossible inside a transaction, so archives a nested write
+        asks for are only visible if the outermost write attached them.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            if self._write_depth == 0:
+                for year in attach_years:
+                    archive.attach(conn, self.db_path.parent, year)
+                _retry_busy(lambda: conn.execute("BEGIN IMMEDIATE"), "begin write")
+                self._write_owner = threading.get_ident()
+                changes_before = conn.total_changes
+            self._write_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._write_owner = None
+                    self._after_commit.clear()
+                    conn.rollback()
+                    diagnostics.count("rollbacks")
+                raise
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._write_owner = None
+                try:
+                    # A busy COMMIT leaves the transaction open, so it can be retried.
+                    _retry_busy(conn.commit, "commit")
+                except BaseException:
+                    self._after_commit.clear()
+                    conn.rollback()
+                    diagnostics.count("rollbacks")
+                    raise
+                self._last_commit = time.monotonic()
+                self._commits_since_checkpoint += 1
+                diagnostics.count("transactions")
+                diagnostics.count("rows_written", conn.total_changes - changes_before)
+                callbacks, self._after_commit = self._after_commit, []
+                for callback in callbacks:
+                    callback()
+
+    @property
+    def in_write(self) -> bool:
+        return self._write_owner == threading.get_ident()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        if self.in_write:
+            self._after_commit.append(callback)
+        else:
+            callback()
+
+    def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int]:
+        """Run a WAL checkpoint on the writer connection, outside any transaction.
+
+        Returns SQLite's (busy, WAL frames, frames checkpointed).
+        """
+        with self._write_lock:
+            if self._write_depth:
+                return 1, -1, -1
+            if self._writer is None:
+                self._writer = self._open()
+            busy, frames, checkpointed = self._writer.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            self._commits_since_checkpoint = 0
+            diagnostics.count("checkpoints")
+            return busy, frames, checkpointed
+
+    def vacuum(self) -> None:
+        """Rebuild planner.db so space freed by deleted rows goes back to the OS."""
+        with self._write_lock:
+            if self._write_depth:
+                raise sqlite3.OperationalError("cannot VACUUM inside a write")
+            if self._writer is None:
+                self._writer = self._open()
+            _retry_busy(lambda: self._writer.execute("VACUUM main"), "vacuum")
 
+    def idle_for(self) -> float:
+        return time.monotonic() - self._last_commit
 
+    @property
+    def has_uncheckpointed_commits(self) -> bool:
+        return self._commits_since_checkpoint > 0
+
+    def read(self) -> sqlite3.Connection:
+        # Reads issued inside a write transaction must see its uncommitted rows.
+        if self.in_write:
+            return self._writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            with self._readers_lock:
+                for conn in self._readers:
+                    conn.close()
+                self._readers.clear()
+            self._local = threading.local()
+
+
+_manager: ConnectionManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> ConnectionManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager(get_db_path())
+    return _manager
+
+
+def close_db() -> None:
+    global _manager
+    shutdown_executor()
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+    note_cache.invalidate()
+    settings_store.invalidate()
+
+
+atexit.register(close_db)
+
+
+@instrumented
 def init_db() -> None:
-    with connect_db() as conn:
-        conn.execute("PRAGMA foreign_keys = ON")
+    # The common case is an up-to-date database: answer it with a plain read
+    # instead of taking the write lock.
+    if _schema_version(get_manager().read()) >= CURRENT_SCHEMA_VERSION:
+        return
+    with get_manager().write() as conn:
         _ensure_schema(conn)
 
 
+@instrumented
+def checkpoint_if_idle(idle_seconds: float = CHECKPOINT_IDLE_SECONDS) -> bool:
+    """Copy the WAL back into planner.db once writes have paused.
+
+    PASSIVE never waits for readers or blocks the next writer; frames still
+    needed by an open read snapshot are copied by a later call.
+    """
+    manager = get_manager()
+    if not manager.has_uncheckpointed_commits or manager.idle_for() < idle_seconds:
+        return False
+    busy, frames, checkpointed = manager.checkpoint("PASSIVE")
+    logger.debug("Checkpoint: busy=%s, %s of %s WAL frames", busy, checkpointed, frames)
+    return True
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    try:
+        row = conn.execute("SELECT version FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row["version"] if row else 0
+
+
 def _ensure_schema(conn: sqlite3.Connection) -> None:
     conn.execute(
         "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
@@ -47,7 +340,6 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
     row = conn.execute("SELECT version FROM schema_version").fetchone()
     if row is None:
         conn.execute("INSERT INTO schema_version (version) VALUES (?)", (0,))
-        conn.commit()
     version = conn.execute("SELECT version FROM schema_version").fetchone()["version"]
     if version < CURRENT_SCHEMA_VERSION:
         _migrate(conn, version, CURRENT_SCHEMA_VERSION)
@@ -137,7 +429,242 @@ def _migrate(conn: sqlite3.Connection, from_version: int, to_version: int) -> No
             """
         )
         conn.execute("UPDATE schema_version SET version = 1")
-    conn.commit()
+    if from_version < 2 <= to_version:
+        conn.execute("ALTER TABLE task_items ADD COLUMN position INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            """
+            UPDATE task_items SET position = (
+                SELECT COUNT(*) FROM task_items AS earlier
+                WHERE earlier.date = task_items.date AND earlier.id < task_items.id
+            )
+            """
+        )
+        conn.execute("UPDATE schema_version SET version = 2")
+    if from_version < 3 <= to_version:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pomodoro_daily (
+                day TEXT NOT NULL,
+                linked_type TEXT NOT NULL,
+                linked_id TEXT NOT NULL DEFAULT '',
+                sessions INTEGER NOT NULL,
+                focus_seconds INTEGER NOT NULL,
+                PRIMARY KEY (day, linked_type, linked_id)
+            )
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO pomodoro_daily(day, linked_type, linked_id, sessions, focus_seconds)
+            SELECT substr(start_time, 1, 10), linked_type, coalesce(linked_id, ''), COUNT(*), SUM(duration)
+            FROM pomodoro_sessions
+            GROUP BY 1, 2, 3
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS pomodoro_sessions_ai
+            AFTER INSERT ON pomodoro_sessions BEGIN
+                INSERT INTO pomodoro_daily(day, linked_type, linked_id, sessions, focus_seconds)
+                VALUES (substr(new.start_time, 1, 10), new.linked_type, coalesce(new.linked_id, ''), 1, new.duration)
+                ON CONFLICT(day, linked_type, linked_id) DO UPDATE SET
+                    sessions = sessions + 1,
+                    focus_seconds = focus_seconds + excluded.focus_seconds;
+            END;
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS pomodoro_sessions_ad
+            AFTER DELETE ON pomodoro_sessions BEGIN
+                UPDATE pomodoro_daily
+                SET sessions = sessions - 1, focus_seconds = focus_seconds - old.duration
+                WHERE day = substr(old.start_time, 1, 10)
+                    AND linked_type = old.linked_type
+                    AND linked_id = coalesce(old.linked_id, '');
+                DELETE FROM pomodoro_daily
+                WHERE day = substr(old.start_time, 1, 10)
+                    AND linked_type = old.linked_type
+                    AND linked_id = coalesce(old.linked_id, '')
+                    AND sessions <= 0;
+            END;
+            """
+        )
+        conn.execute("UPDATE schema_version SET version = 3")
+    if from_version < 4 <= to_version:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vault_files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vault_tasks (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                assignee TEXT NOT NULL DEFAULT '',
+                done INTEGER NOT NULL DEFAULT 0,
+                due_date TEXT NOT NULL DEFAULT '',
+                week_key TEXT NOT NULL DEFAULT '',
+                someday INTEGER NOT NULL DEFAULT 0,
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vault_people (
+                name TEXT PRIMARY KEY,
+                role TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_tasks_source ON vault_tasks(source)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_tasks_due_date ON vault_tasks(due_date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_tasks_assignee ON vault_tasks(assignee)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_people_source ON vault_people(source)")
+        conn.execute("UPDATE schema_version SET version = 4")
+    if from_version < 5 <= to_version:
+        # Rowid is the implicit last column, so (status, date, position) also
+        # yields the ORDER BY date, position, id of the open-task queries.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_items_status_date ON task_items(status, date, position)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_task_items_date_status ON task_items(date, status)")
+        conn.execute("DROP INDEX IF EXISTS idx_task_items_date")
+        conn.execute("UPDATE schema_version SET version = 5")
+    if from_version < 6 <= to_version:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS note_revisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_note_revisions_date ON note_revisions(date, id)")
+        conn.execute("UPDATE schema_version SET version = 6")
+    if from_version < 7 <= to_version:
+        # change_log keeps one row per (table, key) holding the counter value
+        # of its latest change, so it stays as small as the set of dates.
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS change_counter (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("INSERT OR IGNORE INTO change_counter(id, version) VALUES (1, 0)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS change_log (
+                table_name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (table_name, key)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_version ON change_log(version)")
+        for table, key_sql in CHANGE_TRACKED_TABLES.items():
+            for event, rows in (("INSERT", ("new",)), ("UPDATE", ("old", "new")), ("DELETE", ("old",))):
+                # "WHERE true" keeps the parser from reading ON CONFLICT as a join constraint.
+                upserts = "".join(
+                    f"""
+                    INSERT INTO change_log(table_name, key, version)
+                    SELECT '{table}', {key_sql.format(row=row)}, version FROM change_counter WHERE true
+                    ON CONFLICT(table_name, key) DO UPDATE SET version = excluded.version;"""
+                    for row in rows
+                )
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_changes_{event.lower()}
+                    AFTER {event} ON {table} BEGIN
+                        UPDATE change_counter SET version = version + 1;{upserts}
+                    END;
+                    """
+                )
+        conn.execute("UPDATE schema_version SET version = 7")
+    if from_version < 8 <= to_version:
+        new_day = SESSION_DAY_SQL.format(row="new")
+        old_day = SESSION_DAY_SQL.format(row="old")
+        conn.execute("DROP TRIGGER IF EXISTS pomodoro_sessions_ai")
+        conn.execute("DROP TRIGGER IF EXISTS pomodoro_sessions_ad")
+        conn.execute(
+            f"""
+            CREATE TRIGGER pomodoro_sessions_ai
+            AFTER INSERT ON pomodoro_sessions BEGIN
+                INSERT INTO pomodoro_daily(day, linked_type, linked_id, sessions, focus_seconds)
+                VALUES ({new_day}, new.linked_type, coalesce(new.linked_id, ''), 1, new.duration)
+                ON CONFLICT(day, linked_type, linked_id) DO UPDATE SET
+                    sessions = sessions + 1,
+                    focus_seconds = focus_seconds + excluded.focus_seconds;
+            END;
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER pomodoro_sessions_ad
+            AFTER DELETE ON pomodoro_sessions BEGIN
+                UPDATE pomodoro_daily
+                SET sessions = sessions - 1, focus_seconds = focus_seconds - old.duration
+                WHERE day = {old_day}
+                    AND linked_type = old.linked_type
+                    AND linked_id = coalesce(old.linked_id, '');
+                DELETE FROM pomodoro_daily
+                WHERE day = {old_day}
+                    AND linked_type = old.linked_type
+                    AND linked_id = coalesce(old.linked_id, '')
+                    AND sessions <= 0;
+            END;
+            """
+        )
+        # Re-bucket the sessions still in planner.db from their UTC day to the
+        # local one. Sessions already moved to an archive keep their old day:
+        # the archives cannot be attached inside this transaction.
+        conn.execute(
+            """
+            UPDATE pomodoro_daily
+            SET sessions = pomodoro_daily.sessions - moved.sessions,
+                focus_seconds = pomodoro_daily.focus_seconds - moved.focus_seconds
+            FROM (
+                SELECT substr(start_time, 1, 10) AS day, linked_type, coalesce(linked_id, '') AS linked_id,
+                       COUNT(*) AS sessions, SUM(duration) AS focus_seconds
+                FROM pomodoro_sessions
+                GROUP BY 1, 2, 3
+            ) AS moved
+            WHERE pomodoro_daily.day = moved.day
+                AND pomodoro_daily.linked_type = moved.linked_type
+                AND pomodoro_daily.linked_id = moved.linked_id
+            """
+        )
+        conn.execute("DELETE FROM pomodoro_daily WHERE sessions <= 0")
+        conn.execute(
+            f"""
+            INSERT INTO pomodoro_daily(day, linked_type, linked_id, sessions, focus_seconds)
+            SELECT {SESSION_DAY_SQL.format(row="pomodoro_sessions")}, linked_type, coalesce(linked_id, ''),
+                   COUNT(*), SUM(duration)
+            FROM pomodoro_sessions
+            WHERE true
+            GROUP BY 1, 2, 3
+            ON CONFLICT(day, linked_type, linked_id) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                focus_seconds = focus_seconds + excluded.focus_seconds
+            """
+        )
+        conn.execute("UPDATE schema_version SET version = 8")
 
 
 @dataclass
@@ -147,54 +674,348 @@ class NoteEntry:
     updated_at: str
 
 
+@dataclass
+class NotePreview:
+    date: str
+    preview: str
+    updated_at: str
+
+
+@dataclass
+class SearchHit:
+    date: str
+    snippet: str
+    rank: float
+
+
 @dataclass
 class TaskItem:
     id: int
     date: str
     text: str
     status: str
+    position: int = 0
+
 
+class NoteCache:
+    """Bounded LRU of date -> note (None for dates without a note)."""
 
-def upsert_note(date: str, content: str) -> None:
-    updated_at = datetime.utcnow().isoformat()
-    with connect_db() as conn:
+    def __init__(self, max_size: int = NOTE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[str, NoteEntry | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, date: str) -> tuple[bool, NoteEntry | None]:
+        with self._lock:
+            if date not in self._entries:
+                return False, None
+            self._entries.move_to_end(date)
+            return True, self._entries[date]
+
+    def put_many(self, entries: dict[str, NoteEntry | None], generation: int) -> None:
+        # Results read before an invalidation may be stale, so they are dropped.
+        with self._lock:
+            if generation != self._generation:
+                return
+            for date, entry in entries.items():
+                self._entries[date] = entry
+                self._entries.move_to_end(date)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, date: str | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if date is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(date, None)
+
+
+note_cache = NoteCache()
+
+
+@instrumented
+def upsert_note(date: str, content: str, coalesce: bool = True) -> None:
+    now = datetime.utcnow()
+    with get_manager().write() as conn:
+        old = conn.execute("SELECT content, updated_at FROM note_entries WHERE date = ?", (date,)).fetchone()
+        if old is not None and old["content"] == content:
+            return
         conn.execute(
             """
             INSERT INTO note_entries(date, content, updated_at)
             VALUES (?, ?, ?)
             ON CONFLICT(date) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at
             """,
-            (date, content, updated_at),
+            (date, content, now.isoformat()),
+        )
+        revisions.record_revision(
+            conn,
+            date,
+            old["content"] if old else None,
+            old["updated_at"] if old else None,
+            content,
+            now,
+            coalesce,
         )
-        conn.commit()
+        note_cache.invalidate(date)
+        get_manager().after_commit(lambda: note_cache.invalidate(date))
+
+
+@instrumented
+def list_note_revisions(date: str) -> list[NoteRevision]:
+    return revisions.list_revisions(get_manager().read(), date)
+
+
+def get_note_revision(revision_id: int) -> str:
+    return revisions.revision_text(get_manager().read(), revision_id)
+
+
+@instrumented
+def restore_note_revision(date: str, revision_id: int) -> str:
+    """Make an old revision the current note (itself recorded as a new revision)."""
+    with get_manager().write() as conn:
+        content = revisions.revision_text(conn, revision_id)
+        # Never merged into the latest revision: that text stays restorable.
+        write_note(date, content, coalesce=False)
+    return content
+
+
+@instrumented
+def write_note(date: str, content: str, coalesce: bool = True) -> None:
+    """Save a note together with the tasks parsed from it, as the editors do."""
+    with get_manager().write():
+        upsert_note(date, content, coalesce)
+        replace_tasks_for_date(date, parse_tasks(content))
+
+
+@instrumented
+def append_to_note(date: str, text: str) -> str:
+    # An archived note is extended in planner.db, so its archive must be readable here.
+    with get_manager().write(attach_years=_archived_years(date, date)):
+        entry = fetch_note(date)
+        content = entry.content if entry else ""
+        if content and not content.endswith("\n"):
+            content += "\n"
+        content += text
+        write_note(date, content)
+    return content
+
+
+@instrumented
+def save_notes(notes: dict[str, str], tasks_by_date: dict[str, list[tuple[str, str]]]) -> None:
+    with get_manager().write():
+        for date, content in notes.items():
+            upsert_note(date, content)
+            replace_tasks_for_date(date, tasks_by_date.get(date, []))
+
+
+def _archived_years(start_date: str | None = None, end_date: str | None = None) -> list[int]:
+    return archive.years_between(archive.archive_years(get_manager().db_path.parent), start_date, end_date)
+
+
+def _archive_schemas(conn: sqlite3.Connection, years: Iterable[int]) -> Iterator[str]:
+    # Attached one at a time, as the caller gets to it, to stay under SQLite's attach limit.
+    data_dir = get_manager().db_path.parent
+    for year in years:
+        schema = archive.attach(conn, data_dir, year)
+        if schema is not None:
+            yield schema
+
+
+# Archive rows for a date that also has a note in planner.db are stale:
+# the note was edited after archiving and the next run will move it again.
+NOT_SHADOWED_SQL = "NOT EXISTS (SELECT 1 FROM main.note_entries AS hot WHERE hot.date = {table}.date)"
 
 
+@instrumented
 def fetch_note(date: str) -> NoteEntry | None:
-    with connect_db() as conn:
-        row = conn.execute(
-            "SELECT date, content, updated_at FROM note_entries WHERE date = ?",
-            (date,),
-        ).fetchone()
-    if not row:
-        return None
-    return NoteEntry(**row)
+    found, entry = note_cache.get(date)
+    if found:
+        diagnostics.count("note_cache_hits")
+        return entry
+    diagnostics.count("note_cache_misses")
+    generation = note_cache.generation
+    conn = get_manager().read()
+    row = conn.execute(
+        "SELECT date, content, updated_at FROM note_entries WHERE date = ?",
+        (date,),
+    ).fetchone()
+    if row is None:
+        for schema in _archive_schemas(conn, _archived_years(date, date)):
+            row = conn.execute(
+                f"SELECT date, content, updated_at FROM {schema}.note_entries WHERE date = ?",
+                (date,),
+            ).fetchone()
+    entry = NoteEntry(**row) if row else None
+    diagnostics.count("rows_read", row is not None)
+    if not get_manager().in_write:
+        note_cache.put_many({date: entry}, generation)
+    return entry
+
+
+def _date_range(start_date: str, end_date: str) -> list[str]:
+    start = date_cls.fromisoformat(start_date)
+    days = (date_cls.fromisoformat(end_date) - start).days
+    return [(start + timedelta(days=offset)).isoformat() for offset in range(days + 1)]
+
+
+@instrumented
+def fetch_notes_range(start_date: str, end_date: str) -> dict[str, NoteEntry]:
+    dates = _date_range(start_date, end_date)
+    cacheable = len(dates) <= note_cache.max_size and not get_manager().in_write
+    if cacheable:
+        cached = cached_notes_range(start_date, end_date)
+        if cached is not None:
+            return cached
+    generation = note_cache.generation
+    conn = get_manager().read()
+    rows = conn.execute(
+        "SELECT date, content, updated_at FROM note_entries WHERE date BETWEEN ? AND ? ORDER BY date",
+        (start_date, end_date),
+    ).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    notes = {row["date"]: NoteEntry(**row) for row in rows}
+    archived = _archived_notes(conn, start_date, end_date)
+    if archived:
+        for entry in archived:
+            notes.setdefault(entry.date, entry)
+        notes = dict(sorted(notes.items()))
+    if cacheable:
+        note_cache.put_many({date: notes.get(date) for date in dates}, generation)
+    return notes
+
+
+def _archived_notes(conn: sqlite3.Connection, start_date: str | None, end_date: str | None) -> list[NoteEntry]:
+    """Notes from the archives covering the range (all of them without bounds), unordered."""
+    query = "SELECT date, content, updated_at FROM {schema}.note_entries"
+    params: tuple = ()
+    if start_date and end_date:
+        query += " WHERE date BETWEEN ? AND ?"
+        params = (start_date, end_date)
+    notes = []
+    for schema in _archive_schemas(conn, _archived_years(start_date, end_date)):
+        rows = conn.execute(query.format(schema=schema), params).fetchall()
+        diagnostics.count("rows_read", len(rows))
+        notes.extend(NoteEntry(**row) for row in rows)
+    return notes
 
 
+def cached_notes_range(start_date: str, end_date: str) -> dict[str, NoteEntry] | None:
+    notes: dict[str, NoteEntry] = {}
+    for date in _date_range(start_date, end_date):
+        found, entry = note_cache.get(date)
+        if not found:
+            return None
+        if entry is not None:
+            notes[date] = entry
+    return notes
+
+
+def prefetch_notes_range(start_date: str, end_date: str) -> Future:
+    return get_executor().submit_read(fetch_notes_range, start_date, end_date)
+
+
+def build_fts_query(text: str) -> str:
+    # Every token is quoted, so user input can never produce FTS5 syntax errors;
+    # the last token is a prefix match to support search-as-you-type.
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+SEARCH_NOTES_SQL = """
+    SELECT note_entries.date, note_entries.content, note_entries.updated_at
+    FROM {schema}.note_fts
+    JOIN {schema}.note_entries ON note_entries.rowid = note_fts.rowid
+    WHERE note_fts MATCH ?{shadow}
+"""
+SEARCH_PAGE_SQL = """
+    SELECT date, snippet(note_fts, 1, ?, ?, '…', ?) AS snippet, bm25(note_fts, 0.0, 1.0) AS rank
+    FROM {schema}.note_fts
+    WHERE note_fts MATCH ?{shadow}
+    ORDER BY rank
+    LIMIT ? OFFSET ?
+"""
+SEARCH_COUNT_SQL = "SELECT COUNT(*) FROM {schema}.note_fts WHERE note_fts MATCH ?{shadow}"
+
+
+@instrumented
 def search_notes(query: str) -> list[NoteEntry]:
-    with connect_db() as conn:
-        rows = conn.execute(
-            """
-            SELECT note_entries.date, note_entries.content, note_entries.updated_at
-            FROM note_fts
-            JOIN note_entries ON note_entries.rowid = note_fts.rowid
-            WHERE note_fts MATCH ?
-            ORDER BY note_entries.date DESC
-            """,
-            (query,),
-        ).fetchall()
-    return [NoteEntry(**row) for row in rows]
+    fts_query = build_fts_query(query)
+    if not fts_query:
+        return []
+    conn = get_manager().read()
+    rows = conn.execute(SEARCH_NOTES_SQL.format(schema="main", shadow=""), (fts_query,)).fetchall()
+    shadow = " AND " + NOT_SHADOWED_SQL.format(table="note_entries")
+    for schema in _archive_schemas(conn, _archived_years()):
+        rows += conn.execute(SEARCH_NOTES_SQL.format(schema=schema, shadow=shadow), (fts_query,)).fetchall()
+        diagnostics.count("fts_queries")
+    diagnostics.count("fts_queries")
+    diagnostics.count("rows_read", len(rows))
+    return sorted((NoteEntry(**row) for row in rows), key=lambda entry: entry.date, reverse=True)
 
 
+@instrumented
+def search_notes_page(
+    query: str,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+    cancel: threading.Event | None = None,
+    marks: tuple[str, str] = ("**", "**"),
+) -> list[SearchHit]:
+    """A page of hits; ``marks`` surround the matched words in each snippet."""
+    fts_query = build_fts_query(query)
+    if not fts_query or (cancel is not None and cancel.is_set()):
+        return []
+    conn = get_manager().read()
+    if cancel is not None:
+        conn.set_progress_handler(cancel.is_set, 1000)
+    # bm25 scores from different FTS indexes are not comparable, so hits are
+    # ranked within each database: planner.db first, then archives newest
+    # first. Archives are only opened once planner.db has run out of hits.
+    rows: list[sqlite3.Row] = []
+    shadow = " AND " + NOT_SHADOWED_SQL.format(table="note_fts")
+    sources = itertools.chain([("main", "")], ((schema, shadow) for schema in _archive_schemas(
+        conn, reversed(_archived_years())
+    )))
+    try:
+        for schema, schema_shadow in sources:
+            page = conn.execute(
+                SEARCH_PAGE_SQL.format(schema=schema, shadow=schema_shadow),
+                (*marks, SNIPPET_TOKENS, fts_query, limit - len(rows), offset),
+            ).fetchall()
+            diagnostics.count("fts_queries")
+            rows += page
+            if len(rows) >= limit:
+                break
+            if page:
+                offset = 0
+            elif offset:
+                offset -= conn.execute(
+                    SEARCH_COUNT_SQL.format(schema=schema, shadow=schema_shadow), (fts_query,)
+                ).fetchone()[0]
+    except sqlite3.OperationalError:
+        if cancel is not None and cancel.is_set():
+            return []
+        raise
+    finally:
+        if cancel is not None:
+            conn.set_progress_handler(None, 0)
+    diagnostics.count("rows_read", len(rows))
+    return [SearchHit(**row) for row in rows]
+
+
+@instrumented
 def list_notes(start_date: str | None = None, end_date: str | None = None) -> list[NoteEntry]:
     query = "SELECT date, content, updated_at FROM note_entries"
     params: list[str] = []
@@ -202,31 +1023,238 @@ def list_notes(start_date: str | None = None, end_date: str | None = None) -> li
         query += " WHERE date BETWEEN ? AND ?"
         params.extend([start_date, end_date])
     query += " ORDER BY date DESC"
-    with connect_db() as conn:
-        rows = conn.execute(query, params).fetchall()
-    return [NoteEntry(**row) for row in rows]
+    conn = get_manager().read()
+    rows = conn.execute(query, params).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    notes = [NoteEntry(**row) for row in rows]
+    archived = _archived_notes(conn, start_date, end_date)
+    if archived:
+        dates = {note.date for note in notes}
+        notes += [note for note in archived if note.date not in dates]
+        notes.sort(key=lambda note: note.date, reverse=True)
+    return notes
+
+
+NOTE_PREVIEW_SQL = """
+    SELECT date,
+           replace(substr(trim(content, char(32, 9, 10, 13)), 1, ?), char(10), ' ') AS preview,
+           updated_at
+    FROM {schema}.note_entries
+"""
+
+
+@instrumented
+def list_note_previews(before_date: str | None = None, limit: int = 200) -> list[NotePreview]:
+    conditions: list[str] = []
+    params: list[object] = [NOTE_PREVIEW_LENGTH]
+    if before_date:
+        conditions.append("date < ?")
+        params.append(before_date)
+    params.append(limit)
+    conn = get_manager().read()
+
+    def query(schema: str, where: list[str]) -> list[sqlite3.Row]:
+        sql = NOTE_PREVIEW_SQL.format(schema=schema)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = conn.execute(sql + " ORDER BY date DESC LIMIT ?", params).fetchall()
+        diagnostics.count("rows_read", len(rows))
+        return rows
+
+    rows = query("main", conditions)
+    years = _archived_years(None, before_date)
+    # Archives are newest-first and hold one year each, so once the page is
+    # full of later dates the older archives cannot contribute.
+    while years and (len(rows) < limit or rows[-1]["date"] < f"{years[-1] + 1}-01-01"):
+        for schema in _archive_schemas(conn, [years.pop()]):
+            archived = query(schema, [*conditions, NOT_SHADOWED_SQL.format(table="note_entries")])
+            rows = sorted(rows + archived, key=lambda row: row["date"], reverse=True)[:limit]
+    return [NotePreview(**row) for row in rows]
+
 
+@instrumented
+def note_previews_for(dates: list[str]) -> dict[str, NotePreview | None]:
+    """Previews for specific dates, None where the note no longer exists."""
+    previews: dict[str, NotePreview | None] = dict.fromkeys(dates)
+    conn = get_manager().read()
+    schemas = ["main"]
+    if dates:
+        schemas = itertools.chain(schemas, _archive_schemas(conn, _archived_years(min(dates), max(dates))))
+    for schema in schemas:
+        # Dates deleted from planner.db by archiving are looked up in the archives.
+        missing = [date for date, preview in previews.items() if preview is None]
+        for chunk_start in range(0, len(missing), ITER_BATCH_SIZE):
+            chunk = missing[chunk_start:chunk_start + ITER_BATCH_SIZE]
+            rows = conn.execute(
+                NOTE_PREVIEW_SQL.format(schema=schema) + f" WHERE date IN ({', '.join('?' * len(chunk))})",
+                [NOTE_PREVIEW_LENGTH, *chunk],
+            ).fetchall()
+            diagnostics.count("rows_read", len(rows))
+            for row in rows:
+                previews[row["date"]] = NotePreview(**row)
+    return previews
 
+
+def diff_tasks(
+    existing: list[TaskItem], tasks: list[tuple[str, str]]
+) -> tuple[list[tuple[str, str, int]], list[tuple[str, str, int, int]], list[int]]:
+    by_text: dict[str, list[TaskItem]] = {}
+    for item in existing:
+        by_text.setdefault(item.text, []).append(item)
+    matched: set[int] = set()
+    unmatched: list[tuple[int, str, str]] = []
+    updates: list[tuple[str, str, int, int]] = []
+    for position, (text, status) in enumerate(tasks):
+        candidates = by_text.get(text)
+        if candidates:
+            item = candidates.pop(0)
+            matched.add(item.id)
+            if item.status != status or item.position != position:
+                updates.append((text, status, position, item.id))
+        else:
+            unmatched.append((position, text, status))
+    # An edited line keeps its row (and id) when it stays at the same position.
+    leftovers = {item.position: item for item in existing if item.id not in matched}
+    inserts: list[tuple[str, str, int]] = []
+    for position, text, status in unmatched:
+        item = leftovers.pop(position, None)
+        if item is None:
+            inserts.append((text, status, position))
+        else:
+            updates.append((text, status, position, item.id))
+    deletes = [item.id for item in leftovers.values()]
+    return inserts, updates, deletes
+
+
+@instrumented
 def replace_tasks_for_date(date: str, tasks: list[tuple[str, str]]) -> None:
-    with connect_db() as conn:
-        conn.execute("DELETE FROM task_items WHERE date = ?", (date,))
-        for text, status in tasks:
-            conn.execute(
-                "INSERT INTO task_items(date, text, status) VALUES (?, ?, ?)",
-                (date, text, status),
+    with get_manager().write() as conn:
+        inserts, updates, deletes = diff_tasks(list_tasks_for_date(date), tasks)
+        if deletes:
+            conn.executemany("DELETE FROM task_items WHERE id = ?", [(task_id,) for task_id in deletes])
+        if updates:
+            conn.executemany(
+                "UPDATE task_items SET text = ?, status = ?, position = ? WHERE id = ?",
+                updates,
+            )
+        if inserts:
+            conn.executemany(
+                "INSERT INTO task_items(date, text, status, position) VALUES (?, ?, ?, ?)",
+                [(date, text, status, position) for text, status, position in inserts],
             )
-        conn.commit()
 
 
+@instrumented
 def list_tasks_for_date(date: str) -> list[TaskItem]:
-    with connect_db() as conn:
-        rows = conn.execute(
-            "SELECT id, date, text, status FROM task_items WHERE date = ?",
-            (date,),
-        ).fetchall()
+    rows = get_manager().read().execute(
+        "SELECT id, date, text, status, position FROM task_items WHERE date = ? ORDER BY position, id",
+        (date,),
+    ).fetchall()
+    diagnostics.count("rows_read", len(rows))
     return [TaskItem(**row) for row in rows]
 
 
+TASK_COLUMNS = "id, date, text, status, position"
+OPEN_TASKS_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM task_items
+    WHERE status = 'undone' AND date BETWEEN ? AND ?
+    ORDER BY date, position, id
+"""
+OVERDUE_TASKS_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM task_items
+    WHERE status = 'undone' AND date < ?
+    ORDER BY date, position, id
+"""
+TASK_STATUS_COUNTS_SQL = """
+    SELECT date, status, COUNT(*) AS count FROM task_items
+    WHERE date BETWEEN ? AND ?
+    GROUP BY date, status
+"""
+
+
+@instrumented
+def list_open_tasks(start_date: str, end_date: str) -> list[TaskItem]:
+    rows = get_manager().read().execute(OPEN_TASKS_SQL, (start_date, end_date)).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    return [TaskItem(**row) for row in rows]
+
+
+@instrumented
+def list_overdue_tasks(today: str | None = None) -> list[TaskItem]:
+    today = today or date_cls.today().isoformat()
+    rows = get_manager().read().execute(OVERDUE_TASKS_SQL, (today,)).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    return [TaskItem(**row) for row in rows]
+
+
+@instrumented
+def count_tasks_by_status(start_date: str, end_date: str, by: str = "day") -> dict[str, dict[str, int]]:
+    """Task counts per status, keyed by ISO date or, with ``by="week"``, by ISO week (YYYY-Www)."""
+    counts: dict[str, dict[str, int]] = {}
+    for row in get_manager().read().execute(TASK_STATUS_COUNTS_SQL, (start_date, end_date)):
+        key = row["date"]
+        if by == "week":
+            year, week, _ = date_cls.fromisoformat(key).isocalendar()
+            key = f"{year}-W{week:02d}"
+        bucket = counts.setdefault(key, {})
+        bucket[row["status"]] = bucket.get(row["status"], 0) + row["count"]
+    return counts
+
+
+def _remove_task_lines(content: str, texts: list[str]) -> str:
+    remaining = list(texts)
+    lines = []
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith("- [") and stripped[3:4].lower() != "x" and stripped[5:].strip() in remaining:
+            remaining.remove(stripped[5:].strip())
+            continue
+        lines.append(line)
+    return "".join(lines)
+
+
+@instrumented
+def carry_over_undone(today: str | None = None) -> int:
+    """Move every undone task dated before ``today`` to ``today`` in one transaction.
+
+    Task rows keep their ids; the task lines move from the old notes to the
+    end of today's note so notes and task_items stay in agreement.
+    """
+    today = today or date_cls.today().isoformat()
+    with get_manager().write() as conn:
+        overdue = list_overdue_tasks(today)
+        if not overdue:
+            return 0
+        by_date: dict[str, list[TaskItem]] = {}
+        for task in overdue:
+            by_date.setdefault(task.date, []).append(task)
+        for source_date, tasks in by_date.items():
+            entry = fetch_note(source_date)
+            if entry is not None:
+                upsert_note(source_date, _remove_task_lines(entry.content, [task.text for task in tasks]))
+            remaining = conn.execute(
+                "SELECT id FROM task_items WHERE date = ? AND status != 'undone' ORDER BY position, id",
+                (source_date,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE task_items SET position = ? WHERE id = ?",
+                [(position, row["id"]) for position, row in enumerate(remaining)],
+            )
+        first_position = conn.execute(
+            "SELECT COUNT(*) FROM task_items WHERE date = ?", (today,)
+        ).fetchone()[0]
+        conn.executemany(
+            "UPDATE task_items SET date = ?, position = ? WHERE id = ?",
+            [(today, first_position + offset, task.id) for offset, task in enumerate(overdue)],
+        )
+        entry = fetch_note(today)
+        content = entry.content if entry else ""
+        carried = "\n".join(f"- [ ] {task.text}" for task in overdue)
+        upsert_note(today, f"{content.rstrip()}\n{carried}" if content.strip() else carried)
+    return len(overdue)
+
+
+@instrumented
 def add_pomodoro_session(
     start_time: str,
     duration: int,
@@ -234,7 +1262,7 @@ def add_pomodoro_session(
     linked_type: str,
     linked_id: str | None,
 ) -> None:
-    with connect_db() as conn:
+    with get_manager().write() as conn:
         conn.execute(
             """
             INSERT INTO pomodoro_sessions(start_time, duration, break_duration, linked_type, linked_id)
@@ -242,50 +1270,442 @@ def add_pomodoro_session(
             """,
             (start_time, duration, break_duration, linked_type, linked_id),
         )
-        conn.commit()
 
 
+@instrumented
 def list_pomodoro_sessions(limit: int = 100) -> list[sqlite3.Row]:
-    with connect_db() as conn:
-        rows = conn.execute(
-            """
+    rows = get_manager().read().execute(
+        """
+        SELECT id, start_time, duration, break_duration, linked_type, linked_id
+        FROM pomodoro_sessions
+        ORDER BY start_time DESC
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    return rows
+
+
+@instrumented
+def list_pomodoro_sessions_after(session_id: int, limit: int = 100) -> list[sqlite3.Row]:
+    rows = get_manager().read().execute(
+        """
+        SELECT id, start_time, duration, break_duration, linked_type, linked_id
+        FROM pomodoro_sessions
+        WHERE id > ?
+        ORDER BY start_time DESC
+        LIMIT ?
+        """,
+        (session_id, limit),
+    ).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    return rows
+
+
+def _iter_rows(query: str, params: tuple = ()) -> Iterator[sqlite3.Row]:
+    cursor = get_manager().read().execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(ITER_BATCH_SIZE)
+            if not rows:
+                return
+            diagnostics.count("rows_read", len(rows))
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def _iter_archived_rows(
+    query: str, params: tuple = (), start_date: str | None = None, end_date: str | None = None
+) -> Iterator[sqlite3.Row]:
+    """Stream ``query`` (formatted with each archive's schema) over the archives, oldest year first."""
+    for schema in _archive_schemas(get_manager().read(), _archived_years(start_date, end_date)):
+        yield from _iter_rows(query.format(schema=schema), params)
+
+
+def iter_notes(start_date: str | None = None, end_date: str | None = None) -> Iterator[NoteEntry]:
+    query = "SELECT date, content, updated_at FROM {schema}.note_entries WHERE date BETWEEN ? AND ?"
+    params = (start_date or "", end_date or "9999-12-31")
+    rows = heapq.merge(
+        _iter_rows(query.format(schema="main") + " ORDER BY date", params),
+        _iter_archived_rows(
+            query + " AND " + NOT_SHADOWED_SQL.format(table="note_entries") + " ORDER BY date",
+            params,
+            start_date,
+            end_date,
+        ),
+        key=lambda row: row["date"],
+    )
+    for row in rows:
+        yield NoteEntry(**row)
+
+
+def iter_task_items() -> Iterator[TaskItem]:
+    query = "SELECT id, date, text, status, position FROM {schema}.task_items"
+    rows = heapq.merge(
+        _iter_rows(query.format(schema="main") + " ORDER BY date, position, id"),
+        _iter_archived_rows(
+            query + " WHERE " + NOT_SHADOWED_SQL.format(table="task_items") + " ORDER BY date, position, id"
+        ),
+        key=lambda row: (row["date"], row["position"], row["id"]),
+    )
+    for row in rows:
+        yield TaskItem(**row)
+
+
+def iter_pomodoro_sessions() -> Iterator[sqlite3.Row]:
+    query = (
+        "SELECT id, start_time, duration, break_duration, linked_type, linked_id FROM {schema}.pomodoro_sessions"
+        " ORDER BY id"
+    )
+    yield from _iter_archived_rows(query)
+    yield from _iter_rows(query.format(schema="main"))
+
+
+def iter_settings() -> Iterator[tuple[str, str]]:
+    for row in _iter_rows("SELECT key, value FROM settings ORDER BY key"):
+        yield row["key"], row["value"]
+
+
+@instrumented
+def count_rows() -> dict[str, int]:
+    conn = get_manager().read()
+    counts = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("note_entries", "task_items", "pomodoro_sessions", "settings")
+    }
+    # Archived rows are included; a note edited since it was archived counts twice.
+    for schema in _archive_schemas(conn, _archived_years()):
+        for table in ARCHIVED_TABLES:
+            counts[table] += conn.execute(f"SELECT COUNT(*) FROM {schema}.{table}").fetchone()[0]
+    return counts
+
+
+# Days that still have undone tasks stay in planner.db, so open, overdue and
+# carried-over tasks never need the archives.
+ARCHIVE_DAYS_SQL = """
+    date >= :start AND date < :end
+    AND date NOT IN (SELECT date FROM main.task_items WHERE status = 'undone' AND date >= :start AND date < :end)
+"""
+
+
+NEXT_ARCHIVE_DAY_SQL = """
+    SELECT min(day) FROM (
+        SELECT min(date) AS day FROM note_entries WHERE date >= :start AND date < :cutoff
+        UNION ALL SELECT min(date) FROM task_items WHERE date >= :start AND date < :cutoff
+        UNION ALL SELECT min(start_time) FROM pomodoro_sessions WHERE start_time >= :start AND start_time < :cutoff
+    )
+"""
+
+
+@instrumented
+def archive_before(cutoff: str) -> int:
+    """Move notes, tasks and pomodoro sessions dated before ``cutoff`` into Archive/planner_<year>.db.
+
+    Each year takes two transactions, each writing one file: rows are first
+    copied into the archive, then deleted from planner.db if nothing in the
+    range changed in between. A crash between the two leaves the rows in both
+    files, where planner.db wins, and the next run finishes the move.
+    Returns the number of rows removed from planner.db.
+    """
+    conn = get_manager().read()
+    moved = 0
+    start = ""
+    # Jumps from one year with data to the next, so empty years get no file.
+    while (first_day := conn.execute(NEXT_ARCHIVE_DAY_SQL, {"start": start, "cutoff": cutoff}).fetchone()[0]):
+        year = int(first_day[:4])
+        archive.archive_dir(get_manager().db_path.parent).mkdir(exist_ok=True)
+        bounds = {"start": f"{year}-01-01", "end": min(f"{year + 1}-01-01", cutoff)}
+        version = _copy_to_archive(year, bounds)
+        moved += _delete_archived(year, bounds, version)
+        start = f"{year + 1}-01-01"
+    return moved
+
+
+@instrumented
+def archive_old_data(config: archive.ArchiveConfig | None = None) -> int:
+    """Archive everything before the configured cutoff and give the freed space back."""
+    config = config or archive.ArchiveConfig.from_setting(get_setting("archive", {}))
+    cutoff = config.cutoff()
+    if cutoff is None:
+        return 0
+    moved = archive_before(cutoff)
+    if moved:
+        get_manager().vacuum()
+    return moved
+
+
+def _copy_to_archive(year: int, bounds: dict[str, str]) -> int:
+    schema = archive.schema_name(year)
+    with get_manager().write(attach_years=[year]) as conn:
+        archive.create_schema(conn, schema)
+        # An upsert, not INSERT OR REPLACE: REPLACE would skip the FTS delete trigger.
+        conn.execute(
+            f"""
+            INSERT INTO {schema}.note_entries(date, content, updated_at)
+            SELECT date, content, updated_at FROM main.note_entries WHERE {ARCHIVE_DAYS_SQL}
+            ON CONFLICT(date) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at
+            """,
+            bounds,
+        )
+        # A day's tasks are replaced as a whole, like replace_tasks_for_date does.
+        conn.execute(
+            f"""
+            DELETE FROM {schema}.task_items WHERE date IN (
+                SELECT date FROM main.note_entries WHERE {ARCHIVE_DAYS_SQL}
+                UNION SELECT date FROM main.task_items WHERE {ARCHIVE_DAYS_SQL}
+            )
+            """,
+            bounds,
+        )
+        conn.execute(
+            f"""
+            INSERT INTO {schema}.task_items(id, date, text, status, position)
+            SELECT id, date, text, status, position FROM main.task_items WHERE {ARCHIVE_DAYS_SQL}
+            """,
+            bounds,
+        )
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {schema}.pomodoro_sessions
+                (id, start_time, duration, break_duration, linked_type, linked_id)
             SELECT id, start_time, duration, break_duration, linked_type, linked_id
-            FROM pomodoro_sessions
-            ORDER BY start_time DESC
-            LIMIT ?
+            FROM main.pomodoro_sessions WHERE start_time >= :start AND start_time < :end
             """,
-            (limit,),
-        ).fetchall()
-    return rows
+            bounds,
+        )
+        conn.execute(f"INSERT INTO {schema}.note_fts(note_fts) VALUES ('optimize')")
+        return conn.execute("SELECT version FROM change_counter").fetchone()[0]
 
 
-def set_setting(key: str, value: dict) -> None:
-    payload = json.dumps(value, ensure_ascii=False)
-    with connect_db() as conn:
+def _delete_archived(year: int, bounds: dict[str, str], copied_version: int) -> int:
+    with get_manager().write() as conn:
+        changed = conn.execute(
+            """
+            SELECT 1 FROM change_log
+            WHERE table_name IN ('note_entries', 'task_items', 'pomodoro_sessions')
+                AND key >= :start AND key < :end AND version > :version
+            LIMIT 1
+            """,
+            {**bounds, "version": copied_version},
+        ).fetchone()
+        if changed is not None:
+            logger.info("Rows of %s changed while archiving; they stay in planner.db until the next run", year)
+            return 0
+        # Focus statistics keep counting archived sessions: pomodoro_daily is
+        # restored after the delete trigger has subtracted them.
         conn.execute(
-            "INSERT INTO settings(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
-            (key, payload),
+            f"""
+            CREATE TEMP TABLE archived_daily AS SELECT * FROM pomodoro_daily WHERE day IN (
+                SELECT {SESSION_DAY_SQL.format(row="pomodoro_sessions")} FROM pomodoro_sessions
+                WHERE start_time >= :start AND start_time < :end
+            )
+            """,
+            bounds,
         )
-        conn.commit()
+        moved = conn.execute(
+            "DELETE FROM pomodoro_sessions WHERE start_time >= :start AND start_time < :end", bounds
+        ).rowcount
+        conn.execute("INSERT OR REPLACE INTO pomodoro_daily SELECT * FROM temp.archived_daily")
+        conn.execute("DROP TABLE temp.archived_daily")
+        moved += conn.execute(f"DELETE FROM task_items WHERE {ARCHIVE_DAYS_SQL}", bounds).rowcount
+        moved += conn.execute(f"DELETE FROM note_entries WHERE {ARCHIVE_DAYS_SQL}", bounds).rowcount
+        conn.execute("INSERT INTO note_fts(note_fts) VALUES ('optimize')")
+        get_manager().after_commit(note_cache.invalidate)
+        return moved
+
+
+@dataclass
+class Change:
+    table: str
+    key: str
+    version: int
+
+
+@instrumented
+def change_version() -> int:
+    """Counter bumped by every tracked write; compare it to spot any change."""
+    return get_manager().read().execute("SELECT version FROM change_counter").fetchone()[0]
+
+
+@instrumented
+def changes_since(version: int, limit: int = CHANGES_PAGE_SIZE) -> list[Change]:
+    """Keys changed after ``version``, oldest first, at most one entry per key."""
+    rows = get_manager().read().execute(
+        "SELECT table_name, key, version FROM change_log WHERE version > ? ORDER BY version LIMIT ?",
+        (version, limit),
+    ).fetchall()
+    diagnostics.count("rows_read", len(rows))
+    changes = [Change(row["table_name"], row["key"], row["version"]) for row in rows]
+    # One update can log two keys under the same version; never split them
+    # across pages, or the caller's next cursor would skip the second one.
+    if len(changes) == limit and changes[0].version != changes[-1].version:
+        last = changes[-1].version
+        changes = [change for change in changes if change.version != last]
+    return changes
+
+
+@instrumented
+def keys_version(table: str, start_key: str, end_key: str) -> int:
+    """Latest change version for keys of ``table`` between the bounds, 0 if never changed."""
+    row = get_manager().read().execute(
+        "SELECT MAX(version) FROM change_log WHERE table_name = ? AND key BETWEEN ? AND ?",
+        (table, start_key, end_key),
+    ).fetchone()
+    return row[0] or 0
+
+
+@instrumented
+def table_version(table: str) -> int:
+    row = get_manager().read().execute(
+        "SELECT MAX(version) FROM change_log WHERE table_name = ?", (table,)
+    ).fetchone()
+    return row[0] or 0
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Changes whenever another connection, in any process, commits to the database."""
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def invalidate_changed(changes: list[Change]) -> None:
+    """Drop cached rows that a commit on another connection may have changed."""
+    for change in changes:
+        if change.table == "note_entries":
+            note_cache.invalidate(change.key)
+        elif change.table == "settings":
+            settings_store.refresh(change.key)
+
+
+class SettingsStore:
+    """In-memory view of the settings table with write-through and change listeners.
+
+    The table is read once; listeners run after the write commits, on the
+    writing thread, or on the change watcher's thread when another process
+    changed the setting.
+    """
+
+    def __init__(self) -> None:
+        self._values: dict[str, dict] | None = None
+        self._lock = threading.Lock()
+        self._listeners: dict[str, list[Callable[[dict], None]]] = {}
+
+    def _loaded(self) -> dict[str, dict]:
+        with self._lock:
+            if self._values is None:
+                values: dict[str, dict] = {}
+                for key, raw_value in iter_settings():
+                    try:
+                        values[key] = json.loads(raw_value)
+                    except json.JSONDecodeError:
+                        continue
+                self._values = values
+            return self._values
+
+    def get(self, key: str, default: dict) -> dict:
+        values = self._loaded()
+        if key not in values:
+            return default
+        return copy.deepcopy(values[key])
+
+    def set(self, key: str, value: dict) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        stored = json.loads(payload)
+        # Loaded before the write, so _store compares with the old value.
+        self._loaded()
+        with get_manager().write() as conn:
+            conn.execute(
+                "INSERT INTO settings(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, payload),
+            )
+            get_manager().after_commit(lambda: self._store(key, stored))
+
+    def refresh(self, key: str) -> None:
+        """Re-read ``key`` after a commit seen by the change watcher.
+
+        The watcher also reports this process's own writes; those already
+        match the cached value, so only changes made elsewhere notify.
+        """
+        row = get_manager().read().execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        try:
+            value = json.loads(row["value"]) if row is not None else None
+        except json.JSONDecodeError:
+            return
+        self._store(key, value)
+
+    def _store(self, key: str, value: dict | None) -> None:
+        with self._lock:
+            if self._values is None or self._values.get(key) == value:
+                return
+            if value is None:
+                del self._values[key]
+            else:
+                self._values[key] = value
+            listeners = list(self._listeners.get(key, []))
+        for listener in listeners:
+            listener(copy.deepcopy(value) if value is not None else {})
+
+    def subscribe(self, key: str, listener: Callable[[dict], None]) -> Callable[[], None]:
+        with self._lock:
+            self._listeners.setdefault(key, []).append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners.get(key, []):
+                    self._listeners[key].remove(listener)
+
+        return unsubscribe
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._values = None
+
+
+settings_store = SettingsStore()
+
+
+@instrumented
+def set_setting(key: str, value: dict) -> None:
+    settings_store.set(key, value)
 
 
 def get_setting(key: str, default: dict) -> dict:
-    with connect_db() as conn:
-        row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
-    if not row:
-        return default
+    return settings_store.get(key, default)
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+@instrumented
+def backup_database(target_path: Path, progress: Callable[[int, int], None] | None = None) -> None:
+    # The copy goes in steps of BACKUP_PAGES so progress can be reported, but
+    # SQLite starts it over whenever another connection commits, which the
+    # autosave does every few seconds. After BACKUP_RESTARTS restarts the
+    # rest is copied in a single step from one read snapshot; under WAL that
+    # does not hold up the writer either.
+    restarts = 0
+    copied = 0
+
+    def report(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, copied
+        if total - remaining <= copied:
+            restarts += 1
+            if restarts > BACKUP_RESTARTS:
+                raise _BackupRestarted
+        copied = total - remaining
+        if progress:
+            progress(copied, total)
+
+    target = sqlite3.connect(target_path)
     try:
-        return json.loads(row["value"])
-    except json.JSONDecodeError:
-        return default
-
-
-def backup_database() -> Path:
-    data_dir = get_data_dir()
-    backup_dir = data_dir / "Backups"
-    backup_dir.mkdir(exist_ok=True)
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    backup_path = backup_dir / f"planner_{timestamp}.db"
-    with connect_db() as conn:
-        conn.backup(sqlite3.connect(backup_path))
-    return backup_path
+        try:
+            get_manager().read().backup(target, pages=BACKUP_PAGES, progress=report)
+        except _BackupRestarted:
+            get_manager().read().backup(target)
+            if progress:
+                total = target.execute("PRAGMA page_count").fetchone()[0]
+                progress(total, total)
+    finally:
+        target.close()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+READER_THREADS = 3
+
+
+class DatabaseExecutor:
+    """Runs db calls off the caller's thread: one ordered writer, a pool of readers.
+
+    Writes execute strictly in submission order on a single thread. A read
+    waits for every write submitted before it, so callers always read their
+    own writes even though readers run in parallel.
+    """
+
+    def __init__(self, reader_threads: int = READER_THREADS) -> None:
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="db-reader")
+        self._last_write: Future | None = None
+        self._lock = threading.Lock()
+
+    def submit_write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            future = self._writer.submit(fn, *args, **kwargs)
+            self._last_write = future
+        return future
+
+    def submit_read(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            barrier = self._last_write
+        if barrier is None or barrier.done():
+            return self._readers.submit(fn, *args, **kwargs)
+
+        def run_after_writes() -> Any:
+            wait([barrier])
+            return fn(*args, **kwargs)
+
+        return self._readers.submit(run_after_writes)
+
+    def flush(self, timeout: float | None = None) -> None:
+        with self._lock:
+            barrier = self._last_write
+        if barrier is not None:
+            wait([barrier], timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._readers.shutdown(wait=wait, cancel_futures=True)
+        self._writer.shutdown(wait=wait)
+
+
+_executor: DatabaseExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> DatabaseExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DatabaseExecutor()
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+ENABLED_ENV = "TASKMENEDGER_DB_TRACE"
+SLOW_MS_ENV = "TASKMENEDGER_SLOW_QUERY_MS"
+DEFAULT_SLOW_MS = 200.0
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000)
+MAX_ARGS_REPR = 120
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS_MS) + 1))
+
+    def add(self, elapsed_ms: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if elapsed_ms < bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class Diagnostics:
+    """Per-operation timings, counters and a slow-call log for the db layer.
+
+    Disabled by default; while disabled, instrumented calls cost one
+    attribute check and ``count`` returns immediately.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.slow_ms = DEFAULT_SLOW_MS
+        self._lock = threading.Lock()
+        self._operations: dict[str, OperationStats] = {}
+        self._counters: Counter[str] = Counter()
+        self._started_at = time.time()
+
+    def configure(self, enabled: bool | None = None, slow_ms: float | None = None) -> None:
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+        if enabled is not None and enabled != self.enabled:
+            self.reset()
+            self.enabled = enabled
+
+    def load_config(self, setting: dict) -> None:
+        """Apply the ``diagnostics`` setting; environment variables take precedence."""
+        enabled = setting.get("enabled")
+        slow_ms = setting.get("slow_ms")
+        if os.getenv(ENABLED_ENV):
+            enabled = os.environ[ENABLED_ENV] == "1"
+        if os.getenv(SLOW_MS_ENV):
+            try:
+                slow_ms = float(os.environ[SLOW_MS_ENV])
+            except ValueError:
+                logger.warning("Ignoring invalid %s=%r", SLOW_MS_ENV, os.environ[SLOW_MS_ENV])
+        self.configure(enabled=enabled, slow_ms=slow_ms)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += amount
+
+    def record(self, name: str, elapsed_ms: float, failed: bool, args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = OperationStats()
+            stats.add(elapsed_ms, failed)
+        if elapsed_ms >= self.slow_ms:
+            logger.warning("Slow db call %s: %.1f ms %s", name, elapsed_ms, _format_args(args, kwargs))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self._counters.clear()
+            self._started_at = time.time()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "slow_ms": self.slow_ms,
+                "uptime_seconds": time.time() - self._started_at,
+                "counters": dict(self._counters),
+                "histogram_bounds_ms": list(HISTOGRAM_BOUNDS_MS),
+                "operations": {
+                    name: {
+                        "calls": stats.calls,
+                        "errors": stats.errors,
+                        "total_ms": stats.total_ms,
+                        "mean_ms": stats.mean_ms,
+                        "max_ms": stats.max_ms,
+                        "buckets": list(stats.buckets),
+                    }
+                    for name, stats in self._operations.items()
+                },
+            }
+
+    def report(self) -> str:
+        data = self.snapshot()
+        if not data["enabled"]:
+            return f"Диагностика выключена ({ENABLED_ENV}=1 или настройка diagnostics.enabled)."
+        labels = [f"<{bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f"≥{HISTOGRAM_BOUNDS_MS[-1]}"]
+        lines = [
+            f"Время работы: {data['uptime_seconds']:.0f} с, порог медленных вызовов: {data['slow_ms']:.0f} мс",
+            "",
+            "Счётчики:",
+        ]
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"  {name:28} {value}")
+        lines += ["", f"{'Операция':32} {'вызовы':>7} {'ср. мс':>8} {'макс. мс':>9}  " + " ".join(f"{label:>6}" for label in labels)]
+        operations = sorted(data["operations"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        for name, stats in operations:
+            buckets = " ".join(f"{count:>6}" for count in stats["buckets"])
+            lines.append(f"{name:32} {stats['calls']:>7} {stats['mean_ms']:>8.2f} {stats['max_ms']:>9.2f}  {buckets}")
+        return "\n".join(lines)
+
+    def dump_to_log(self) -> None:
+        if self.enabled:
+            logger.info("Db diagnostics since startup:\n%s", self.report())
+
+
+def _format_args(args: tuple, kwargs: dict) -> str:
+    parts = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in kwargs.items()]
+    text = ", ".join(parts)
+    if len(text) > MAX_ARGS_REPR:
+        text = text[: MAX_ARGS_REPR - 1] + "…"
+    return f"({text})"
+
+
+diagnostics = Diagnostics()
+
+
+def instrumented(fn: F) -> F:
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not diagnostics.enabled:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            diagnostics.record(name, (time.perf_counter() - started) * 1000, failed, args, kwargs)
+
+    return wrapper  # type: ignore[return-value]
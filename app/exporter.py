@@ -1,42 +1,243 @@
 from __future__ import annotations
 
 import json
-from datetime import date
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, TextIO
 
 from app import db
+from app.analytics import iso_week_key
+from app.diagnostics import instrumented
 
 
+@instrumented
 def export_week_to_markdown(start_date: date, target_path: Path) -> None:
     lines: list[str] = []
+    end_date = start_date.fromordinal(start_date.toordinal() + 6)
+    notes = db.fetch_notes_range(start_date.isoformat(), end_date.isoformat())
     for offset in range(7):
         current_date = start_date.fromordinal(start_date.toordinal() + offset)
-        entry = db.fetch_note(current_date.isoformat())
+        entry = notes.get(current_date.isoformat())
         lines.append(f"## {current_date.strftime('%A %d.%m.%Y')}")
         lines.append(entry.content if entry else "")
         lines.append("")
     target_path.write_text("\n".join(lines), encoding="utf-8")
 
 
-def export_database_to_json(target_path: Path) -> None:
-    notes = [note.__dict__ for note in db.list_notes()]
-    sessions = [dict(row) for row in db.list_pomodoro_sessions(1000)]
-    data = {
-        "notes": notes,
-        "sessions": sessions,
-    }
-    target_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+ProgressCallback = Callable[[int, int], None]
 
+EXPORT_FORMAT_VERSION = 2
+PROGRESS_EVERY = 500
 
-def import_database_from_json(source_path: Path) -> None:
+
+def _export_records(progress: ProgressCallback | None) -> Iterator[tuple[str, dict]]:
+    total = sum(db.count_rows().values())
+    done = 0
+    sources: list[tuple[str, Iterator[dict]]] = [
+        ("notes", (asdict(note) for note in db.iter_notes())),
+        ("tasks", (asdict(task) for task in db.iter_task_items())),
+        ("sessions", (dict(row) for row in db.iter_pomodoro_sessions())),
+        ("settings", _iter_setting_records()),
+    ]
+    for section, records in sources:
+        for record in records:
+            yield section, record
+            done += 1
+            if progress is not None and done % PROGRESS_EVERY == 0:
+                progress(done, total)
+    if progress is not None:
+        progress(total, total)
+
+
+def _iter_setting_records() -> Iterator[dict]:
+    for key, raw_value in db.iter_settings():
+        try:
+            yield {"key": key, "value": json.loads(raw_value)}
+        except json.JSONDecodeError:
+            continue
+
+
+def _write_atomically(target_path: Path, write: Callable[[TextIO], None]) -> None:
+    partial_path = target_path.with_name(target_path.name + ".part")
+    with partial_path.open("w", encoding="utf-8", newline="\n") as handle:
+        write(handle)
+    partial_path.replace(target_path)
+
+
+@instrumented
+def export_database_to_json(target_path: Path, progress: ProgressCallback | None = None) -> None:
+    def write(handle: TextIO) -> None:
+        handle.write(f'{{\n  "version": {EXPORT_FORMAT_VERSION}')
+        current_section = None
+        for section, record in _export_records(progress):
+            if section != current_section:
+                if current_section is not None:
+                    handle.write("\n  ]")
+                handle.write(f',\n  "{section}": [\n    ')
+                current_section = section
+            else:
+                handle.write(",\n    ")
+            handle.write(json.dumps(record, ensure_ascii=False))
+        if current_section is not None:
+            handle.write("\n  ]")
+        handle.write("\n}\n")
+
+    _write_atomically(target_path, write)
+
+
+@instrumented
+def export_database_to_ndjson(target_path: Path, progress: ProgressCallback | None = None) -> None:
+    record_types = {"notes": "note", "tasks": "task", "sessions": "session", "settings": "setting"}
+
+    def write(handle: TextIO) -> None:
+        handle.write(json.dumps({"type": "meta", "version": EXPORT_FORMAT_VERSION}) + "\n")
+        for section, record in _export_records(progress):
+            handle.write(json.dumps({"type": record_types[section], **record}, ensure_ascii=False) + "\n")
+
+    _write_atomically(target_path, write)
+
+
+def _iter_ndjson_lines(lines: Iterable[str]) -> Iterator[tuple[str, dict]]:
+    sections = {"note": "notes", "task": "tasks", "session": "sessions", "setting": "settings"}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        section = sections.get(record.pop("type", None))
+        if section:
+            yield section, record
+
+
+def _iter_ndjson(source_path: Path) -> Iterator[tuple[str, dict]]:
+    with source_path.open(encoding="utf-8") as handle:
+        yield from _iter_ndjson_lines(handle)
+
+
+def _iter_json(source_path: Path) -> Iterator[tuple[str, dict]]:
     payload = json.loads(source_path.read_text(encoding="utf-8"))
-    for note in payload.get("notes", []):
-        db.upsert_note(note["date"], note.get("content", ""))
-    for session in payload.get("sessions", []):
-        db.add_pomodoro_session(
-            start_time=session["start_time"],
-            duration=session["duration"],
-            break_duration=session["break_duration"],
-            linked_type=session.get("linked_type", "day"),
-            linked_id=session.get("linked_id"),
-        )
+    for section in ("notes", "tasks", "sessions"):
+        for record in payload.get(section, []):
+            yield section, record
+    settings = payload.get("settings", [])
+    if isinstance(settings, dict):
+        settings = [{"key": key, "value": value} for key, value in settings.items()]
+    for record in settings:
+        yield "settings", record
+
+
+@instrumented
+def import_database_from_json(source_path: Path) -> None:
+    _import_records(_iter_ndjson(source_path) if source_path.suffix == ".ndjson" else _iter_json(source_path))
+
+
+@instrumented
+def import_ndjson_stream(lines: Iterable[str]) -> None:
+    """Import NDJSON export records read from ``lines`` (e.g. stdin) in one transaction."""
+    _import_records(_iter_ndjson_lines(lines))
+
+
+def _import_records(records: Iterator[tuple[str, dict]]) -> None:
+    task_date: str | None = None
+    tasks: list[tuple[str, str]] = []
+    with db.get_manager().write():
+        for section, record in records:
+            if section != "tasks" and task_date is not None:
+                db.replace_tasks_for_date(task_date, tasks)
+                task_date, tasks = None, []
+            if section == "notes":
+                db.upsert_note(record["date"], record.get("content", ""))
+            elif section == "tasks":
+                if record["date"] != task_date:
+                    if task_date is not None:
+                        db.replace_tasks_for_date(task_date, tasks)
+                    task_date, tasks = record["date"], []
+                tasks.append((record["text"], record.get("status", "undone")))
+            elif section == "sessions":
+                db.add_pomodoro_session(
+                    start_time=record["start_time"],
+                    duration=record["duration"],
+                    break_duration=record["break_duration"],
+                    linked_type=record.get("linked_type", "day"),
+                    linked_id=record.get("linked_id"),
+                )
+            elif section == "settings":
+                db.set_setting(record["key"], record["value"])
+        if task_date is not None:
+            db.replace_tasks_for_date(task_date, tasks)
+
+
+@dataclass
+class RangeExport:
+    written: int
+    unchanged: int
+
+
+def render_week_markdown(week_key: str, notes: list[db.NoteEntry]) -> str:
+    # Same layout as serializeWeekMarkdown in js/utils/md.js: one "## <date>"
+    # section per day, blank line between sections, single trailing newline.
+    lines = [f"# Week {week_key}", ""]
+    for note in notes:
+        lines.append(f"## {note.date}")
+        lines.append(note.content.rstrip())
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _write_if_changed(target_path: Path, content: str) -> bool:
+    data = content.encode("utf-8")
+    try:
+        if target_path.stat().st_size == len(data) and target_path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    partial_path = target_path.with_name(target_path.name + ".part")
+    partial_path.write_bytes(data)
+    partial_path.replace(target_path)
+    return True
+
+
+@instrumented
+def export_range_to_markdown(
+    start_date: date,
+    end_date: date,
+    target_dir: Path,
+    progress: ProgressCallback | None = None,
+) -> RangeExport:
+    """Write notes between the dates as weeks/<YYYY-Www>.md files under ``target_dir``.
+
+    Notes are streamed in date order, so each week is rendered as soon as
+    its last day has been read; files whose bytes would not change are not
+    rewritten. Weeks without notes produce no file.
+    """
+    weeks_dir = target_dir / "weeks"
+    weeks_dir.mkdir(parents=True, exist_ok=True)
+    first_monday = start_date - timedelta(days=start_date.weekday())
+    total_weeks = (end_date - first_monday).days // 7 + 1
+    result = RangeExport(written=0, unchanged=0)
+    week_key: str | None = None
+    week_notes: list[db.NoteEntry] = []
+
+    def flush() -> None:
+        if week_key is None:
+            return
+        if _write_if_changed(weeks_dir / f"{week_key}.md", render_week_markdown(week_key, week_notes)):
+            result.written += 1
+        else:
+            result.unchanged += 1
+        if progress is not None:
+            done = (date.fromisoformat(week_notes[-1].date) - first_monday).days // 7 + 1
+            progress(done, total_weeks)
+
+    for note in db.iter_notes(start_date.isoformat(), end_date.isoformat()):
+        if not note.content.strip():
+            continue
+        key = iso_week_key(date.fromisoformat(note.date))
+        if key != week_key:
+            flush()
+            week_key, week_notes = key, []
+        week_notes.append(note)
+    flush()
+    if progress is not None:
+        progress(total_weeks, total_weeks)
+    return result
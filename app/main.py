@@ -1,10 +1,16 @@
 import logging
-from pathlib import Path
+import os
+import time
 
-from PySide6.QtWidgets import QApplication
+# Taken before the app's own imports so the startup report includes them.
+STARTED_AT = time.perf_counter()
 
-from app import db
-from app.ui.main_window import MainWindow
+from app import db  # noqa: E402
+from app.diagnostics import diagnostics  # noqa: E402
+
+STARTUP_PROFILE_ENV = "TASKMENEDGER_STARTUP_PROFILE"
+
+logger = logging.getLogger(__name__)
 
 
 def setup_logging() -> None:
@@ -22,11 +28,52 @@ def setup_logging() -> None:
     )
 
 
+class StartupTimer:
+    def __init__(self, enabled: bool, started_at: float) -> None:
+        self.enabled = enabled
+        self._last = started_at
+        self._started = started_at
+        self._phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self._phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self) -> None:
+        if not self.enabled:
+            return
+        total = (time.perf_counter() - self._started) * 1000
+        breakdown = ", ".join(f"{phase} {elapsed:.1f} ms" for phase, elapsed in self._phases)
+        logger.info("Startup: %s; total %.1f ms", breakdown, total)
+
+
 def main() -> None:
+    timer = StartupTimer(os.getenv(STARTUP_PROFILE_ENV) == "1", STARTED_AT)
+    timer.mark("app imports")
     setup_logging()
+    timer.mark("logging")
+    diagnostics.load_config({})
     db.init_db()
+    diagnostics.load_config(db.get_setting("diagnostics", {}))
+    timer.mark("schema check")
+
+    # Qt and the views are imported here so the schema check and logging
+    # setup do not wait on them.
+    from PySide6.QtWidgets import QApplication
+
+    from app.ui.main_window import MainWindow
+
+    timer.mark("imports")
     app = QApplication([])
     window = MainWindow()
+    timer.mark("main window")
+
+    def first_paint() -> None:
+        timer.mark("first paint")
+        timer.report()
+
+    window.first_painted.connect(first_paint)
     window.show()
     app.exec()
 
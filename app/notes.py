@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+
+def parse_tasks(content: str) -> list[tuple[str, str]]:
+    tasks: list[tuple[str, str]] = []
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("- ["):
+            status = "done" if stripped[3:4].lower() == "x" else "undone"
+            text = stripped[5:].strip()
+            if text:
+                tasks.append((text, status))
+    return tasks
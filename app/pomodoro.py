@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import math
+import time
 from dataclasses import dataclass
-from datetime import datetime
-from PySide6.QtCore import QObject, QTimer, Signal
+from datetime import datetime, timedelta
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
 
 from app import db
+from app.db_executor import get_executor
 
 
 @dataclass
@@ -14,21 +17,61 @@ class PomodoroConfig:
     long_break_minutes: int = 15
     cycles_before_long_break: int = 4
 
+    @classmethod
+    def from_setting(cls, data: dict) -> PomodoroConfig:
+        defaults = cls()
+        return cls(
+            focus_minutes=data.get("focus", defaults.focus_minutes),
+            short_break_minutes=data.get("short_break", defaults.short_break_minutes),
+            long_break_minutes=data.get("long_break", defaults.long_break_minutes),
+            cycles_before_long_break=data.get("cycles", defaults.cycles_before_long_break),
+        )
+
+    def to_setting(self) -> dict:
+        return {
+            "focus": self.focus_minutes,
+            "short_break": self.short_break_minutes,
+            "long_break": self.long_break_minutes,
+            "cycles": self.cycles_before_long_break,
+        }
+
 
 class PomodoroTimer(QObject):
+    """Runs pomodoro phases against a monotonic deadline.
+
+    The phase boundary is a single-shot timer, so an event-loop stall or a
+    sleep cannot make the countdown drift. After a stall longer than the next
+    phase (a suspended laptop), only the phase that was running is completed
+    and the timer waits, paused, at the start of the next one. Per-second
+    ``tick`` signals are only produced while at least one view has declared
+    itself visible.
+    """
+
     tick = Signal(int)
     session_complete = Signal(str)
+    config_changed = Signal()
+    _setting_received = Signal(object)
 
     def __init__(self, config: PomodoroConfig) -> None:
         super().__init__()
         self.config = config
-        self._timer = QTimer()
-        self._timer.setInterval(1000)
-        self._timer.timeout.connect(self._on_tick)
-        self._remaining = self.config.focus_minutes * 60
+        # Store listeners may run on the db writer thread; the signal hops to ours.
+        self._setting_received.connect(self._apply_setting)
+        unsubscribe = db.settings_store.subscribe("pomodoro", self._setting_received.emit)
+        self.destroyed.connect(lambda *_: unsubscribe())
+        self._phase_timer = QTimer(self)
+        self._phase_timer.setSingleShot(True)
+        self._phase_timer.setTimerType(Qt.PreciseTimer)
+        self._phase_timer.timeout.connect(self._on_phase_end)
+        self._display_timer = QTimer(self)
+        self._display_timer.setSingleShot(True)
+        self._display_timer.timeout.connect(self._on_display_tick)
+        self._remaining = self._phase_length("focus")
+        self._deadline: float | None = None
+        self._phase_started_at: datetime | None = None
         self._mode = "focus"
         self._cycles = 0
-        self._running = False
+        self._viewers = 0
         self._linked_type = "day"
         self._linked_id: str | None = None
 
@@ -40,55 +83,132 @@ class PomodoroTimer(QObject):
     def cycles(self) -> int:
         return self._cycles
 
+    @property
+    def running(self) -> bool:
+        return self._deadline is not None
+
+    def remaining_seconds(self) -> int:
+        return math.ceil(self._remaining_exact())
+
     def configure_link(self, linked_type: str, linked_id: str | None) -> None:
         self._linked_type = linked_type
         self._linked_id = linked_id
 
     def start(self) -> None:
-        if not self._running:
-            self._running = True
-            self._timer.start()
+        if self.running:
+            return
+        if self._phase_started_at is None:
+            self._phase_started_at = datetime.utcnow()
+        self._deadline = time.monotonic() + self._remaining
+        self._arm_phase_timer()
+        self._schedule_display_tick()
 
     def pause(self) -> None:
-        if self._running:
-            self._running = False
-            self._timer.stop()
+        if not self.running:
+            return
+        self._remaining = self._remaining_exact()
+        self._deadline = None
+        self._phase_timer.stop()
+        self._display_timer.stop()
 
     def reset(self) -> None:
         self.pause()
         self._mode = "focus"
-        self._remaining = self.config.focus_minutes * 60
-        self.tick.emit(self._remaining)
+        self._remaining = self._phase_length("focus")
+        self._phase_started_at = None
+        self.tick.emit(self.remaining_seconds())
+
+    def add_viewer(self) -> None:
+        self._viewers += 1
+        self.tick.emit(self.remaining_seconds())
+        self._schedule_display_tick()
+
+    def remove_viewer(self) -> None:
+        self._viewers = max(0, self._viewers - 1)
+        if not self._viewers:
+            self._display_timer.stop()
+
+    def _apply_setting(self, data: dict) -> None:
+        updated = PomodoroConfig.from_setting(data)
+        if updated == self.config:
+            return
+        # The only place config changes: it follows what was committed.
+        self.config = updated
+        self.reset()
+        self.config_changed.emit()
 
-    def _on_tick(self) -> None:
-        if self._remaining <= 0:
-            self._complete_session()
+    def _remaining_exact(self) -> float:
+        if self._deadline is None:
+            return self._remaining
+        return max(0.0, self._deadline - time.monotonic())
+
+    def _arm_phase_timer(self) -> None:
+        self._phase_timer.start(max(0, math.ceil(self._remaining_exact() * 1000)))
+
+    def _schedule_display_tick(self) -> None:
+        if not self.running or not self._viewers:
+            return
+        # Wake up right after the displayed second changes, not on a fixed grid.
+        fraction = self._remaining_exact() % 1
+        self._display_timer.start(math.ceil(fraction * 1000) or 1000)
+
+    def _on_display_tick(self) -> None:
+        self.tick.emit(self.remaining_seconds())
+        self._schedule_display_tick()
+
+    def _on_phase_end(self) -> None:
+        if self._deadline is None:
+            return
+        now = time.monotonic()
+        if self._deadline > now:
+            self._arm_phase_timer()
             return
-        self._remaining -= 1
-        self.tick.emit(self._remaining)
+        self._complete_session(datetime.utcnow() - timedelta(seconds=now - self._deadline))
+        self._deadline += self._remaining
+        if self._deadline <= now:
+            # The next phase passed entirely while nobody was there: do not
+            # record focus sessions for it, wait for the user instead.
+            self._deadline = None
+            self._phase_started_at = None
+            self._display_timer.stop()
+            self.tick.emit(self.remaining_seconds())
+            return
+        self._arm_phase_timer()
+        self.tick.emit(self.remaining_seconds())
+        self._schedule_display_tick()
 
-    def _complete_session(self) -> None:
+    def _complete_session(self, ended_at: datetime) -> None:
         if self._mode == "focus":
             self._cycles += 1
-            db.add_pomodoro_session(
-                start_time=datetime.utcnow().isoformat(),
-                duration=self.config.focus_minutes * 60,
+            duration = self.config.focus_minutes * 60
+            started_at = self._phase_started_at or ended_at - timedelta(seconds=duration)
+            get_executor().submit_write(
+                db.add_pomodoro_session,
+                start_time=started_at.isoformat(),
+                duration=duration,
                 break_duration=self._break_duration() * 60,
                 linked_type=self._linked_type,
                 linked_id=self._linked_id,
             )
             if self._cycles % self.config.cycles_before_long_break == 0:
                 self._mode = "long_break"
-                self._remaining = self.config.long_break_minutes * 60
             else:
                 self._mode = "short_break"
-                self._remaining = self.config.short_break_minutes * 60
         else:
             self._mode = "focus"
-            self._remaining = self.config.focus_minutes * 60
-        self.tick.emit(self._remaining)
+        self._remaining = self._phase_length(self._mode)
+        self._phase_started_at = ended_at
         self.session_complete.emit(self._mode)
 
+    def _phase_length(self, mode: str) -> float:
+        minutes = {
+            "focus": self.config.focus_minutes,
+            "short_break": self.config.short_break_minutes,
+            "long_break": self.config.long_break_minutes,
+        }[mode]
+        # A zero-length phase would end again as soon as it started.
+        return float(max(minutes * 60, 1))
+
     def _break_duration(self) -> int:
         if self._cycles % self.config.cycles_before_long_break == 0:
             return self.config.long_break_minutes
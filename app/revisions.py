@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+
+COALESCE_WINDOW = timedelta(minutes=10)
+SNAPSHOT_EVERY = 20
+
+
+@dataclass
+class NoteRevision:
+    id: int
+    date: str
+    created_at: str
+    updated_at: str
+    kind: str
+    stored_bytes: int
+
+
+def encode_delta(old: str, new: str) -> list:
+    """Line-level edit script turning ``old`` into ``new``.
+
+    ``n`` copies n lines, ``-n`` skips n lines and a list inserts lines.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops: list = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(new_lines[j1:j2])
+    return ops
+
+
+def apply_delta(old: str, ops: list) -> str:
+    old_lines = old.splitlines(keepends=True)
+    position = 0
+    parts: list[str] = []
+    for op in ops:
+        if isinstance(op, list):
+            parts.extend(op)
+        elif op >= 0:
+            parts.extend(old_lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def _pack(value: object) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def _unpack(data: bytes) -> object:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def _latest(conn: sqlite3.Connection, date: str) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT id, created_at, kind FROM note_revisions WHERE date = ? ORDER BY id DESC LIMIT 1",
+        (date,),
+    ).fetchone()
+
+
+def revision_text(conn: sqlite3.Connection, revision_id: int) -> str:
+    row = conn.execute("SELECT date FROM note_revisions WHERE id = ?", (revision_id,)).fetchone()
+    if row is None:
+        raise KeyError(revision_id)
+    chain = conn.execute(
+        """
+        SELECT kind, data FROM note_revisions
+        WHERE date = ? AND id <= ? AND id >= (
+            SELECT MAX(id) FROM note_revisions WHERE date = ? AND id <= ? AND kind = 'snapshot'
+        )
+        ORDER BY id
+        """,
+        (row["date"], revision_id, row["date"], revision_id),
+    ).fetchall()
+    text = ""
+    for link in chain:
+        value = _unpack(link["data"])
+        text = value if link["kind"] == "snapshot" else apply_delta(text, value)
+    return text
+
+
+def _deltas_since_snapshot(conn: sqlite3.Connection, date: str) -> int:
+    return conn.execute(
+        """
+        SELECT COUNT(*) FROM note_revisions
+        WHERE date = ? AND id > coalesce(
+            (SELECT MAX(id) FROM note_revisions WHERE date = ? AND kind = 'snapshot'), 0
+        )
+        """,
+        (date, date),
+    ).fetchone()[0]
+
+
+def _insert(
+    conn: sqlite3.Connection, date: str, created_at: str, updated_at: str, previous: str | None, content: str
+) -> None:
+    if previous is None or _deltas_since_snapshot(conn, date) >= SNAPSHOT_EVERY - 1:
+        kind, data = "snapshot", _pack(content)
+    else:
+        kind, data = "delta", _pack(encode_delta(previous, content))
+    conn.execute(
+        "INSERT INTO note_revisions(date, created_at, updated_at, kind, data) VALUES (?, ?, ?, ?, ?)",
+        (date, created_at, updated_at, kind, data),
+    )
+
+
+def record_revision(
+    conn: sqlite3.Connection,
+    date: str,
+    old_content: str | None,
+    old_updated_at: str | None,
+    content: str,
+    now: datetime,
+    coalesce: bool = True,
+) -> None:
+    """Store ``content`` as the newest revision of the note for ``date``.
+
+    An edit within COALESCE_WINDOW of the latest revision's creation
+    replaces that revision, so autosave produces at most one revision per
+    window; ``coalesce=False`` (a restore) always adds one. A note that
+    predates history gets its previous text saved first.
+    """
+    timestamp = now.isoformat()
+    latest = _latest(conn, date)
+    if latest is None:
+        if old_content is None:
+            _insert(conn, date, timestamp, timestamp, None, content)
+        else:
+            _insert(conn, date, old_updated_at or timestamp, old_updated_at or timestamp, None, old_content)
+            _insert(conn, date, timestamp, timestamp, old_content, content)
+        return
+    if coalesce and now - datetime.fromisoformat(latest["created_at"]) < COALESCE_WINDOW:
+        previous_id = conn.execute(
+            "SELECT MAX(id) FROM note_revisions WHERE date = ? AND id < ?", (date, latest["id"])
+        ).fetchone()[0]
+        if latest["kind"] == "snapshot" or previous_id is None:
+            data = _pack(content)
+        else:
+            data = _pack(encode_delta(revision_text(conn, previous_id), content))
+        conn.execute(
+            "UPDATE note_revisions SET updated_at = ?, data = ? WHERE id = ?",
+            (timestamp, data, latest["id"]),
+        )
+        return
+    _insert(conn, date, timestamp, timestamp, revision_text(conn, latest["id"]), content)
+
+
+def list_revisions(conn: sqlite3.Connection, date: str) -> list[NoteRevision]:
+    rows = conn.execute(
+        """
+        SELECT id, date, created_at, updated_at, kind, length(data) AS stored_bytes
+        FROM note_revisions WHERE date = ? ORDER BY id DESC
+        """,
+        (date,),
+    ).fetchall()
+    return [NoteRevision(**row) for row in rows]
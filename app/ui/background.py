@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from PySide6.QtCore import QObject, Signal
+
+from app.db_executor import get_executor
+
+logger = logging.getLogger(__name__)
+
+_pending: set[_Relay] = set()
+
+
+class _Relay(QObject):
+    finished = Signal(object, object)
+
+
+class ProgressRelay(QObject):
+    """Callable progress sink that worker threads can call; emits on the GUI thread."""
+
+    progress = Signal(int, int)
+
+    def __call__(self, done: int, total: int) -> None:
+        self.progress.emit(done, total)
+
+
+def run_read(
+    fn: Callable[..., Any],
+    *args: Any,
+    on_result: Callable[[Any], None] | None = None,
+    on_error: Callable[[BaseException], None] | None = None,
+    **kwargs: Any,
+) -> Future:
+    """Run a read-only db call on the reader pool and deliver its outcome on the GUI thread."""
+    return _relay(get_executor().submit_read(fn, *args, **kwargs), fn, on_result, on_error)
+
+
+def run_write(
+    fn: Callable[..., Any],
+    *args: Any,
+    on_result: Callable[[Any], None] | None = None,
+    on_error: Callable[[BaseException], None] | None = None,
+    **kwargs: Any,
+) -> Future:
+    """Queue a db write on the ordered writer thread and deliver its outcome on the GUI thread."""
+    return _relay(get_executor().submit_write(fn, *args, **kwargs), fn, on_result, on_error)
+
+
+def _relay(
+    future: Future,
+    fn: Callable[..., Any],
+    on_result: Callable[[Any], None] | None,
+    on_error: Callable[[BaseException], None] | None,
+) -> Future:
+    relay = _Relay()
+    _pending.add(relay)
+
+    def deliver(result: Any, error: BaseException | None) -> None:
+        _pending.discard(relay)
+        if error is None:
+            if on_result is not None:
+                on_result(result)
+        elif on_error is not None:
+            on_error(error)
+        else:
+            logger.error("Background call %s failed", fn.__name__, exc_info=error)
+
+    def emit(done: Future) -> None:
+        if done.cancelled():
+            _pending.discard(relay)
+            return
+        error = done.exception()
+        relay.finished.emit(None if error else done.result(), error)
+
+    # The relay lives on the GUI thread, so the emit from the worker is queued.
+    relay.finished.connect(deliver)
+    future.add_done_callback(emit)
+    return future
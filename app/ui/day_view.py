@@ -6,12 +6,17 @@ from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QLabel, QPlainTextEdit, QVBoxLayout, QWidget
 
 from app import db
+from app.notes import parse_tasks
+from app.ui.background import run_read, run_write
 
 
 class DayView(QWidget):
     def __init__(self) -> None:
         super().__init__()
         self._current_date = date.today()
+        self._saved_hash = hash("")
+        self._load_generation = 0
+        self._loading = False
         layout = QVBoxLayout(self)
         self._header = QLabel()
         self._header.setAlignment(Qt.AlignLeft)
@@ -23,22 +28,80 @@ class DayView(QWidget):
 
     def update_date(self, date_obj: date) -> None:
         self._current_date = date_obj
+        self._load_generation += 1
+        generation = self._load_generation
         self._header.setText(date_obj.strftime("%A, %d %B %Y"))
-        entry = db.fetch_note(date_obj.isoformat())
+        date_iso = date_obj.isoformat()
+        notes = db.cached_notes_range(date_iso, date_iso)
+        if notes is not None:
+            self._show_note(generation, notes.get(date_iso))
+            return
+        self._loading = True
         self._editor.blockSignals(True)
-        self._editor.setPlainText(entry.content if entry else "")
+        self._editor.clear()
         self._editor.blockSignals(False)
+        self._editor.setReadOnly(True)
+        self._editor.document().setModified(False)
+        run_read(db.fetch_note, date_iso, on_result=lambda entry: self._show_note(generation, entry))
+
+    def _show_note(self, generation: int, entry: db.NoteEntry | None) -> None:
+        if generation != self._load_generation:
+            return
+        self._loading = False
+        self._set_content(entry.content if entry else "")
+
+    def _set_content(self, content: str) -> None:
+        self._editor.blockSignals(True)
+        self._editor.setPlainText(content)
+        self._editor.blockSignals(False)
+        self._editor.setReadOnly(False)
+        self._editor.document().setModified(False)
+        self._saved_hash = hash(content)
+
+    def apply_changes(self, changes: list[db.Change]) -> None:
+        date_iso = self._current_date.isoformat()
+        if self._loading or not any(change.table == "note_entries" and change.key == date_iso for change in changes):
+            return
+        generation = self._load_generation
+        run_read(db.fetch_note, date_iso, on_result=lambda entry: self._update_note(generation, entry))
+
+    def _update_note(self, generation: int, entry: db.NoteEntry | None) -> None:
+        content = entry.content if entry else ""
+        if self._editor.document().isModified() or hash(content) == self._saved_hash:
+            return
+        self._show_note(generation, entry)
+
+    def show_note(self, date_iso: str, content: str) -> None:
+        """Replace the shown text, unsaved typing included (used after a restore)."""
+        if date_iso == self._current_date.isoformat() and not self._loading:
+            self._set_content(content)
+
+    @property
+    def current_date(self) -> date:
+        return self._current_date
 
     def save(self) -> None:
-        db.upsert_note(self._current_date.isoformat(), self._editor.toPlainText())
+        if self._loading:
+            return
+        date_iso = self._current_date.isoformat()
+        content = self._editor.toPlainText()
+        run_write(db.upsert_note, date_iso, content, on_result=lambda _: self.mark_saved({date_iso: content}))
+
+    def dirty_note(self) -> tuple[str, str] | None:
+        if self._loading or not self._editor.document().isModified():
+            return None
+        content = self._editor.toPlainText()
+        if hash(content) == self._saved_hash:
+            self._editor.document().setModified(False)
+            return None
+        return self._current_date.isoformat(), content
+
+    def mark_saved(self, notes: dict[str, str]) -> None:
+        content = notes.get(self._current_date.isoformat())
+        if content is None or content != self._editor.toPlainText():
+            return
+        self._editor.document().setModified(False)
+        self._saved_hash = hash(content)
 
     def collect_tasks(self) -> list[tuple[str, str]]:
-        tasks: list[tuple[str, str]] = []
-        for line in self._editor.toPlainText().splitlines():
-            stripped = line.strip()
-            if stripped.startswith("- ["):
-                status = "done" if stripped[3:4].lower() == "x" else "undone"
-                text = stripped[5:].strip()
-                if text:
-                    tasks.append((text, status))
-        return tasks
+        return parse_tasks(self._editor.toPlainText())
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QDialog,
+    QHBoxLayout,
+    QListWidget,
+    QListWidgetItem,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+)
+
+from app import db
+from app.ui.background import run_read, run_write
+
+REVISION_ID_ROLE = Qt.UserRole
+
+
+class NoteHistoryDialog(QDialog):
+    restored = Signal(str, str)
+
+    def __init__(self, date_iso: str, parent=None) -> None:
+        super().__init__(parent)
+        self._date = date_iso
+        self.setWindowTitle(f"История заметки {date_iso}")
+        self.resize(760, 480)
+        layout = QVBoxLayout(self)
+        panes = QHBoxLayout()
+        self._revision_list = QListWidget()
+        self._preview = QPlainTextEdit()
+        self._preview.setReadOnly(True)
+        panes.addWidget(self._revision_list, 1)
+        panes.addWidget(self._preview, 2)
+        layout.addLayout(panes)
+        self._restore_button = QPushButton("Восстановить эту версию")
+        self._restore_button.setEnabled(False)
+        layout.addWidget(self._restore_button)
+
+        self._revision_list.currentItemChanged.connect(self._show_revision)
+        self._restore_button.clicked.connect(self._restore)
+        run_read(db.list_note_revisions, date_iso, on_result=self._show_revisions)
+
+    def _show_revisions(self, revisions: list[db.NoteRevision]) -> None:
+        for revision in revisions:
+            saved_at = datetime.fromisoformat(revision.updated_at).replace(tzinfo=timezone.utc).astimezone()
+            item = QListWidgetItem(f"{saved_at:%d.%m.%Y %H:%M} • {revision.stored_bytes} Б")
+            item.setData(REVISION_ID_ROLE, revision.id)
+            self._revision_list.addItem(item)
+        if not revisions:
+            self._preview.setPlainText("Для этой даты версий пока нет.")
+
+    def _show_revision(self, item: QListWidgetItem | None) -> None:
+        self._restore_button.setEnabled(item is not None)
+        if item is not None:
+            run_read(db.get_note_revision, item.data(REVISION_ID_ROLE), on_result=self._preview.setPlainText)
+
+    def _restore(self) -> None:
+        item = self._revision_list.currentItem()
+        if item is None:
+            return
+        self._restore_button.setEnabled(False)
+        run_write(
+            db.restore_note_revision,
+            self._date,
+            item.data(REVISION_ID_ROLE),
+            on_result=self._restored,
+        )
+
+    def _restored(self, content: str) -> None:
+        self.restored.emit(self._date, content)
+        self.accept()
@@ -1,20 +1,206 @@
 from __future__ import annotations
 
+import html
+import logging
+import threading
 from datetime import date
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QRectF, Qt, QTimer, Signal
+from PySide6.QtGui import QPalette, QTextDocument, QTextOption
 from PySide6.QtWidgets import (
+    QApplication,
     QHBoxLayout,
     QLabel,
     QLineEdit,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QPushButton,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
     QVBoxLayout,
     QWidget,
 )
 
 from app import db
+from app.ui.background import run_read
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 200
+SEARCH_DEBOUNCE_MS = 250
+# Snippet marks around matched words; control characters cannot clash with
+# the "**" a note may contain itself.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+class NoteListModel(QAbstractListModel):
+    more_requested = Signal(int)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rows: list[db.NotePreview] = []
+        self._exhausted = False
+        self._searching = False
+        self._loading = False
+        self._tooltips: dict[str, str] = {}
+        self._tooltips_loading: set[str] = set()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: N802
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{row.date} — {row.preview}"
+        if role == Qt.ToolTipRole:
+            return self._tooltip(row.date)
+        if role == Qt.UserRole:
+            return row.date
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignLeft
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # noqa: N802
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:  # noqa: N802
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        # Pages are loaded off the GUI thread by the owning view.
+        self._loading = True
+        self.more_requested.emit(len(self._rows))
+
+    @property
+    def searching(self) -> bool:
+        return self._searching
+
+    def last_date(self) -> str | None:
+        return self._rows[-1].date if self._rows else None
+
+    def append_rows(self, page: list[db.NotePreview], page_size: int) -> None:
+        self._loading = False
+        if len(page) < page_size:
+            self._exhausted = True
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    def apply_previews(self, previews: dict[str, db.NotePreview | None]) -> None:
+        """Update, insert or remove the rows of changed dates in place."""
+        for entry_date, preview in previews.items():
+            self._tooltips.pop(entry_date, None)
+            self._tooltips_loading.discard(entry_date)
+            row = self._position(entry_date)
+            if row < len(self._rows) and self._rows[row].date == entry_date:
+                if preview is None:
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    del self._rows[row]
+                    self.endRemoveRows()
+                else:
+                    self._rows[row] = preview
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index)
+            elif preview is not None and (row < len(self._rows) or self._exhausted):
+                # Dates past the last loaded row arrive with the next page.
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._rows.insert(row, preview)
+                self.endInsertRows()
+
+    def _position(self, entry_date: str) -> int:
+        # Rows are sorted by date, newest first.
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self._rows[middle].date > entry_date:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def reload(self) -> None:
+        self._reset(searching=False)
+        self.fetchMore()
+
+    def show_search_page(self, page: list[db.NotePreview]) -> None:
+        self._reset(searching=True)
+        self.append_rows(page, db.SEARCH_PAGE_SIZE)
+
+    def stop_loading(self) -> None:
+        self._loading = False
+        self._exhausted = True
+
+    def _reset(self, searching: bool) -> None:
+        self.beginResetModel()
+        self._rows = []
+        self._tooltips = {}
+        self._tooltips_loading = set()
+        self._exhausted = False
+        self._loading = False
+        self._searching = searching
+        self.endResetModel()
+
+    def _tooltip(self, entry_date: str) -> str:
+        if entry_date in self._tooltips:
+            return self._tooltips[entry_date]
+        # data() runs on the GUI thread; the note (possibly in an archive) is
+        # read in the background and the tooltip refreshed when it arrives.
+        if entry_date not in self._tooltips_loading:
+            self._tooltips_loading.add(entry_date)
+            run_read(db.fetch_note, entry_date, on_result=lambda entry: self._show_tooltip(entry_date, entry))
+        return "Загрузка…"
+
+    def _show_tooltip(self, entry_date: str, entry: db.NoteEntry | None) -> None:
+        # Dropped if the note changed or the model was reset while loading.
+        if entry_date not in self._tooltips_loading:
+            return
+        self._tooltips_loading.discard(entry_date)
+        self._tooltips[entry_date] = entry.content if entry else ""
+        if self._searching:
+            # Search hits are ordered by rank, so _position does not apply.
+            rows = [row for row, preview in enumerate(self._rows) if preview.date == entry_date]
+        else:
+            row = self._position(entry_date)
+            rows = [row] if row < len(self._rows) and self._rows[row].date == entry_date else []
+        for row in rows:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ToolTipRole])
+
+
+class SnippetDelegate(QStyledItemDelegate):
+    """Draws the matched words of search snippets in bold."""
+
+    def paint(self, painter, option, index) -> None:
+        text = index.data(Qt.DisplayRole)
+        if MATCH_START not in text:
+            super().paint(painter, option, index)
+            return
+        options = QStyleOptionViewItem(option)
+        self.initStyleOption(options, index)
+        options.text = ""
+        style = options.widget.style() if options.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, options, painter, options.widget)
+        role = QPalette.HighlightedText if options.state & QStyle.State_Selected else QPalette.Text
+        document = QTextDocument()
+        document.setDocumentMargin(0)
+        document.setDefaultFont(options.font)
+        document.setDefaultTextOption(QTextOption(Qt.AlignLeft))
+        document.setDefaultStyleSheet(f"body {{ color: {options.palette.color(role).name()}; white-space: pre; }}")
+        document.setHtml(
+            "<body>" + html.escape(text).replace(MATCH_START, "<b>").replace(MATCH_END, "</b>") + "</body>"
+        )
+        rect = style.subElementRect(QStyle.SE_ItemViewItemText, options, options.widget)
+        painter.save()
+        painter.translate(rect.left(), rect.top() + (rect.height() - document.size().height()) / 2)
+        document.drawContents(painter, QRectF(0, 0, rect.width(), rect.height()))
+        painter.restore()
 
 
 class ListView(QWidget):
@@ -31,32 +217,109 @@ class ListView(QWidget):
         filters.addWidget(self._search_button)
         filters.addWidget(self._reset_button)
         layout.addLayout(filters)
-        self._list = QListWidget()
+        self._model = NoteListModel()
+        self._list = QListView()
+        self._list.setUniformItemSizes(True)
+        self._list.setModel(self._model)
+        self._list.setItemDelegate(SnippetDelegate(self._list))
         layout.addWidget(self._list)
+        self._search_generation = 0
+        self._search_cancel = threading.Event()
+        self._search_query = ""
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._perform_search)
         self._search_button.clicked.connect(self._perform_search)
-        self._reset_button.clicked.connect(self.refresh)
+        self._reset_button.clicked.connect(self._reset_search)
         self._search_input.returnPressed.connect(self._perform_search)
+        self._search_input.textChanged.connect(lambda _text: self._debounce.start())
+        self._model.more_requested.connect(self._load_more)
         self.refresh()
 
+    def selected_date(self) -> date | None:
+        index = self._list.currentIndex()
+        return date.fromisoformat(index.data(Qt.UserRole)) if index.isValid() else None
+
     def refresh(self) -> None:
-        self._list.clear()
-        for entry in db.list_notes():
-            self._list.addItem(self._format_entry(entry.date, entry.content))
+        self._cancel_search()
+        self._model.reload()
+
+    def apply_changes(self, changes: list[db.Change]) -> None:
+        # Search results are ranked, not dated; they stay as found until the next search.
+        dates = sorted({change.key for change in changes if change.table == "note_entries"})
+        if not dates or self._model.searching:
+            return
+        generation = self._search_generation
+        run_read(db.note_previews_for, dates, on_result=lambda previews: self._show_previews(generation, previews))
+
+    def _show_previews(self, generation: int, previews: dict[str, db.NotePreview | None]) -> None:
+        if generation == self._search_generation:
+            self._model.apply_previews(previews)
+
+    def _reset_search(self) -> None:
+        self._search_input.blockSignals(True)
+        self._search_input.clear()
+        self._search_input.blockSignals(False)
+        self.refresh()
 
     def _perform_search(self) -> None:
+        self._debounce.stop()
         query = self._search_input.text().strip()
         if not query:
             self.refresh()
             return
-        self._list.clear()
-        for entry in db.search_notes(query):
-            self._list.addItem(self._format_entry(entry.date, entry.content))
-
-    @staticmethod
-    def _format_entry(entry_date: str, content: str) -> QListWidgetItem:
-        preview = content.strip().replace("\n", " ")[:120]
-        label = f"{entry_date} — {preview}"
-        item = QListWidgetItem(label)
-        item.setToolTip(content)
-        item.setTextAlignment(Qt.AlignLeft)
-        return item
+        self._search_query = query
+        self._start_search(0)
+
+    def _load_more(self, offset: int) -> None:
+        if self._model.searching:
+            self._start_search(offset)
+            return
+        generation = self._search_generation
+        run_read(
+            db.list_note_previews,
+            self._model.last_date(),
+            PAGE_SIZE,
+            on_result=lambda page: self._show_page(generation, page),
+            on_error=lambda error: self._load_failed(generation, error),
+        )
+
+    def _show_page(self, generation: int, page: list[db.NotePreview]) -> None:
+        if generation == self._search_generation:
+            self._model.append_rows(page, PAGE_SIZE)
+
+    def _start_search(self, offset: int) -> None:
+        self._cancel_search()
+        generation = self._search_generation
+        run_read(
+            db.search_notes_page,
+            self._search_query,
+            db.SEARCH_PAGE_SIZE,
+            offset,
+            cancel=self._search_cancel,
+            marks=(MATCH_START, MATCH_END),
+            on_result=lambda hits: self._show_results(generation, offset, hits),
+            on_error=lambda error: self._load_failed(generation, error),
+        )
+
+    def _cancel_search(self) -> None:
+        # Stale queries are interrupted in SQLite and their results ignored.
+        self._search_cancel.set()
+        self._search_cancel = threading.Event()
+        self._search_generation += 1
+
+    def _show_results(self, generation: int, offset: int, hits: list[db.SearchHit]) -> None:
+        if generation != self._search_generation:
+            return
+        page = [db.NotePreview(hit.date, hit.snippet.replace("\n", " "), "") for hit in hits]
+        if offset == 0:
+            self._model.show_search_page(page)
+        else:
+            self._model.append_rows(page, db.SEARCH_PAGE_SIZE)
+
+    def _load_failed(self, generation: int, error: BaseException) -> None:
+        if generation != self._search_generation:
+            return
+        logger.error("Loading the note list failed", exc_info=error)
+        self._model.stop_loading()
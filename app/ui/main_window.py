@@ -1,193 +1,596 @@
-diff --git a/app/ui/main_window.py b/app/ui/main_window.py
-index 67dbe568f86ef0f5feaf9187fc5e77c642289672..f082eb10122eee126dbd68c3e99bdd243c8ab176 100644
---- a/app/ui/main_window.py
-+++ b/app/ui/main_window.py
-@@ -1,111 +1,185 @@
- from __future__ import annotations
- 
- import logging
- from datetime import date, timedelta
- from pathlib import Path
- 
--from PySide6.QtCore import QDate, QTimer
--from PySide6.QtGui import QKeySequence, QAction
-+from PySide6.QtCore import QDate, Qt, QTimer
-+from PySide6.QtGui import QAction, QKeySequence, QShortcut
- from PySide6.QtWidgets import (
-     QFileDialog,
-+    QDialog,
-     QMainWindow,
--    QShortcut,
-     QTabWidget,
-     QToolBar,
-+    QToolButton,
-+    QVBoxLayout,
- )
- 
- from app import db
- from app.exporter import export_database_to_json, export_week_to_markdown, import_database_from_json
- from app.pomodoro import PomodoroConfig
- from app.ui.day_view import DayView
- from app.ui.list_view import ListView
- from app.ui.pomodoro_view import PomodoroView
- from app.ui.week_view import WeekView
- 
- logger = logging.getLogger(__name__)
- 
- 
- class MainWindow(QMainWindow):
-     def __init__(self) -> None:
-         super().__init__()
-         self.setWindowTitle("Заметки/Планер + Помодоро")
-         self.resize(1200, 720)
-         self._current_week_start = WeekView.week_start_for(date.today())
- 
-         self._tabs = QTabWidget()
-         self._week_view = WeekView()
-         self._day_view = DayView()
-         self._list_view = ListView()
-         config = self._load_pomodoro_config()
-         self._pomodoro_view = PomodoroView(config)
- 
-         self._tabs.addTab(self._week_view, "Неделя")
-         self._tabs.addTab(self._day_view, "День")
-         self._tabs.addTab(self._list_view, "Список")
-         self._tabs.addTab(self._pomodoro_view, "Помодоро")
-         self.setCentralWidget(self._tabs)
- 
-         self._build_toolbar()
-+        self._apply_theme()
-         self._week_view.set_week(self._current_week_start)
-         self._day_view.update_date(date.today())
- 
-         self._autosave_timer = QTimer(self)
-         self._autosave_timer.setInterval(5000)
-         self._autosave_timer.timeout.connect(self.save_all)
-         self._autosave_timer.start()
- 
-         self._bind_shortcuts()
- 
-     def _build_toolbar(self) -> None:
-         toolbar = QToolBar("Навигация")
-+        toolbar.setMovable(False)
-         self.addToolBar(toolbar)
- 
-         prev_action = QAction("← Неделя", self)
-         next_action = QAction("Неделя →", self)
-         today_action = QAction("Сегодня", self)
-         export_action = QAction("Экспорт недели", self)
-         export_all_action = QAction("Экспорт JSON", self)
-         import_action = QAction("Импорт JSON", self)
-         backup_action = QAction("Резервная копия", self)
-+        pomodoro_action = QAction("Помодоро", self)
-+        pomodoro_action.triggered.connect(self._open_pomodoro_popup)
- 
-         prev_action.triggered.connect(self.prev_week)
-         next_action.triggered.connect(self.next_week)
-         today_action.triggered.connect(self.go_today)
-         export_action.triggered.connect(self.export_week)
-         export_all_action.triggered.connect(self.export_json)
-         import_action.triggered.connect(self.import_json)
-         backup_action.triggered.connect(self.backup_database)
- 
-         toolbar.addAction(prev_action)
-         toolbar.addAction(next_action)
-         toolbar.addAction(today_action)
-         toolbar.addSeparator()
-         toolbar.addAction(export_action)
-         toolbar.addAction(export_all_action)
-         toolbar.addAction(import_action)
-         toolbar.addAction(backup_action)
-+        toolbar.addSeparator()
-+
-+        pomodoro_button = QToolButton(self)
-+        pomodoro_button.setDefaultAction(pomodoro_action)
-+        pomodoro_button.setText("🍅")
-+        pomodoro_button.setToolTip("Помодоро")
-+        pomodoro_button.setStyleSheet("font-size: 18px;")
-+        toolbar.addWidget(pomodoro_button)
-+
-+    def _open_pomodoro_popup(self) -> None:
-+        dialog = QDialog(self)
-+        dialog.setWindowTitle("Помодоро")
-+        dialog.setMinimumSize(420, 520)
-+        dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
-+        layout = QVBoxLayout(dialog)
-+        config = self._load_pomodoro_config()
-+        popup_view = PomodoroView(config, enable_tray=False)
-+        layout.addWidget(popup_view)
-+        dialog.exec()
-+
-+    def _apply_theme(self) -> None:
-+        self.setStyleSheet(
-+            """
-+            QMainWindow {
-+                background-color: #f6f7fb;
-+            }
-+            QToolBar {
-+                background: #ffffff;
-+                border-bottom: 1px solid #e3e6ee;
-+                spacing: 8px;
-+                padding: 6px;
-+            }
-+            QToolButton, QPushButton {
-+                background: #ffffff;
-+                border: 1px solid #d7dbe7;
-+                border-radius: 8px;
-+                padding: 6px 12px;
-+            }
-+            QToolButton:hover, QPushButton:hover {
-+                background: #f0f3fb;
-+            }
-+            QTabWidget::pane {
-+                border: 1px solid #e3e6ee;
-+                border-radius: 10px;
-+                background: #ffffff;
-+            }
-+            QTabBar::tab {
-+                background: #eef1f8;
-+                border: 1px solid #d7dbe7;
-+                border-radius: 8px;
-+                padding: 6px 12px;
-+                margin: 4px;
-+            }
-+            QTabBar::tab:selected {
-+                background: #ffffff;
-+                border: 1px solid #c9cfe0;
-+            }
-+            QLabel {
-+                color: #1f2430;
-+            }
-+            QLineEdit, QListWidget, QSpinBox, QComboBox {
-+                background: #ffffff;
-+                border: 1px solid #d7dbe7;
-+                border-radius: 8px;
-+                padding: 6px;
-+            }
-+            """
-+        )
- 
-     def _bind_shortcuts(self) -> None:
-         QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_all)
-         QShortcut(QKeySequence("Ctrl+F"), self, activated=self._focus_search)
-         QShortcut(QKeySequence("Ctrl+Z"), self, activated=self._undo)
-         QShortcut(QKeySequence("Ctrl+Enter"), self, activated=self._insert_newline)
- 
-     def _focus_search(self) -> None:
-         self._tabs.setCurrentWidget(self._list_view)
-         self._list_view.setFocus()
- 
-     def _undo(self) -> None:
-         widget = self.focusWidget()
-         if hasattr(widget, "undo"):
-             widget.undo()
- 
-     def _insert_newline(self) -> None:
-         widget = self.focusWidget()
-         if hasattr(widget, "insertPlainText"):
-             widget.insertPlainText("\n")
- 
-     def prev_week(self) -> None:
-         self.save_all()
-         self._current_week_start -= timedelta(days=7)
-         self._week_view.set_week(self._current_week_start)
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+from pathlib import Path
+
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import QDate, Qt, QTimer, Signal
+from PySide6.QtGui import QAction, QKeySequence, QShortcut
+from PySide6.QtWidgets import (
+    QDateEdit,
+    QDialogButtonBox,
+    QFileDialog,
+    QDialog,
+    QFormLayout,
+    QMainWindow,
+    QPlainTextEdit,
+    QPushButton,
+    QTabWidget,
+    QToolBar,
+    QToolButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from app import db, vault
+from app.archive import ArchiveConfig
+from app.backup import BackupConfig, create_backup
+from app.change_watch import ChangeWatcher
+from app.db_executor import get_executor
+from app.diagnostics import diagnostics
+from app.exporter import (
+    RangeExport,
+    export_database_to_json,
+    export_database_to_ndjson,
+    export_range_to_markdown,
+    export_week_to_markdown,
+    import_database_from_json,
+)
+from app.notes import parse_tasks
+from app.pomodoro import PomodoroConfig, PomodoroTimer
+from app.ui.background import ProgressRelay, run_read, run_write
+from app.ui.week_view import WeekView
+from app.vault_sync import VaultSync
+
+if TYPE_CHECKING:
+    from app.ui.day_view import DayView
+    from app.ui.list_view import ListView
+    from app.ui.pomodoro_view import PomodoroView
+    from app.ui.vault_view import VaultView
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_CHECK_MS = 15_000
+
+
+class MainWindow(QMainWindow):
+    vault_changed = Signal(object)
+    data_changed = Signal(object)
+    first_painted = Signal()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setWindowTitle("Заметки/Планер + Помодоро")
+        self._painted = False
+        self.resize(1200, 720)
+        self._current_week_start = WeekView.week_start_for(date.today())
+
+        self._tabs = QTabWidget()
+        self._week_view = WeekView()
+        self._day_view: DayView | None = None
+        self._list_view: ListView | None = None
+        self._pomodoro_view: PomodoroView | None = None
+        self._vault_view: VaultView | None = None
+        self._vault_sync: VaultSync | None = None
+        self.vault_changed.connect(self._vault_indexed)
+        self._pomodoro_timer = PomodoroTimer(self._load_pomodoro_config())
+
+        # Only the week tab is visible at startup; the others are built the
+        # first time they are opened.
+        self.data_changed.connect(self._week_view.apply_changes)
+        self._tabs.addTab(self._week_view, "Неделя")
+        day_tab = self._add_placeholder_tab("День")
+        self._list_tab = self._add_placeholder_tab("Список")
+        self._lazy_tabs = {
+            day_tab: self._create_day_view,
+            self._list_tab: self._create_list_view,
+            self._add_placeholder_tab("Помодоро"): self._create_pomodoro_view,
+            self._add_placeholder_tab("Vault"): self._create_vault_view,
+        }
+        self._tabs.currentChanged.connect(self._ensure_tab)
+        self.setCentralWidget(self._tabs)
+
+        self._build_toolbar()
+        self._apply_theme()
+        self._week_view.set_week(self._current_week_start)
+
+        self._autosave_timer = QTimer(self)
+        self._autosave_timer.setInterval(5000)
+        self._autosave_timer.timeout.connect(self.save_all)
+        self._autosave_timer.start()
+
+        # Checked often, but db.checkpoint_if_idle only copies the WAL back
+        # once writes have paused for a while.
+        self._checkpoint_timer = QTimer(self)
+        self._checkpoint_timer.setInterval(CHECKPOINT_CHECK_MS)
+        self._checkpoint_timer.timeout.connect(lambda: run_write(db.checkpoint_if_idle))
+        self._checkpoint_timer.start()
+
+        self._backup_running = False
+        self._backup_config = BackupConfig.from_setting(db.get_setting("backup", {}))
+        self._backup_timer = QTimer(self)
+        self._backup_timer.setInterval(max(1, self._backup_config.interval_minutes) * 60_000)
+        self._backup_timer.timeout.connect(self._scheduled_backup)
+        if self._backup_config.interval_minutes > 0:
+            self._backup_timer.start()
+
+        self._bind_shortcuts()
+        self._start_vault_sync()
+        # Queued behind the first writes; views pick up the moved rows through the change watcher.
+        archive_config = ArchiveConfig.from_setting(db.get_setting("archive", {}))
+        if archive_config.keep_years > 0:
+            run_write(db.archive_old_data, archive_config, on_result=self._archived)
+        # Views update only the dates and sessions that changed, whether the
+        # write came from this window, the CLI or another instance.
+        self._change_watcher = ChangeWatcher(self.data_changed.emit)
+        self._change_watcher.start()
+
+    def _add_placeholder_tab(self, title: str) -> QWidget:
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self._tabs.addTab(placeholder, title)
+        return placeholder
+
+    def _ensure_tab(self, index: int) -> None:
+        placeholder = self._tabs.widget(index)
+        factory = self._lazy_tabs.pop(placeholder, None)
+        if factory is not None:
+            placeholder.layout().addWidget(factory())
+
+    def _create_day_view(self) -> QWidget:
+        from app.ui.day_view import DayView
+
+        self._day_view = DayView()
+        self._day_view.update_date(date.today())
+        self.data_changed.connect(self._day_view.apply_changes)
+        return self._day_view
+
+    def _create_list_view(self) -> QWidget:
+        from app.ui.list_view import ListView
+
+        self._list_view = ListView()
+        self.data_changed.connect(self._list_view.apply_changes)
+        return self._list_view
+
+    def _create_pomodoro_view(self) -> QWidget:
+        from app.ui.pomodoro_view import PomodoroView
+
+        self._pomodoro_view = PomodoroView(self._pomodoro_timer.config, timer=self._pomodoro_timer)
+        self.data_changed.connect(self._pomodoro_view.apply_changes)
+        return self._pomodoro_view
+
+    def _create_vault_view(self) -> QWidget:
+        from app.ui.vault_view import VaultView
+
+        self._vault_view = VaultView(self._vault_sync)
+        return self._vault_view
+
+    def _build_toolbar(self) -> None:
+        toolbar = QToolBar("Навигация")
+        toolbar.setMovable(False)
+        self.addToolBar(toolbar)
+
+        prev_action = QAction("← Неделя", self)
+        next_action = QAction("Неделя →", self)
+        today_action = QAction("Сегодня", self)
+        carry_over_action = QAction("Перенести незавершённые", self)
+        carry_over_action.setToolTip("Перенести все незавершённые задачи прошлых дней на сегодня")
+        history_action = QAction("История", self)
+        history_action.setToolTip("Версии заметки выбранного дня")
+        export_action = QAction("Экспорт недели", self)
+        export_range_action = QAction("Экспорт периода", self)
+        self._export_range_action = export_range_action
+        export_all_action = QAction("Экспорт JSON", self)
+        self._export_all_action = export_all_action
+        import_action = QAction("Импорт JSON", self)
+        backup_action = QAction("Резервная копия", self)
+        self._backup_action = backup_action
+        vault_action = QAction("Vault", self)
+        vault_action.triggered.connect(self.choose_vault)
+        diagnostics_action = QAction("Диагностика", self)
+        diagnostics_action.triggered.connect(self._open_diagnostics)
+        pomodoro_action = QAction("Помодоро", self)
+        pomodoro_action.triggered.connect(self._open_pomodoro_popup)
+
+        prev_action.triggered.connect(self.prev_week)
+        next_action.triggered.connect(self.next_week)
+        today_action.triggered.connect(self.go_today)
+        carry_over_action.triggered.connect(self.carry_over_tasks)
+        history_action.triggered.connect(self.show_note_history)
+        export_action.triggered.connect(self.export_week)
+        export_range_action.triggered.connect(self.export_range)
+        export_all_action.triggered.connect(self.export_json)
+        import_action.triggered.connect(self.import_json)
+        backup_action.triggered.connect(self.backup_database)
+
+        toolbar.addAction(prev_action)
+        toolbar.addAction(next_action)
+        toolbar.addAction(today_action)
+        toolbar.addAction(carry_over_action)
+        toolbar.addAction(history_action)
+        toolbar.addSeparator()
+        toolbar.addAction(export_action)
+        toolbar.addAction(export_range_action)
+        toolbar.addAction(export_all_action)
+        toolbar.addAction(import_action)
+        toolbar.addAction(backup_action)
+        toolbar.addAction(vault_action)
+        toolbar.addAction(diagnostics_action)
+        toolbar.addSeparator()
+
+        pomodoro_button = QToolButton(self)
+        pomodoro_button.setDefaultAction(pomodoro_action)
+        pomodoro_button.setText("🍅")
+        pomodoro_button.setToolTip("Помодоро")
+        pomodoro_button.setStyleSheet("font-size: 18px;")
+        toolbar.addWidget(pomodoro_button)
+
+    def _open_pomodoro_popup(self) -> None:
+        from app.ui.pomodoro_view import PomodoroView
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Помодоро")
+        dialog.setMinimumSize(420, 520)
+        dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        layout = QVBoxLayout(dialog)
+        popup_view = PomodoroView(self._pomodoro_timer.config, enable_tray=False, timer=self._pomodoro_timer)
+        self.data_changed.connect(popup_view.apply_changes)
+        layout.addWidget(popup_view)
+        dialog.exec()
+
+    def _open_diagnostics(self) -> None:
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Диагностика БД")
+        dialog.resize(900, 520)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        layout = QVBoxLayout(dialog)
+        report = QPlainTextEdit()
+        report.setReadOnly(True)
+        report.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        report.setStyleSheet("font-family: monospace;")
+        report.setPlainText(diagnostics.report())
+        layout.addWidget(report)
+        refresh_button = QPushButton("Обновить")
+        refresh_button.clicked.connect(lambda: report.setPlainText(diagnostics.report()))
+        dump_button = QPushButton("Записать в лог")
+        dump_button.clicked.connect(diagnostics.dump_to_log)
+        layout.addWidget(refresh_button)
+        layout.addWidget(dump_button)
+        dialog.show()
+
+    def _apply_theme(self) -> None:
+        self.setStyleSheet(
+            """
+            QMainWindow {
+                background-color: #f6f7fb;
+            }
+            QToolBar {
+                background: #ffffff;
+                border-bottom: 1px solid #e3e6ee;
+                spacing: 8px;
+                padding: 6px;
+            }
+            QToolButton, QPushButton {
+                background: #ffffff;
+                border: 1px solid #d7dbe7;
+                border-radius: 8px;
+                padding: 6px 12px;
+            }
+            QToolButton:hover, QPushButton:hover {
+                background: #f0f3fb;
+            }
+            QTabWidget::pane {
+                border: 1px solid #e3e6ee;
+                border-radius: 10px;
+                background: #ffffff;
+            }
+            QTabBar::tab {
+                background: #eef1f8;
+                border: 1px solid #d7dbe7;
+                border-radius: 8px;
+                padding: 6px 12px;
+                margin: 4px;
+            }
+            QTabBar::tab:selected {
+                background: #ffffff;
+                border: 1px solid #c9cfe0;
+            }
+            QLabel {
+                color: #1f2430;
+            }
+            QLineEdit, QListView, QSpinBox, QComboBox {
+                background: #ffffff;
+                border: 1px solid #d7dbe7;
+                border-radius: 8px;
+                padding: 6px;
+            }
+            """
+        )
+
+    def _bind_shortcuts(self) -> None:
+        QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_all)
+        QShortcut(QKeySequence("Ctrl+F"), self, activated=self._focus_search)
+        QShortcut(QKeySequence("Ctrl+Z"), self, activated=self._undo)
+        QShortcut(QKeySequence("Ctrl+Enter"), self, activated=self._insert_newline)
+
+    def _focus_search(self) -> None:
+        self._tabs.setCurrentWidget(self._list_tab)
+        self._list_view.setFocus()
+
+    def _undo(self) -> None:
+        widget = self.focusWidget()
+        if hasattr(widget, "undo"):
+            widget.undo()
+
+    def _insert_newline(self) -> None:
+        widget = self.focusWidget()
+        if hasattr(widget, "insertPlainText"):
+            widget.insertPlainText("\n")
+
+    def prev_week(self) -> None:
+        self.save_all()
+        self._current_week_start -= timedelta(days=7)
+        self._week_view.set_week(self._current_week_start)
+
+    def next_week(self) -> None:
+        self.save_all()
+        self._current_week_start += timedelta(days=7)
+        self._week_view.set_week(self._current_week_start)
+
+    def go_today(self) -> None:
+        self.save_all()
+        today = date.today()
+        self._current_week_start = WeekView.week_start_for(today)
+        self._week_view.set_week(self._current_week_start)
+        if self._day_view is not None:
+            self._day_view.update_date(today)
+        self._week_view.focus_day(today)
+
+    def carry_over_tasks(self) -> None:
+        self.save_all()
+        run_write(db.carry_over_undone, on_result=self._tasks_carried_over)
+
+    def _archived(self, moved: int) -> None:
+        if moved:
+            self.statusBar().showMessage(f"Перенесено в архив записей: {moved}", 5000)
+
+    def _tasks_carried_over(self, count: int) -> None:
+        self.statusBar().showMessage(f"Перенесено задач на сегодня: {count}", 5000)
+
+    def show_note_history(self) -> None:
+        from app.ui.history_dialog import NoteHistoryDialog
+
+        self.save_all()
+        dialog = NoteHistoryDialog(self._selected_date().isoformat(), self)
+        dialog.restored.connect(self._note_restored)
+        dialog.exec()
+
+    def _selected_date(self) -> date:
+        current = self._tabs.currentWidget()
+        if current is self._week_view:
+            return self._week_view.selected_date()
+        if self._list_view is not None and current.isAncestorOf(self._list_view):
+            selected = self._list_view.selected_date()
+            if selected is not None:
+                return selected
+        if self._day_view is not None:
+            return self._day_view.current_date
+        return date.today()
+
+    def _note_restored(self, date_iso: str, content: str) -> None:
+        # The change watcher would skip editors with unsaved typing; a restore overrides it.
+        self._week_view.show_note(date_iso, content)
+        if self._day_view is not None:
+            self._day_view.show_note(date_iso, content)
+
+    def save_all(self) -> None:
+        notes = self._week_view.dirty_notes()
+        day_note = self._day_view.dirty_note() if self._day_view is not None else None
+        if day_note:
+            notes[day_note[0]] = day_note[1]
+        if not notes:
+            return
+        tasks = {note_date: parse_tasks(content) for note_date, content in notes.items()}
+        run_write(db.save_notes, notes, tasks, on_result=lambda _: self._mark_saved(notes))
+
+    def _mark_saved(self, notes: dict[str, str]) -> None:
+        self._week_view.mark_saved(notes)
+        if self._day_view is not None:
+            self._day_view.mark_saved(notes)
+
+    def export_week(self) -> None:
+        self.save_all()
+        default_name = f"week_{self._current_week_start.isoformat()}.md"
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт недели", default_name, "Markdown (*.md)")
+        if not path:
+            return
+        run_read(export_week_to_markdown, self._current_week_start, Path(path))
+
+    def export_range(self) -> None:
+        self.save_all()
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Экспорт периода")
+        form = QFormLayout(dialog)
+        year = date.today().year
+        start_edit = QDateEdit(QDate(year, 1, 1))
+        end_edit = QDateEdit(QDate(year, 12, 31))
+        for edit in (start_edit, end_edit):
+            edit.setCalendarPopup(True)
+        form.addRow("С:", start_edit)
+        form.addRow("По:", end_edit)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        start, end = start_edit.date().toPython(), end_edit.date().toPython()
+        if start > end:
+            start, end = end, start
+        path = QFileDialog.getExistingDirectory(self, "Папка для weeks/")
+        if not path:
+            return
+        progress = ProgressRelay(self)
+        progress.progress.connect(self._show_range_export_progress)
+        self._export_range_action.setEnabled(False)
+        run_read(
+            export_range_to_markdown,
+            start,
+            end,
+            Path(path),
+            progress,
+            on_result=lambda result: self._range_export_finished(progress, result),
+            on_error=lambda error: self._range_export_finished(progress, None, error),
+        )
+
+    def _show_range_export_progress(self, done: int, total: int) -> None:
+        percent = 100 if total == 0 else done * 100 // total
+        self._export_range_action.setText(f"Экспорт периода {percent}%")
+
+    def _range_export_finished(
+        self, progress: ProgressRelay, result: RangeExport | None, error: BaseException | None = None
+    ) -> None:
+        progress.deleteLater()
+        self._export_range_action.setText("Экспорт периода")
+        self._export_range_action.setEnabled(True)
+        if error is not None:
+            logger.error("Range export failed", exc_info=error)
+            self.statusBar().showMessage("Экспорт не удался", 5000)
+        else:
+            self.statusBar().showMessage(
+                f"Недель записано: {result.written}, без изменений: {result.unchanged}", 5000
+            )
+
+    def export_json(self) -> None:
+        self.save_all()
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт JSON", "planner.json", "JSON (*.json);;NDJSON (*.ndjson)"
+        )
+        if not path:
+            return
+        target = Path(path)
+        exporter = export_database_to_ndjson if target.suffix == ".ndjson" else export_database_to_json
+        progress = ProgressRelay(self)
+        progress.progress.connect(self._show_export_progress)
+        self._export_all_action.setEnabled(False)
+        run_read(
+            exporter,
+            target,
+            progress,
+            on_result=lambda _: self._export_finished(progress),
+            on_error=lambda error: self._export_finished(progress, error),
+        )
+
+    def _show_export_progress(self, done: int, total: int) -> None:
+        percent = 100 if total == 0 else done * 100 // total
+        self._export_all_action.setText(f"Экспорт JSON {percent}%")
+
+    def _export_finished(self, progress: ProgressRelay, error: BaseException | None = None) -> None:
+        progress.deleteLater()
+        self._export_all_action.setText("Экспорт JSON")
+        self._export_all_action.setEnabled(True)
+        if error is not None:
+            logger.error("Export failed", exc_info=error)
+            self.statusBar().showMessage("Экспорт не удался", 5000)
+
+    def import_json(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт JSON", "", "JSON (*.json *.ndjson)")
+        if not path:
+            return
+        run_write(import_database_from_json, Path(path))
+
+    def backup_database(self) -> None:
+        self.save_all()
+        self._start_backup(skip_unchanged=False)
+
+    def _scheduled_backup(self) -> None:
+        self.save_all()
+        self._start_backup(skip_unchanged=True)
+
+    def _start_backup(self, skip_unchanged: bool) -> None:
+        if self._backup_running:
+            return
+        self._backup_running = True
+        self._backup_action.setEnabled(False)
+        progress = ProgressRelay(self)
+        progress.progress.connect(self._show_backup_progress)
+        run_read(
+            create_backup,
+            self._backup_config,
+            progress,
+            skip_unchanged=skip_unchanged,
+            on_result=lambda backup_path: self._backup_finished(progress, backup_path),
+            on_error=lambda error: self._backup_finished(progress, None, error),
+        )
+
+    def _show_backup_progress(self, done: int, total: int) -> None:
+        percent = 100 if total == 0 else done * 100 // total
+        self._backup_action.setText(f"Резервная копия {percent}%")
+
+    def _backup_finished(
+        self, progress: ProgressRelay, backup_path: Path | None, error: BaseException | None = None
+    ) -> None:
+        progress.deleteLater()
+        self._backup_running = False
+        self._backup_action.setText("Резервная копия")
+        self._backup_action.setEnabled(True)
+        if error is not None:
+            logger.error("Backup failed", exc_info=error)
+            self.statusBar().showMessage("Резервная копия не удалась", 5000)
+        elif backup_path is not None:
+            logger.info("Backup created at %s", backup_path)
+            self.statusBar().showMessage(f"Резервная копия: {backup_path}", 5000)
+
+    def choose_vault(self) -> None:
+        current = db.get_setting("vault", {}).get("root", "")
+        path = QFileDialog.getExistingDirectory(self, "Папка Vault", current)
+        if not path:
+            return
+        run_write(db.set_setting, "vault", {"root": path}, on_result=lambda _: self._start_vault_sync())
+
+    def _start_vault_sync(self) -> None:
+        if self._vault_sync is not None:
+            self._vault_sync.stop()
+            self._vault_sync = None
+        root = db.get_setting("vault", {}).get("root")
+        if not root or not Path(root).is_dir():
+            return
+        sync = VaultSync(Path(root), on_change=self.vault_changed.emit)
+        self._vault_sync = sync
+        # The first scan runs before the watcher, so the watcher starts from an indexed vault.
+        run_write(vault.index_vault, sync.root, on_result=lambda scan: self._vault_ready(sync, scan))
+
+    def _vault_ready(self, sync: VaultSync, scan: vault.VaultScan) -> None:
+        if sync is not self._vault_sync:
+            return
+        sync.start()
+        if self._vault_view is not None:
+            self._vault_view.set_sync(sync)
+        self._vault_indexed(scan)
+
+    def _vault_indexed(self, scan: vault.VaultScan) -> None:
+        if self._vault_view is not None:
+            self._vault_view.refresh()
+        self.statusBar().showMessage(f"Vault: {scan.tasks} задач в {scan.files} файлах", 5000)
+
+    def _load_pomodoro_config(self) -> PomodoroConfig:
+        return PomodoroConfig.from_setting(db.get_setting("pomodoro", {}))
+
+    def paintEvent(self, event) -> None:  # noqa: N802
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+
+    def closeEvent(self, event) -> None:  # noqa: N802
+        self._change_watcher.stop()
+        self.save_all()
+        if self._vault_sync is not None:
+            self._vault_sync.stop()
+        get_executor().flush()
+        diagnostics.dump_to_log()
+        super().closeEvent(event)
@@ -1,110 +1,211 @@
-diff --git a/app/ui/pomodoro_view.py b/app/ui/pomodoro_view.py
-index 2f653d6b93c927a7eff3dd525dd3574c12ba40f2..4b3c5187ffdacc0589446fdcc006e51759711608 100644
---- a/app/ui/pomodoro_view.py
-+++ b/app/ui/pomodoro_view.py
-@@ -1,59 +1,64 @@
- from __future__ import annotations
- 
- from datetime import datetime
- 
- from PySide6.QtCore import Qt
- from PySide6.QtWidgets import (
-     QComboBox,
-     QFormLayout,
-     QHBoxLayout,
-     QLabel,
-     QLineEdit,
-     QListWidget,
-     QPushButton,
-     QSpinBox,
-     QVBoxLayout,
-     QWidget,
-     QSystemTrayIcon,
-     QApplication,
-+    QStyle,
- )
- 
- from app import db
- from app.pomodoro import PomodoroConfig, PomodoroTimer
- 
- 
- class PomodoroView(QWidget):
--    def __init__(self, config: PomodoroConfig) -> None:
-+    def __init__(self, config: PomodoroConfig, *, enable_tray: bool = True) -> None:
-         super().__init__()
-         self._config = config
-         self._timer = PomodoroTimer(config)
-         self._timer.tick.connect(self._update_timer)
-         self._timer.session_complete.connect(self._handle_complete)
--        self._tray = QSystemTrayIcon(self)
--        self._tray.setIcon(QApplication.style().standardIcon(QApplication.style().SP_ComputerIcon))
--        self._tray.setVisible(True)
-+        self._tray: QSystemTrayIcon | None = None
-+        if enable_tray:
-+            self._tray = QSystemTrayIcon(self)
-+            style = QApplication.style()
-+            standard_icon = getattr(QStyle.StandardPixmap, "SP_ComputerIcon", QStyle.StandardPixmap.SP_DesktopIcon)
-+            self._tray.setIcon(style.standardIcon(standard_icon))
-+            self._tray.setVisible(True)
- 
-         layout = QVBoxLayout(self)
-         self._timer_label = QLabel("25:00")
-         self._timer_label.setAlignment(Qt.AlignCenter)
-         self._timer_label.setStyleSheet("font-size: 32px;")
-         layout.addWidget(self._timer_label)
- 
-         controls = QHBoxLayout()
-         self._start_button = QPushButton("Старт")
-         self._pause_button = QPushButton("Пауза")
-         self._reset_button = QPushButton("Сброс")
-         controls.addWidget(self._start_button)
-         controls.addWidget(self._pause_button)
-         controls.addWidget(self._reset_button)
-         layout.addLayout(controls)
- 
-         link_layout = QFormLayout()
-         self._link_type = QComboBox()
-         self._link_type.addItems(["day", "task", "project"])
-         self._link_id = QLineEdit()
-         link_layout.addRow("Привязка:", self._link_type)
-         link_layout.addRow("ID/тема:", self._link_id)
-         layout.addLayout(link_layout)
- 
-         config_layout = QFormLayout()
-@@ -94,34 +99,35 @@ class PomodoroView(QWidget):
-         self._timer.start()
- 
-     def _save_config(self) -> None:
-         self._config.focus_minutes = self._focus_minutes.value()
-         self._config.short_break_minutes = self._short_break.value()
-         self._config.long_break_minutes = self._long_break.value()
-         self._config.cycles_before_long_break = self._cycles.value()
-         db.set_setting(
-             "pomodoro",
-             {
-                 "focus": self._config.focus_minutes,
-                 "short_break": self._config.short_break_minutes,
-                 "long_break": self._config.long_break_minutes,
-                 "cycles": self._config.cycles_before_long_break,
-             },
-         )
-         self._timer.reset()
- 
-     def _update_timer(self, seconds: int) -> None:
-         minutes = seconds // 60
-         secs = seconds % 60
-         self._timer_label.setText(f"{minutes:02d}:{secs:02d}")
- 
-     def _handle_complete(self, mode: str) -> None:
-         message = "Фокус завершён" if mode != "focus" else "Перерыв завершён"
--        self._tray.showMessage("Помодоро", message)
-+        if self._tray:
-+            self._tray.showMessage("Помодоро", message)
-         self.refresh_sessions()
- 
-     def refresh_sessions(self) -> None:
-         self._session_list.clear()
-         for row in db.list_pomodoro_sessions(50):
-             start_time = datetime.fromisoformat(row["start_time"]).strftime("%d.%m %H:%M")
-             label = f"{start_time} • {row['duration'] // 60} мин • {row['linked_type']} {row['linked_id'] or ''}"
-             self._session_list.addItem(label)
+from __future__ import annotations
+
+from datetime import datetime
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+    QComboBox,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QPushButton,
+    QSpinBox,
+    QVBoxLayout,
+    QWidget,
+    QSystemTrayIcon,
+    QApplication,
+    QStyle,
+)
+
+from app import analytics, db
+from app.pomodoro import PomodoroConfig, PomodoroTimer
+from app.ui.background import run_read, run_write
+
+SESSION_LIMIT = 50
+
+
+class PomodoroView(QWidget):
+    def __init__(
+        self,
+        config: PomodoroConfig,
+        *,
+        enable_tray: bool = True,
+        timer: PomodoroTimer | None = None,
+    ) -> None:
+        super().__init__()
+        self._timer = timer or PomodoroTimer(config)
+        self._viewing = False
+        self._timer.tick.connect(self._update_timer)
+        self._timer.session_complete.connect(self._handle_complete)
+        self._timer.config_changed.connect(self._show_config)
+        self._tray: QSystemTrayIcon | None = None
+        if enable_tray:
+            self._tray = QSystemTrayIcon(self)
+            style = QApplication.style()
+            standard_icon = getattr(QStyle.StandardPixmap, "SP_ComputerIcon", QStyle.StandardPixmap.SP_DesktopIcon)
+            self._tray.setIcon(style.standardIcon(standard_icon))
+            self._tray.setVisible(True)
+
+        layout = QVBoxLayout(self)
+        self._timer_label = QLabel("25:00")
+        self._timer_label.setAlignment(Qt.AlignCenter)
+        self._timer_label.setStyleSheet("font-size: 32px;")
+        layout.addWidget(self._timer_label)
+
+        controls = QHBoxLayout()
+        self._start_button = QPushButton("Старт")
+        self._pause_button = QPushButton("Пауза")
+        self._reset_button = QPushButton("Сброс")
+        controls.addWidget(self._start_button)
+        controls.addWidget(self._pause_button)
+        controls.addWidget(self._reset_button)
+        layout.addLayout(controls)
+
+        link_layout = QFormLayout()
+        self._link_type = QComboBox()
+        self._link_type.addItems(["day", "task", "project"])
+        self._link_id = QLineEdit()
+        link_layout.addRow("Привязка:", self._link_type)
+        link_layout.addRow("ID/тема:", self._link_id)
+        layout.addLayout(link_layout)
+
+        config_layout = QFormLayout()
+        self._focus_minutes = QSpinBox()
+        self._focus_minutes.setRange(1, 180)
+        self._focus_minutes.setValue(self._timer.config.focus_minutes)
+        self._short_break = QSpinBox()
+        self._short_break.setRange(1, 60)
+        self._short_break.setValue(self._timer.config.short_break_minutes)
+        self._long_break = QSpinBox()
+        self._long_break.setRange(1, 120)
+        self._long_break.setValue(self._timer.config.long_break_minutes)
+        self._cycles = QSpinBox()
+        self._cycles.setRange(1, 12)
+        self._cycles.setValue(self._timer.config.cycles_before_long_break)
+        config_layout.addRow("Фокус (мин):", self._focus_minutes)
+        config_layout.addRow("Короткий перерыв (мин):", self._short_break)
+        config_layout.addRow("Длинный перерыв (мин):", self._long_break)
+        config_layout.addRow("Циклов до длинного перерыва:", self._cycles)
+        self._save_config_button = QPushButton("Сохранить настройки")
+        config_layout.addRow(self._save_config_button)
+        layout.addLayout(config_layout)
+
+        layout.addWidget(QLabel("Статистика:"))
+        self._stats_label = QLabel("…")
+        self._stats_label.setTextFormat(Qt.PlainText)
+        layout.addWidget(self._stats_label)
+
+        layout.addWidget(QLabel("Последние сессии:"))
+        self._session_list = QListWidget()
+        layout.addWidget(self._session_list)
+
+        self._start_button.clicked.connect(self._start)
+        self._pause_button.clicked.connect(self._timer.pause)
+        self._reset_button.clicked.connect(self._timer.reset)
+        self._save_config_button.clicked.connect(self._save_config)
+
+        self._session_rows: list = []
+        self._last_session_id = 0
+        self._update_timer(self._timer.remaining_seconds())
+        self.refresh_sessions()
+
+    def showEvent(self, event) -> None:  # noqa: N802
+        super().showEvent(event)
+        if not self._viewing:
+            self._viewing = True
+            self._timer.add_viewer()
+
+    def hideEvent(self, event) -> None:  # noqa: N802
+        super().hideEvent(event)
+        if self._viewing:
+            self._viewing = False
+            self._timer.remove_viewer()
+
+    def _start(self) -> None:
+        linked_id = self._link_id.text().strip() or None
+        self._timer.configure_link(self._link_type.currentText(), linked_id)
+        self._timer.start()
+
+    def _save_config(self) -> None:
+        # The timer adopts the new values (and resets) once the setting is
+        # committed, and every view showing it refreshes from config_changed.
+        config = PomodoroConfig(
+            focus_minutes=self._focus_minutes.value(),
+            short_break_minutes=self._short_break.value(),
+            long_break_minutes=self._long_break.value(),
+            cycles_before_long_break=self._cycles.value(),
+        )
+        run_write(db.set_setting, "pomodoro", config.to_setting())
+
+    def _show_config(self) -> None:
+        self._focus_minutes.setValue(self._timer.config.focus_minutes)
+        self._short_break.setValue(self._timer.config.short_break_minutes)
+        self._long_break.setValue(self._timer.config.long_break_minutes)
+        self._cycles.setValue(self._timer.config.cycles_before_long_break)
+
+    def _update_timer(self, seconds: int) -> None:
+        minutes = seconds // 60
+        secs = seconds % 60
+        self._timer_label.setText(f"{minutes:02d}:{secs:02d}")
+
+    def _handle_complete(self, mode: str) -> None:
+        message = "Фокус завершён" if mode != "focus" else "Перерыв завершён"
+        if self._tray:
+            self._tray.showMessage("Помодоро", message)
+
+    def refresh_sessions(self) -> None:
+        run_read(db.list_pomodoro_sessions, SESSION_LIMIT, on_result=self._show_sessions)
+        self._refresh_stats()
+
+    def _refresh_stats(self) -> None:
+        run_read(analytics.summary, self._timer.config.cycles_before_long_break, on_result=self._show_stats)
+
+    def apply_changes(self, changes: list[db.Change]) -> None:
+        # Completed sessions reach the list through here, written by the timer
+        # and reported by the change watcher, without re-reading the list.
+        if any(change.table == "pomodoro_sessions" for change in changes):
+            run_read(db.list_pomodoro_sessions_after, self._last_session_id, SESSION_LIMIT, on_result=self._add_sessions)
+            self._refresh_stats()
+
+    def _add_sessions(self, rows: list) -> None:
+        newest = self._session_rows[0]["start_time"] if self._session_rows else ""
+        if not rows or rows[-1]["start_time"] < newest:
+            # A delete or an imported older session: the list order changed.
+            self.refresh_sessions()
+            return
+        # Two change batches may fetch the same new sessions; keep the first.
+        rows = [row for row in rows if row["id"] > self._last_session_id]
+        if not rows:
+            return
+        for offset, row in enumerate(rows):
+            self._session_list.insertItem(offset, self._session_label(row))
+        self._session_rows[:0] = rows
+        del self._session_rows[SESSION_LIMIT:]
+        while self._session_list.count() > SESSION_LIMIT:
+            self._session_list.takeItem(self._session_list.count() - 1)
+        self._last_session_id = max(self._last_session_id, max(row["id"] for row in rows))
+
+    def _show_stats(self, summary: analytics.PomodoroSummary) -> None:
+        lines = [
+            f"Сегодня: {summary.today_seconds // 60} мин • Неделя: {summary.week_seconds // 60} мин",
+            f"Всего: {summary.total_seconds // 60} мин за {summary.total_sessions} сессий",
+            f"Серия: {summary.current_streak} дн. (рекорд {summary.longest_streak})",
+            f"Циклы: {summary.cycles_completed}/{summary.cycles_started} ({summary.cycle_completion_rate:.0%})",
+        ]
+        for link in summary.top_links:
+            lines.append(f"{link.linked_type} {link.linked_id or ''}: {link.focus_seconds // 60} мин")
+        self._stats_label.setText("\n".join(lines))
+
+    def _show_sessions(self, rows: list) -> None:
+        self._session_list.clear()
+        for row in rows:
+            self._session_list.addItem(self._session_label(row))
+        self._session_rows = list(rows)
+        self._last_session_id = max((row["id"] for row in rows), default=0)
+
+    @staticmethod
+    def _session_label(row) -> str:
+        start_time = datetime.fromisoformat(row["start_time"]).strftime("%d.%m %H:%M")
+        return f"{start_time} • {row['duration'] // 60} мин • {row['linked_type']} {row['linked_id'] or ''}"
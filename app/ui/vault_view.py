@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from PySide6.QtCore import QDate, Qt
+from PySide6.QtWidgets import (
+    QDateEdit,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from app import vault
+from app.ui.background import run_read, run_write
+from app.vault_sync import VaultSync
+
+TASK_ID_ROLE = Qt.UserRole
+
+
+class VaultView(QWidget):
+    """Tasks of the shared Markdown vault for one week; edits are written back through VaultSync."""
+
+    def __init__(self, sync: VaultSync | None) -> None:
+        super().__init__()
+        self._sync = sync
+        self._week_start = date.today() - timedelta(days=date.today().weekday())
+        self._load_generation = 0
+
+        layout = QVBoxLayout(self)
+        navigation = QHBoxLayout()
+        prev_button = QPushButton("←")
+        next_button = QPushButton("→")
+        self._header = QLabel()
+        navigation.addWidget(prev_button)
+        navigation.addWidget(self._header, 1)
+        navigation.addWidget(next_button)
+        layout.addLayout(navigation)
+
+        self._task_list = QListWidget()
+        layout.addWidget(self._task_list)
+
+        add_row = QHBoxLayout()
+        self._title_edit = QLineEdit()
+        self._title_edit.setPlaceholderText("Новая задача [[исполнитель]]")
+        self._date_edit = QDateEdit(QDate.currentDate())
+        self._date_edit.setCalendarPopup(True)
+        add_button = QPushButton("Добавить")
+        self._add_button = add_button
+        add_row.addWidget(self._title_edit, 1)
+        add_row.addWidget(self._date_edit)
+        add_row.addWidget(add_button)
+        layout.addLayout(add_row)
+
+        prev_button.clicked.connect(lambda: self._shift_week(-7))
+        next_button.clicked.connect(lambda: self._shift_week(7))
+        add_button.clicked.connect(self._add_task)
+        self._title_edit.returnPressed.connect(self._add_task)
+        self._task_list.itemChanged.connect(self._toggle_task)
+        self.refresh()
+
+    def set_sync(self, sync: VaultSync | None) -> None:
+        self._sync = sync
+        self.refresh()
+
+    def _shift_week(self, days: int) -> None:
+        self._week_start += timedelta(days=days)
+        self.refresh()
+
+    def refresh(self) -> None:
+        self._load_generation += 1
+        generation = self._load_generation
+        week_end = self._week_start + timedelta(days=6)
+        self._header.setText(f"{self._week_start:%d.%m} – {week_end:%d.%m.%Y}")
+        self._add_button.setEnabled(self._sync is not None)
+        if self._sync is None:
+            self._show_tasks(generation, [])
+            return
+        run_read(
+            vault.list_vault_tasks,
+            self._week_start.isoformat(),
+            week_end.isoformat(),
+            on_result=lambda tasks: self._show_tasks(generation, tasks),
+        )
+
+    def _show_tasks(self, generation: int, tasks: list[vault.VaultTask]) -> None:
+        if generation != self._load_generation:
+            return
+        self._task_list.blockSignals(True)
+        self._task_list.clear()
+        current_date = None
+        for task in tasks:
+            if task.due_date != current_date:
+                current_date = task.due_date
+                header = QListWidgetItem(self._day_header(current_date))
+                header.setFlags(Qt.NoItemFlags)
+                self._task_list.addItem(header)
+            label = f"{task.title} — {task.assignee}" if task.assignee else task.title
+            item = QListWidgetItem(label)
+            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if task.done else Qt.Unchecked)
+            item.setData(TASK_ID_ROLE, task.id)
+            self._task_list.addItem(item)
+        self._task_list.blockSignals(False)
+
+    @staticmethod
+    def _day_header(due_date: str) -> str:
+        # Comes from a "## " heading in a hand-editable weeks/*.md file.
+        try:
+            return date.fromisoformat(due_date).strftime("%A %d.%m")
+        except ValueError:
+            return f"{due_date} (неверная дата)"
+
+    def _toggle_task(self, item: QListWidgetItem) -> None:
+        task_id = item.data(TASK_ID_ROLE)
+        if not task_id or self._sync is None:
+            return
+        run_write(
+            vault.update_vault_task,
+            self._sync.root,
+            task_id,
+            done=item.checkState() == Qt.Checked,
+            on_result=self._sync.mark_dirty,
+        )
+
+    def _add_task(self) -> None:
+        text = self._title_edit.text().strip()
+        if not text or self._sync is None:
+            return
+        title, _, rest = text.partition("[[")
+        assignee = rest.split("]]", 1)[0] if rest else ""
+        due_date = self._date_edit.date().toPython().isoformat()
+        self._title_edit.clear()
+        run_write(
+            vault.add_vault_task,
+            self._sync.root,
+            title,
+            due_date,
+            assignee,
+            on_result=self._task_added,
+        )
+
+    def _task_added(self, task: vault.VaultTask) -> None:
+        if self._sync is None:
+            return
+        self._sync.mark_dirty({vault.source_for(self._sync.root, task.due_date, task.someday)})
+        self.refresh()
@@ -7,6 +7,8 @@ from PySide6.QtCore import Qt, QDate
 from PySide6.QtWidgets import QGridLayout, QLabel, QPlainTextEdit, QWidget
 
 from app import db
+from app.notes import parse_tasks
+from app.ui.background import run_read
 
 
 WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
@@ -17,6 +19,7 @@ class DayCell:
     date: date
     editor: QPlainTextEdit
     header: QLabel
+    saved_hash: int = hash("")
 
 
 class WeekView(QWidget):
@@ -25,6 +28,10 @@ class WeekView(QWidget):
         self._layout = QGridLayout(self)
         self._layout.setSpacing(8)
         self._cells: list[DayCell] = []
+        self._load_generation = 0
+        self._loading = False
+        # Column of the day the user last worked in; "История" opens its note.
+        self._selected = date.today().weekday()
         self._build_headers()
 
     def _build_headers(self) -> None:
@@ -35,18 +42,89 @@ class WeekView(QWidget):
             editor = QPlainTextEdit()
             editor.setPlaceholderText("Введите заметки...")
             editor.setTabChangesFocus(False)
+            editor.cursorPositionChanged.connect(lambda col=col: self._select(col))
             self._layout.addWidget(editor, 1, col)
             self._cells.append(DayCell(date.today(), editor, header))
 
     def set_week(self, start_date: date) -> None:
+        self._load_generation += 1
+        generation = self._load_generation
+        start_iso = start_date.isoformat()
+        end_iso = (start_date + timedelta(days=len(self._cells) - 1)).isoformat()
         for offset, cell in enumerate(self._cells):
             current_date = start_date + timedelta(days=offset)
             cell.date = current_date
             cell.header.setText(f"{WEEKDAYS[offset]}\n{current_date.strftime('%d.%m')}")
-            entry = db.fetch_note(current_date.isoformat())
+        notes = db.cached_notes_range(start_iso, end_iso)
+        if notes is not None:
+            self._show_notes(generation, notes)
+        else:
+            self._set_loading()
+            run_read(
+                db.fetch_notes_range,
+                start_iso,
+                end_iso,
+                on_result=lambda loaded: self._show_notes(generation, loaded),
+            )
+        self._prefetch_adjacent(start_date)
+
+    def _set_loading(self) -> None:
+        self._loading = True
+        for cell in self._cells:
             cell.editor.blockSignals(True)
-            cell.editor.setPlainText(entry.content if entry else "")
+            cell.editor.clear()
             cell.editor.blockSignals(False)
+            cell.editor.setReadOnly(True)
+            cell.editor.document().setModified(False)
+
+    def _show_notes(self, generation: int, notes: dict[str, db.NoteEntry]) -> None:
+        if generation != self._load_generation:
+            return
+        self._loading = False
+        for cell in self._cells:
+            entry = notes.get(cell.date.isoformat())
+            self._set_content(cell, entry.content if entry else "")
+
+    @staticmethod
+    def _set_content(cell: DayCell, content: str) -> None:
+        cell.editor.blockSignals(True)
+        cell.editor.setPlainText(content)
+        cell.editor.blockSignals(False)
+        cell.editor.setReadOnly(False)
+        cell.editor.document().setModified(False)
+        cell.saved_hash = hash(content)
+
+    def apply_changes(self, changes: list[db.Change]) -> None:
+        shown = {cell.date.isoformat() for cell in self._cells}
+        dates = sorted(shown & {change.key for change in changes if change.table == "note_entries"})
+        if not dates or self._loading:
+            return
+        generation = self._load_generation
+        run_read(
+            db.fetch_notes_range,
+            dates[0],
+            dates[-1],
+            on_result=lambda notes: self._update_notes(generation, set(dates), notes),
+        )
+
+    def _update_notes(self, generation: int, dates: set[str], notes: dict[str, db.NoteEntry]) -> None:
+        if generation != self._load_generation:
+            return
+        for cell in self._cells:
+            date_iso = cell.date.isoformat()
+            # Unsaved typing wins; it is written over the change by the next autosave.
+            if date_iso not in dates or cell.editor.document().isModified():
+                continue
+            entry = notes.get(date_iso)
+            content = entry.content if entry else ""
+            if hash(content) != cell.saved_hash:
+                self._set_content(cell, content)
+
+    @staticmethod
+    def _prefetch_adjacent(start_date: date) -> None:
+        for shift in (-7, 7):
+            week_start = start_date + timedelta(days=shift)
+            db.prefetch_notes_range(week_start.isoformat(), (week_start + timedelta(days=6)).isoformat())
 
     def collect_notes(self) -> dict[str, str]:
         data: dict[str, str] = {}
@@ -54,24 +132,54 @@ class WeekView(QWidget):
             data[cell.date.isoformat()] = cell.editor.toPlainText()
         return data
 
-    def focus_day(self, target_date: date) -> None:
+    def dirty_notes(self) -> dict[str, str]:
+        data: dict[str, str] = {}
+        if self._loading:
+            return data
         for cell in self._cells:
+            document = cell.editor.document()
+            if not document.isModified():
+                continue
+            content = cell.editor.toPlainText()
+            if hash(content) == cell.saved_hash:
+                document.setModified(False)
+                continue
+            data[cell.date.isoformat()] = content
+        return data
+
+    def mark_saved(self, notes: dict[str, str]) -> None:
+        for cell in self._cells:
+            content = notes.get(cell.date.isoformat())
+            if content is None or content != cell.editor.toPlainText():
+                continue
+            cell.editor.document().setModified(False)
+            cell.saved_hash = hash(content)
+
+    def focus_day(self, target_date: date) -> None:
+        for col, cell in enumerate(self._cells):
             if cell.date == target_date:
+                self._select(col)
                 cell.editor.setFocus()
                 return
 
+    def _select(self, col: int) -> None:
+        self._selected = col
+
+    def selected_date(self) -> date:
+        return self._cells[self._selected].date
+
+    def show_note(self, date_iso: str, content: str) -> None:
+        """Replace a shown day's text, unsaved typing included (used after a restore)."""
+        if self._loading:
+            return
+        for cell in self._cells:
+            if cell.date.isoformat() == date_iso:
+                self._set_content(cell, content)
+
     def extract_tasks(self) -> dict[str, list[tuple[str, str]]]:
         tasks_by_date: dict[str, list[tuple[str, str]]] = {}
         for cell in self._cells:
-            tasks: list[tuple[str, str]] = []
-            for line in cell.editor.toPlainText().splitlines():
-                stripped = line.strip()
-                if stripped.startswith("- ["):
-                    status = "done" if stripped[3:4].lower() == "x" else "undone"
-                    text = stripped[5:].strip()
-                    if text:
-                        tasks.append((text, status))
-            tasks_by_date[cell.date.isoformat()] = tasks
+            tasks_by_date[cell.date.isoformat()] = parse_tasks(cell.editor.toPlainText())
         return tasks_by_date
 
     @staticmethod
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import random
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from app import db
+from app.analytics import iso_week_key
+from app.diagnostics import instrumented
+
+# Same grammar as TASK_RE in js/utils/md.js.
+TASK_RE = re.compile(r"^- \[( |x)\] (.*?)(?: \[\[(.*?)\]\])?\s*<!--id:(.*?)-->\s*$")
+WEEKS_DIR = "weeks"
+PEOPLE_DIR = "people"
+SOMEDAY_FILE = "someday.md"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VaultTask:
+    id: str
+    title: str
+    assignee: str
+    done: bool
+    due_date: str
+    week_key: str
+    someday: bool
+
+
+@dataclass
+class VaultPerson:
+    name: str
+    role: str
+
+
+@dataclass
+class VaultScan:
+    files: int
+    reindexed: int
+    removed: int
+    tasks: int
+
+
+def _parse_task(line: str, due_date: str, week_key: str, someday: bool) -> VaultTask | None:
+    match = TASK_RE.match(line)
+    if not match:
+        return None
+    return VaultTask(
+        id=match.group(4),
+        title=match.group(2).strip(),
+        assignee=(match.group(3) or "").strip(),
+        done=match.group(1) == "x",
+        due_date=due_date,
+        week_key=week_key,
+        someday=someday,
+    )
+
+
+def parse_week_markdown(content: str, week_key: str) -> dict[str, list[VaultTask]]:
+    by_date: dict[str, list[VaultTask]] = {}
+    current_date: str | None = None
+    for line in content.splitlines():
+        if line.startswith("## "):
+            current_date = line[3:].strip()
+            by_date.setdefault(current_date, [])
+            continue
+        if current_date is None:
+            continue
+        task = _parse_task(line, current_date, week_key, False)
+        if task:
+            by_date[current_date].append(task)
+    return by_date
+
+
+def parse_someday_markdown(content: str) -> list[VaultTask]:
+    tasks = (_parse_task(line, "", "", True) for line in content.splitlines())
+    return [task for task in tasks if task]
+
+
+def parse_person_markdown(content: str, fallback_name: str) -> VaultPerson:
+    fields: dict[str, str] = {}
+    lines = content.splitlines()
+    if lines and lines[0].strip() == "---":
+        for line in lines[1:]:
+            if line.strip() == "---":
+                break
+            key, _, value = line.partition(":")
+            fields[key.strip()] = value.strip().strip("'\"")
+    return VaultPerson(name=fields.get("name") or fallback_name, role=fields.get("role", ""))
+
+
+def _task_line(task: VaultTask) -> str:
+    assignee = f" [[{task.assignee}]]" if task.assignee else ""
+    return f"- [{'x' if task.done else ' '}] {task.title}{assignee} <!--id:{task.id}-->"
+
+
+def serialize_week_markdown(week_key: str, by_date: dict[str, list[VaultTask]]) -> str:
+    # Byte-for-byte the output of serializeWeekMarkdown in js/utils/md.js.
+    lines = [f"# Week {week_key}", ""]
+    for day in sorted(by_date):
+        lines.append(f"## {day}")
+        lines.extend(_task_line(task) for task in by_date[day])
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def serialize_someday_markdown(tasks: list[VaultTask]) -> str:
+    lines = ["# Someday", ""]
+    lines.extend(_task_line(task) for task in tasks)
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def generate_task_id(today: date | None = None) -> str:
+    return f"task_{(today or date.today()).strftime('%Y%m%d')}_{random.randrange(1000):03d}"
+
+
+def vault_files(root: Path) -> list[Path]:
+    files = sorted((root / WEEKS_DIR).glob("*.md")) + sorted((root / PEOPLE_DIR).glob("*.md"))
+    someday = root / SOMEDAY_FILE
+    if someday.is_file():
+        files.append(someday)
+    return files
+
+
+def _parse_file(root: Path, path: Path, content: str) -> tuple[list[VaultTask], list[VaultPerson]]:
+    relative = path.relative_to(root)
+    if relative.parts[0] == WEEKS_DIR:
+        by_date = parse_week_markdown(content, path.stem)
+        return [task for tasks in by_date.values() for task in tasks], []
+    if relative.parts[0] == PEOPLE_DIR:
+        return [], [parse_person_markdown(content, path.stem)]
+    return parse_someday_markdown(content), []
+
+
+@instrumented
+def index_vault(root: Path) -> VaultScan:
+    """Bring the vault tables in line with the files under ``root``.
+
+    Files whose size and mtime match the last scan are not opened; files
+    whose bytes hash the same are not reparsed. Rows of files that
+    disappeared (or belong to a previously indexed vault) are dropped.
+    """
+    root = root.resolve()
+    known = {
+        row["path"]: row
+        for row in db.get_manager().read().execute("SELECT path, mtime_ns, size, sha256 FROM vault_files")
+    }
+    present: set[str] = set()
+    touched: list[tuple[str, int, int, str]] = []
+    parsed: dict[str, tuple[list[VaultTask], list[VaultPerson]]] = {}
+    for path in vault_files(root):
+        key = str(path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        present.add(key)
+        previous = known.get(key)
+        if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+            continue
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        touched.append((key, stat.st_mtime_ns, stat.st_size, digest))
+        if previous and previous["sha256"] == digest:
+            continue
+        parsed[key] = _parse_file(root, path, data.decode("utf-8", errors="replace"))
+    removed = [path for path in known if path not in present]
+
+    if touched or removed:
+        with db.get_manager().write() as conn:
+            stale = [(path,) for path in removed + list(parsed)]
+            conn.executemany("DELETE FROM vault_tasks WHERE source = ?", stale)
+            conn.executemany("DELETE FROM vault_people WHERE source = ?", stale)
+            conn.executemany("DELETE FROM vault_files WHERE path = ?", [(path,) for path in removed])
+            for source, (tasks, people) in parsed.items():
+                conn.executemany(
+                    """
+                    INSERT INTO vault_tasks(id, title, assignee, done, due_date, week_key, someday, source, position)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        title = excluded.title, assignee = excluded.assignee, done = excluded.done,
+                        due_date = excluded.due_date, week_key = excluded.week_key,
+                        someday = excluded.someday, source = excluded.source, position = excluded.position
+                    """,
+                    [
+                        (task.id, task.title, task.assignee, task.done, task.due_date, task.week_key,
+                         task.someday, source, position)
+                        for position, task in enumerate(tasks)
+                    ],
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO vault_people(name, role, source) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET role = excluded.role, source = excluded.source
+                    """,
+                    [(person.name, person.role, source) for person in people],
+                )
+            conn.executemany(
+                """
+                INSERT INTO vault_files(path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns, size = excluded.size, sha256 = excluded.sha256
+                """,
+                touched,
+            )
+    if parsed or removed:
+        logger.info("Vault %s: reindexed %d files, removed %d", root, len(parsed), len(removed))
+    task_count = db.get_manager().read().execute("SELECT COUNT(*) FROM vault_tasks").fetchone()[0]
+    return VaultScan(files=len(present), reindexed=len(parsed), removed=len(removed), tasks=task_count)
+
+
+def _task_from_row(row) -> VaultTask:
+    return VaultTask(
+        id=row["id"],
+        title=row["title"],
+        assignee=row["assignee"],
+        done=bool(row["done"]),
+        due_date=row["due_date"],
+        week_key=row["week_key"],
+        someday=bool(row["someday"]),
+    )
+
+
+@instrumented
+def list_vault_tasks(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    assignee: str | None = None,
+    someday: bool = False,
+) -> list[VaultTask]:
+    query = "SELECT id, title, assignee, done, due_date, week_key, someday FROM vault_tasks WHERE someday = ?"
+    params: list[object] = [someday]
+    if start_date and end_date:
+        query += " AND due_date BETWEEN ? AND ?"
+        params.extend([start_date, end_date])
+    if assignee is not None:
+        query += " AND assignee = ?"
+        params.append(assignee)
+    query += " ORDER BY due_date, source, position"
+    rows = db.get_manager().read().execute(query, params).fetchall()
+    return [_task_from_row(row) for row in rows]
+
+
+def get_vault_task(task_id: str) -> VaultTask | None:
+    row = db.get_manager().read().execute(
+        "SELECT id, title, assignee, done, due_date, week_key, someday FROM vault_tasks WHERE id = ?",
+        (task_id,),
+    ).fetchone()
+    return _task_from_row(row) if row else None
+
+
+def list_vault_people() -> list[VaultPerson]:
+    # Like loadVaultIndex: people files plus anyone a task is assigned to.
+    rows = db.get_manager().read().execute(
+        """
+        SELECT name, role FROM vault_people
+        UNION
+        SELECT DISTINCT assignee, '' FROM vault_tasks
+        WHERE assignee != '' AND assignee NOT IN (SELECT name FROM vault_people)
+        ORDER BY name
+        """
+    ).fetchall()
+    return [VaultPerson(name=row["name"], role=row["role"]) for row in rows]
+
+
+def source_for(root: Path, due_date: str, someday: bool) -> str:
+    if someday or not due_date:
+        return str(root.resolve() / SOMEDAY_FILE)
+    return str(root.resolve() / WEEKS_DIR / f"{iso_week_key(date.fromisoformat(due_date))}.md")
+
+
+def _task_source(conn, task_id: str) -> str | None:
+    row = conn.execute("SELECT source FROM vault_tasks WHERE id = ?", (task_id,)).fetchone()
+    return row["source"] if row else None
+
+
+def _append_task(conn, task: VaultTask, source: str) -> None:
+    position = conn.execute(
+        "SELECT coalesce(MAX(position) + 1, 0) FROM vault_tasks WHERE source = ?", (source,)
+    ).fetchone()[0]
+    conn.execute(
+        """
+        INSERT INTO vault_tasks(id, title, assignee, done, due_date, week_key, someday, source, position)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (task.id, task.title, task.assignee, task.done, task.due_date, task.week_key, task.someday, source, position),
+    )
+
+
+def add_vault_task(root: Path, title: str, due_date: str = "", assignee: str = "", someday: bool = False) -> VaultTask:
+    someday = someday or not due_date
+    with db.get_manager().write() as conn:
+        task_id = generate_task_id()
+        # The PWA's ids only carry three random digits; avoid reusing one.
+        while _task_source(conn, task_id) is not None:
+            task_id = generate_task_id()
+        task = VaultTask(
+            id=task_id,
+            title=title.strip(),
+            assignee=assignee.strip(),
+            done=False,
+            due_date="" if someday else due_date,
+            week_key="" if someday else iso_week_key(date.fromisoformat(due_date)),
+            someday=someday,
+        )
+        _append_task(conn, task, source_for(root, task.due_date, someday))
+    return task
+
+
+def update_vault_task(
+    root: Path,
+    task_id: str,
+    *,
+    title: str | None = None,
+    done: bool | None = None,
+    assignee: str | None = None,
+    due_date: str | None = None,
+    someday: bool | None = None,
+) -> set[str]:
+    """Edit a task in place or move it to another file; returns the sources that changed."""
+    # Raises ValueError for a malformed date before anything is written.
+    week_key = iso_week_key(date.fromisoformat(due_date)) if due_date and not someday else ""
+    with db.get_manager().write() as conn:
+        task = get_vault_task(task_id)
+        old_source = _task_source(conn, task_id)
+        if task is None or old_source is None:
+            return set()
+        old_place = (task.due_date, task.someday)
+        if title is not None:
+            task.title = title.strip()
+        if done is not None:
+            task.done = done
+        if assignee is not None:
+            task.assignee = assignee.strip()
+        if someday:
+            task.someday, task.due_date, task.week_key = True, "", ""
+        elif due_date:
+            task.someday, task.due_date, task.week_key = False, due_date, week_key
+        # A heading edited by hand ("## 2026-10-15 четверг") is not a date;
+        # the task stays in its file unless it was actually moved.
+        if (task.due_date, task.someday) == old_place:
+            source = old_source
+        else:
+            source = source_for(root, task.due_date, task.someday)
+        if source == old_source:
+            conn.execute(
+                "UPDATE vault_tasks SET title = ?, done = ?, assignee = ?, due_date = ? WHERE id = ?",
+                (task.title, task.done, task.assignee, task.due_date, task_id),
+            )
+        else:
+            conn.execute("DELETE FROM vault_tasks WHERE id = ?", (task_id,))
+            _append_task(conn, task, source)
+    return {old_source, source}
+
+
+def delete_vault_task(task_id: str) -> set[str]:
+    with db.get_manager().write() as conn:
+        source = _task_source(conn, task_id)
+        if source is None:
+            return set()
+        conn.execute("DELETE FROM vault_tasks WHERE id = ?", (task_id,))
+    return {source}
+
+
+def render_source(source: str) -> str:
+    path = Path(source)
+    rows = db.get_manager().read().execute(
+        """
+        SELECT id, title, assignee, done, due_date, week_key, someday FROM vault_tasks
+        WHERE source = ? ORDER BY position
+        """,
+        (source,),
+    ).fetchall()
+    tasks = [_task_from_row(row) for row in rows]
+    if path.parent.name != WEEKS_DIR:
+        return serialize_someday_markdown(tasks)
+    # Day headers without tasks carry no rows; keep the ones the file already has.
+    try:
+        by_date = {day: [] for day in parse_week_markdown(path.read_text(encoding="utf-8"), path.stem)}
+    except FileNotFoundError:
+        by_date = {}
+    for task in tasks:
+        by_date.setdefault(task.due_date, []).append(task)
+    return serialize_week_markdown(path.stem, by_date)
+
+
+@instrumented
+def write_back(sources: set[str]) -> list[Path]:
+    """Write desktop-side changes to the vault; only files whose text differs are touched.
+
+    A file that changed on disk since it was last indexed is left alone (the
+    next scan imports it), so an external edit is never overwritten unseen.
+    """
+    written: list[Path] = []
+    with db.get_manager().write() as conn:
+        for source in sorted(sources):
+            path = Path(source)
+            known = conn.execute("SELECT mtime_ns, size FROM vault_files WHERE path = ?", (source,)).fetchone()
+            try:
+                stat = path.stat()
+                current = path.read_bytes()
+            except FileNotFoundError:
+                stat, current = None, None
+            if stat is not None and (known is None or (known["mtime_ns"], known["size"]) != (stat.st_mtime_ns, stat.st_size)):
+                logger.warning("Vault file %s changed externally; not overwriting it", path)
+                continue
+            content = render_source(source).encode("utf-8")
+            if content != current:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                partial_path = path.with_name(path.name + ".part")
+                partial_path.write_bytes(content)
+                os.replace(partial_path, path)
+                written.append(path)
+                stat = path.stat()
+            if stat is not None:
+                conn.execute(
+                    """
+                    INSERT INTO vault_files(path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        mtime_ns = excluded.mtime_ns, size = excluded.size, sha256 = excluded.sha256
+                    """,
+                    (source, stat.st_mtime_ns, stat.st_size, hashlib.sha256(content).hexdigest()),
+                )
+    return written
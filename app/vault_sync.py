@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app import vault
+from app.db_executor import get_executor
+
+DEBOUNCE_SECONDS = 0.3
+POLL_INTERVAL = 2.0
+TICK_SECONDS = 0.1
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+logger = logging.getLogger(__name__)
+
+
+class _InotifyWatch:
+    """Reports changes to Markdown files in the vault root, weeks/ and people/ (Linux)."""
+
+    def __init__(self, root: Path) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._root = root
+        self._add(root)
+        for name in (vault.WEEKS_DIR, vault.PEOPLE_DIR):
+            if (root / name).is_dir():
+                self._add(root / name)
+
+    def _add(self, path: Path) -> None:
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        changed = False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if mask & IN_ISDIR and name in (vault.WEEKS_DIR, vault.PEOPLE_DIR) and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add(self._root / name)
+                changed = True
+            elif name.endswith(".md"):
+                changed = True
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollWatch:
+    """Fallback when inotify is unavailable: every POLL_INTERVAL counts as a change.
+
+    That is cheap because index_vault only stats files whose size and mtime
+    are unchanged.
+    """
+
+    def __init__(self) -> None:
+        self._next_poll = time.monotonic() + POLL_INTERVAL
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        if time.monotonic() < self._next_poll:
+            return False
+        self._next_poll = time.monotonic() + POLL_INTERVAL
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def _open_watch(root: Path) -> _InotifyWatch | _PollWatch:
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatch(root)
+        except (OSError, AttributeError) as error:
+            logger.info("inotify unavailable (%s); polling the vault", error)
+    return _PollWatch()
+
+
+class VaultSync:
+    """Keeps planner.db and a Markdown vault in step in both directions.
+
+    External edits are picked up by a watcher and indexed once a burst of
+    events has been quiet for DEBOUNCE_SECONDS. Desktop edits are reported
+    with ``mark_dirty`` and written back after the same quiet period; only
+    files whose rendered text differs are rewritten. Both directions run
+    on the db executor's writer thread, so they are ordered with every
+    other write.
+    """
+
+    def __init__(self, root: Path, on_change: Callable[[vault.VaultScan], None] | None = None) -> None:
+        self.root = root.resolve()
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._dirty_since: float | None = None
+        self._external_since: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="vault-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._flush_local()
+
+    def mark_dirty(self, sources: Iterable[str]) -> None:
+        with self._lock:
+            self._dirty.update(sources)
+            self._dirty_since = time.monotonic()
+
+    def _run(self) -> None:
+        watch = _open_watch(self.root)
+        try:
+            while not self._stop.is_set():
+                if watch.wait(TICK_SECONDS):
+                    self._external_since = time.monotonic()
+                now = time.monotonic()
+                with self._lock:
+                    local_due = self._dirty_since is not None and now - self._dirty_since >= DEBOUNCE_SECONDS
+                if local_due:
+                    self._flush_local()
+                if self._external_since is not None and now - self._external_since >= DEBOUNCE_SECONDS:
+                    self._external_since = None
+                    self._import_external()
+        except Exception:
+            logger.exception("Vault sync stopped")
+        finally:
+            watch.close()
+
+    def _flush_local(self) -> None:
+        with self._lock:
+            sources, self._dirty, self._dirty_since = self._dirty, set(), None
+        if sources:
+            written = get_executor().submit_write(vault.write_back, sources).result()
+            if written:
+                logger.info("Wrote %d vault files", len(written))
+
+    def _import_external(self) -> None:
+        scan = get_executor().submit_write(vault.index_vault, self.root).result()
+        if (scan.reindexed or scan.removed) and self._on_change is not None:
+            self._on_change(scan)
@@ -0,0 +1,77 @@
+"""Deterministic synthetic data for planner.db benchmarks."""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta
+from typing import Iterator
+
+from app import db
+
+WORDS = [
+    "встреча", "отчёт", "проект", "клиент", "звонок", "письмо", "план", "задача",
+    "бюджет", "договор", "презентация", "команда", "релиз", "тестирование", "дизайн",
+    "исправить", "подготовить", "согласовать", "проверить", "отправить", "обсудить",
+    "купить", "молоко", "хлеб", "спортзал", "врач", "семья", "книга", "прогулка",
+    "неделя", "квартал", "итоги", "идея", "заметка", "срочно", "позже", "важно",
+    "сервер", "база", "данных", "интерфейс", "ошибка", "обновление", "документация",
+]
+LINK_TYPES = ["day", "task", "project"]
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize()
+
+
+def _note_for_day(rng: random.Random, tasks_per_day: int) -> tuple[str, list[tuple[str, str]]]:
+    lines = [_sentence(rng, 6, 18) + "." for _ in range(rng.randint(1, 4))]
+    tasks: list[tuple[str, str]] = []
+    for _ in range(tasks_per_day):
+        text = _sentence(rng, 2, 6)
+        status = "done" if rng.random() < 0.6 else "undone"
+        tasks.append((text, status))
+        lines.append(f"- [{'x' if status == 'done' else ' '}] {text}")
+    return "\n".join(lines), tasks
+
+
+def _session_rows(
+    rng: random.Random, start: date, days: int, sessions: int
+) -> Iterator[tuple[str, int, int, str, str | None]]:
+    first = datetime.combine(start, datetime.min.time())
+    span_minutes = days * 24 * 60
+    for _ in range(sessions):
+        start_time = first + timedelta(minutes=rng.randrange(span_minutes))
+        linked_type = rng.choice(LINK_TYPES)
+        linked_id = None if linked_type == "day" else str(rng.randint(1, 200))
+        yield start_time.isoformat(), 1500, rng.choice((300, 900)), linked_type, linked_id
+
+
+def generate(years: int, tasks: int, sessions: int, seed: int = 1, end: date | None = None) -> dict[str, int]:
+    """Fill the current planner.db; returns the generated row counts."""
+    rng = random.Random(seed)
+    end = end or date(2025, 12, 31)
+    days = years * 365
+    start = end - timedelta(days=days - 1)
+    base_tasks, extra_tasks = divmod(tasks, days)
+    db.init_db()
+    with db.get_manager().write() as conn:
+        task_rows: list[tuple[str, str, str, int]] = []
+        for offset in range(days):
+            day = (start + timedelta(days=offset)).isoformat()
+            content, day_tasks = _note_for_day(rng, base_tasks + (1 if offset < extra_tasks else 0))
+            conn.execute(
+                "INSERT INTO note_entries(date, content, updated_at) VALUES (?, ?, ?)",
+                (day, content, f"{day}T20:00:00"),
+            )
+            task_rows.extend((day, text, status, position) for position, (text, status) in enumerate(day_tasks))
+        conn.executemany(
+            "INSERT INTO task_items(date, text, status, position) VALUES (?, ?, ?, ?)", task_rows
+        )
+        conn.executemany(
+            """
+            INSERT INTO pomodoro_sessions(start_time, duration, break_duration, linked_type, linked_id)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            _session_rows(rng, start, days, sessions),
+        )
+    return {"notes": days, "task_items": len(task_rows), "pomodoro_sessions": sessions}
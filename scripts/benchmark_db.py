@@ -0,0 +1,203 @@
+"""Headless benchmarks for app.db and app.exporter on a synthetic planner.db.
+
+    python scripts/benchmark_db.py --data-dir /tmp/tm-bench --output bench.json
+    python scripts/benchmark_db.py --data-dir /tmp/tm-bench --quick --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app import backup  # noqa: E402
+from app import db  # noqa: E402
+from app import exporter  # noqa: E402
+
+import bench_data  # noqa: E402
+
+FULL = {"years": 10, "tasks": 200_000, "sessions": 1_000_000}
+QUICK = {"years": 1, "tasks": 2_000, "sessions": 10_000}
+
+
+def use_data_dir(path: Path) -> None:
+    db.close_db()
+    os.environ["TASKMENEDGER_DATA_DIR"] = str(path)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        "runs": repeat,
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+    }
+
+
+def run_suite(data_dir: Path, scratch: Path, repeat: int, seed: int) -> dict[str, dict[str, float]]:
+    rng = random.Random(seed)
+    dates = [note.date for note in db.list_notes()]
+    results: dict[str, dict[str, float]] = {}
+
+    def fetch_cold() -> None:
+        db.note_cache.invalidate()
+        db.fetch_note(rng.choice(dates))
+
+    def replace_tasks() -> None:
+        day = rng.choice(dates)
+        tasks = [(task.text, "done" if task.status == "undone" else "undone") for task in db.list_tasks_for_date(day)]
+        db.replace_tasks_for_date(day, tasks)
+
+    def carry_over() -> None:
+        copy_dir = scratch / "carry_over"
+        copy_dir.mkdir(exist_ok=True)
+        db.backup_database(copy_dir / db.DB_FILENAME)
+        use_data_dir(copy_dir)
+        db.carry_over_undone(dates[-1])
+        use_data_dir(data_dir)
+        shutil.rmtree(copy_dir)
+
+    def import_json() -> None:
+        use_data_dir(scratch / "import")
+        shutil.rmtree(scratch / "import", ignore_errors=True)
+        db.init_db()
+        exporter.import_database_from_json(scratch / "export.ndjson")
+        use_data_dir(data_dir)
+
+    week_start = dates[len(dates) // 2]
+    week_end = (date.fromisoformat(week_start) + timedelta(days=6)).isoformat()
+    month_end = (date.fromisoformat(week_start) + timedelta(days=30)).isoformat()
+    cases: list[tuple[str, Callable[[], object], int]] = [
+        ("fetch_note_cold", fetch_cold, repeat * 10),
+        ("fetch_note_warm", lambda: db.fetch_note(week_start), repeat * 10),
+        ("fetch_notes_range_week", lambda: (db.note_cache.invalidate(), db.fetch_notes_range(week_start, week_end)), repeat),
+        ("list_notes_all", db.list_notes, repeat),
+        ("list_note_previews_page", lambda: db.list_note_previews(None, 200), repeat),
+        ("search_notes", lambda: db.search_notes("проект встреча"), repeat),
+        ("search_notes_page", lambda: db.search_notes_page("проект встреча"), repeat),
+        ("replace_tasks_for_date", replace_tasks, repeat * 10),
+        ("list_open_tasks_month", lambda: db.list_open_tasks(week_start, month_end), repeat),
+        ("list_overdue_tasks", lambda: db.list_overdue_tasks(week_start), repeat),
+        ("count_tasks_by_status_year", lambda: db.count_tasks_by_status(dates[-1][:4] + "-01-01", dates[-1], by="week"), repeat),
+        ("carry_over_undone", carry_over, 1),
+        ("export_database_to_json", lambda: exporter.export_database_to_json(scratch / "export.json"), 1),
+        ("export_range_to_markdown", lambda: exporter.export_range_to_markdown(date.fromisoformat(dates[0]), date.fromisoformat(dates[-1]), scratch / "vault"), 2),
+        ("export_database_to_ndjson", lambda: exporter.export_database_to_ndjson(scratch / "export.ndjson"), 1),
+        ("import_database_from_json", import_json, 1),
+        ("backup_database", lambda: db.backup_database(scratch / "backup.db"), 1),
+        ("create_backup_xz", lambda: backup.create_backup(backup.BackupConfig(keep_hourly=1, keep_daily=0, keep_weekly=0)), 1),
+    ]
+    for name, fn, runs in cases:
+        results[name] = measure(fn, runs)
+        print(f"{name:32} median {results[name]['median_ms']:10.2f} ms  ({runs} runs)")
+    return results
+
+
+# Each task query must be answered from the named index, without a sort step.
+EXPECTED_PLANS = [
+    ("open tasks", db.OPEN_TASKS_SQL, ("2024-01-01", "2024-01-31"), "idx_task_items_status_date"),
+    ("overdue tasks", db.OVERDUE_TASKS_SQL, ("2024-01-01",), "idx_task_items_status_date"),
+    ("status counts", db.TASK_STATUS_COUNTS_SQL, ("2024-01-01", "2024-12-31"), "COVERING INDEX idx_task_items_date_status"),
+]
+
+
+def check_query_plans() -> list[str]:
+    failures = []
+    # EXPLAIN never starts a read transaction, so a long-lived connection can
+    # still plan against the schema it saw before init_db migrated it.
+    conn = sqlite3.connect(db.get_db_path())
+    conn.row_factory = sqlite3.Row
+    for name, query, params, expected in EXPECTED_PLANS:
+        plan = " | ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+        ok = expected in plan and "TEMP B-TREE" not in plan
+        print(f"{'ok ' if ok else 'BAD'} {name:14} {plan}")
+        if not ok:
+            failures.append(name)
+    conn.close()
+    return failures
+
+
+def compare(current: dict, previous_path: Path) -> None:
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))["results"]
+    print(f"\nCompared with {previous_path}:")
+    for name, result in current.items():
+        if name not in previous:
+            continue
+        ratio = result["median_ms"] / previous[name]["median_ms"] if previous[name]["median_ms"] else float("inf")
+        print(f"{name:32} {previous[name]['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  x{ratio:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "taskmenedger-bench")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--quick", action="store_true", help="small dataset for smoke runs")
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--years", type=int)
+    parser.add_argument("--tasks", type=int)
+    parser.add_argument("--sessions", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check-plans", action="store_true", help="only verify task query plans use their indexes")
+    args = parser.parse_args()
+
+    volumes = dict(QUICK if args.quick else FULL)
+    for key in volumes:
+        if getattr(args, key) is not None:
+            volumes[key] = getattr(args, key)
+
+    data_dir = args.data_dir / "_".join(f"{key}{value}" for key, value in volumes.items())
+    if args.regenerate:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    use_data_dir(data_dir)
+    if not db.get_db_path().exists():
+        started = time.perf_counter()
+        bench_data.generate(volumes["years"], volumes["tasks"], volumes["sessions"], seed=args.seed)
+        print(f"Generated dataset in {time.perf_counter() - started:.1f} s: {data_dir}")
+    db.init_db()
+    if args.check_plans:
+        failures = check_query_plans()
+        db.close_db()
+        sys.exit(1 if failures else 0)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        results = run_suite(data_dir, Path(scratch), args.repeat, args.seed)
+        report = {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "volumes": volumes,
+            "rows": db.count_rows(),
+            "db_size_bytes": db.get_db_path().stat().st_size,
+            "results": results,
+            "query_plans_ok": not check_query_plans(),
+        }
+        db.close_db()
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nSaved {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import pytest
+
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Every test gets its own empty planner.db."""
+    monkeypatch.setenv("TASKMENEDGER_DATA_DIR", str(tmp_path))
+    db.close_db()
+    db.init_db()
+    yield tmp_path
+    db.close_db()
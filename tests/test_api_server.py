@@ -0,0 +1,30 @@
+import asyncio
+
+from app import db
+from app.api_server import ApiServer
+
+
+def request(server, headers, target="/notes?from=2024-01-01&to=2024-01-31"):
+    return asyncio.run(server._dispatch("GET", target, headers))
+
+
+def test_requests_for_another_host_are_refused():
+    server = ApiServer(port=8766)
+    assert request(server, {"host": "evil.example:8766"}).status == 403
+    assert request(server, {}).status == 403
+    assert request(server, {"host": "localhost:8765"}).status == 403
+
+
+def test_only_allowed_origins_may_read_across_origins():
+    db.write_note("2024-01-02", "заметка")
+    server = ApiServer(port=8766, allowed_origins=["http://localhost:8765"])
+    refused = request(server, {"host": "127.0.0.1:8766", "origin": "https://evil.example"})
+    assert refused.status == 403
+    assert "Access-Control-Allow-Origin" not in refused.headers
+    allowed = request(server, {"host": "127.0.0.1:8766", "origin": "http://localhost:8765"})
+    assert allowed.status == 200
+    assert allowed.headers["Access-Control-Allow-Origin"] == "http://localhost:8765"
+    assert [note["date"] for note in allowed.body] == ["2024-01-02"]
+    same_origin = request(server, {"host": "localhost:8766"})
+    assert same_origin.status == 200
+    assert "Access-Control-Allow-Origin" not in same_origin.headers
@@ -0,0 +1,87 @@
+from datetime import date
+
+from app import analytics, archive, db
+
+
+def fill():
+    notes = {
+        "2022-03-01": "старый год\n- [x] сделано",
+        "2022-11-15": "ещё старое\n- [ ] не сделано",
+        "2023-06-01": "прошлый год\n- [x] тоже",
+        "2024-02-01": "текущий год\n- [ ] открыто",
+    }
+    db.save_notes(notes, {note_date: db.parse_tasks(content) for note_date, content in notes.items()})
+    for start_time in ("2022-03-01T10:00:00", "2023-06-01T10:00:00", "2024-02-01T10:00:00"):
+        db.add_pomodoro_session(start_time, 1500, 300, "day", None)
+
+
+def snapshot():
+    db.note_cache.invalidate()
+    return {
+        "notes": db.list_notes(),
+        "exported": list(db.iter_notes()),
+        "tasks": list(db.iter_task_items()),
+        "sessions": sorted(tuple(row) for row in db.iter_pomodoro_sessions()),
+        "search": db.search_notes("год"),
+        "range": db.fetch_notes_range("2022-02-25", "2022-03-05"),
+        "previews": db.list_note_previews(),
+        "overdue": db.list_overdue_tasks("2024-03-01"),
+        "focus": analytics.summary(4, date(2024, 2, 1)),
+    }
+
+
+def hot_dates():
+    return [row[0] for row in db.get_manager().read().execute("SELECT date FROM note_entries ORDER BY date")]
+
+
+def test_archive_moves_old_years_and_reads_them_back(data_dir):
+    fill()
+    before = snapshot()
+
+    moved = db.archive_before("2024-01-01")
+
+    assert moved > 0
+    assert archive.archive_years(data_dir) == [2022, 2023]
+    # The day with an undone task stays in planner.db.
+    assert hot_dates() == ["2022-11-15", "2024-02-01"]
+    assert snapshot() == before
+    assert db.fetch_note("2023-06-01").content.startswith("прошлый год")
+
+
+def test_archive_is_idempotent_and_skips_empty_years(data_dir):
+    fill()
+    db.archive_before("2024-01-01")
+    assert db.archive_before("2024-01-01") == 0
+    assert not archive.archive_path(data_dir, 2021).exists()
+
+
+def test_edited_archived_note_wins_and_moves_again(data_dir):
+    fill()
+    db.archive_before("2024-01-01")
+    content = db.append_to_note("2022-03-01", "дописано")
+    assert content == "старый год\n- [x] сделано\nдописано"
+
+    assert [note.content for note in db.list_notes() if note.date == "2022-03-01"] == [content]
+    assert [hit.date for hit in db.search_notes_page("дописано")] == ["2022-03-01"]
+    assert [note.date for note in db.iter_notes()].count("2022-03-01") == 1
+
+    before = snapshot()
+    assert db.archive_before("2024-01-01") > 0
+    assert "2022-03-01" not in hot_dates()
+    assert snapshot() == before
+
+
+def test_search_pages_continue_from_planner_db_into_archives():
+    notes = {f"{year}-05-0{day}": f"слово {year} {day}" for year in (2021, 2022, 2024) for day in range(1, 4)}
+    db.save_notes(notes, {})
+    db.archive_before("2024-01-01")
+    pages = [db.search_notes_page("слово", limit=4, offset=offset) for offset in range(0, 12, 4)]
+    assert [len(page) for page in pages] == [4, 4, 1]
+    dates = [hit.date for page in pages for hit in page]
+    assert sorted(dates) == sorted(notes)
+    assert all(hit_date.startswith("2024") for hit_date in dates[:3])
+
+
+def test_archive_config_cutoff():
+    assert archive.ArchiveConfig().cutoff(date(2026, 10, 18)) is None
+    assert archive.ArchiveConfig.from_setting({"keep_years": 2}).cutoff(date(2026, 10, 18)) == "2025-01-01"
@@ -0,0 +1,48 @@
+import sqlite3
+
+from app import backup, db
+
+
+def test_backup_finishes_while_another_connection_keeps_committing(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "BACKUP_PAGES", 1)
+    db.save_notes({f"2024-01-{day:02d}": "заметка " * 200 for day in range(1, 29)}, {})
+    steps = []
+
+    def progress(done, total):
+        steps.append(done)
+        # An autosave from the writer connection restarts a paged copy.
+        db.write_note("2024-02-01", f"правка {len(steps)}")
+
+    target_path = tmp_path / "copy.db"
+    db.backup_database(target_path, progress)
+
+    assert len(steps) < 100
+    copy = sqlite3.connect(target_path)
+    try:
+        assert copy.execute("SELECT COUNT(*) FROM note_entries WHERE date < '2024-02-01'").fetchone()[0] == 28
+        assert copy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        copy.close()
+
+
+def test_backups_taken_in_the_same_second_get_their_own_files(tmp_path):
+    db.write_note("2024-01-01", "заметка")
+    first = backup.create_backup()
+    second = backup.create_backup()
+    assert first != second and first.parent == second.parent
+    restored = tmp_path / "restored.db"
+    backup.restore_backup(second, restored)
+    copy = sqlite3.connect(restored)
+    try:
+        assert copy.execute("SELECT content FROM note_entries").fetchall() == [("заметка",)]
+    finally:
+        copy.close()
+
+
+def test_list_backups_reads_names_with_and_without_microseconds(tmp_path):
+    for name in ("planner_20240101_120000.db.xz", "planner_20240101_120000_250000.db.gz", "other.db"):
+        (tmp_path / name).touch()
+    assert [(moment.isoformat(), path.name) for moment, path in backup.list_backups(tmp_path)] == [
+        ("2024-01-01T12:00:00.250000", "planner_20240101_120000_250000.db.gz"),
+        ("2024-01-01T12:00:00", "planner_20240101_120000.db.xz"),
+    ]
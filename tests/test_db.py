@@ -0,0 +1,51 @@
+import pytest
+
+from app import db
+
+
+def test_carry_over_moves_lines_and_keeps_task_ids():
+    db.write_note("2024-01-01", "план\n- [ ] позвонить\n- [x] готово\n- [ ] написать")
+    db.write_note("2024-01-02", "- [ ] отчёт")
+    db.write_note("2024-01-03", "сегодня\n- [ ] своё")
+    ids = {item.text: item.id for item in db.list_overdue_tasks("2024-01-03")}
+
+    assert db.carry_over_undone("2024-01-03") == 3
+
+    assert db.fetch_note("2024-01-01").content == "план\n- [x] готово\n"
+    assert db.fetch_note("2024-01-02").content == ""
+    assert db.fetch_note("2024-01-03").content == "сегодня\n- [ ] своё\n- [ ] позвонить\n- [ ] написать\n- [ ] отчёт"
+    assert db.list_overdue_tasks("2024-01-03") == []
+    today = db.list_tasks_for_date("2024-01-03")
+    assert [item.text for item in today] == ["своё", "позвонить", "написать", "отчёт"]
+    assert [item.position for item in today] == [0, 1, 2, 3]
+    assert {item.text: item.id for item in today[1:]} == ids
+    assert [(item.text, item.position) for item in db.list_tasks_for_date("2024-01-01")] == [("готово", 0)]
+    # The moved lines parse back to the same rows when the note is saved again.
+    db.write_note("2024-01-03", db.fetch_note("2024-01-03").content)
+    assert [item.id for item in db.list_tasks_for_date("2024-01-03")] == [item.id for item in today]
+
+
+@pytest.mark.parametrize(
+    "query, params, expected",
+    [
+        (db.OPEN_TASKS_SQL, ("2024-01-01", "2024-01-31"), "USING INDEX idx_task_items_status_date"),
+        (db.OVERDUE_TASKS_SQL, ("2024-01-01",), "USING INDEX idx_task_items_status_date"),
+        (db.TASK_STATUS_COUNTS_SQL, ("2024-01-01", "2024-12-31"), "USING COVERING INDEX idx_task_items_date_status"),
+    ],
+    ids=["open", "overdue", "status_counts"],
+)
+def test_task_queries_use_their_indexes(query, params, expected):
+    plan = " | ".join(row["detail"] for row in db.get_manager().read().execute(f"EXPLAIN QUERY PLAN {query}", params))
+    assert expected in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_task_queries_return_open_and_overdue_tasks():
+    db.write_note("2024-01-01", "- [ ] old\n- [x] closed")
+    db.write_note("2024-01-10", "- [ ] current")
+    assert [item.text for item in db.list_overdue_tasks("2024-01-10")] == ["old"]
+    assert [item.text for item in db.list_open_tasks("2024-01-01", "2024-01-31")] == ["old", "current"]
+    assert db.count_tasks_by_status("2024-01-01", "2024-01-31") == {
+        "2024-01-01": {"undone": 1, "done": 1},
+        "2024-01-10": {"undone": 1},
+    }
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from app import db, revisions
+
+
+def record(date, content, now):
+    with db.get_manager().write() as conn:
+        old = conn.execute("SELECT content, updated_at FROM note_entries WHERE date = ?", (date,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO note_entries(date, content, updated_at) VALUES (?, ?, ?)",
+            (date, content, now.isoformat()),
+        )
+        revisions.record_revision(
+            conn, date, old["content"] if old else None, old["updated_at"] if old else None, content, now
+        )
+
+
+def test_revisions_reconstruct_every_version_across_snapshots():
+    start = datetime(2024, 1, 1, 9)
+    texts = [f"строка {i}\n" + "".join(f"- [ ] задача {j}\n" for j in range(i % 5)) for i in range(45)]
+    for step, text in enumerate(texts):
+        record("2024-01-01", text, start + step * (revisions.COALESCE_WINDOW + timedelta(seconds=1)))
+    history = db.list_note_revisions("2024-01-01")
+    assert len(history) == len(texts)
+    assert {revision.kind for revision in history} == {"snapshot", "delta"}
+    assert [db.get_note_revision(revision.id) for revision in reversed(history)] == texts
+
+
+def test_revisions_coalesce_edits_within_the_window():
+    start = datetime(2024, 1, 1, 9)
+    record("2024-01-01", "первая", start)
+    record("2024-01-01", "вторая", start + revisions.COALESCE_WINDOW * 2)
+    record("2024-01-01", "вторая и ещё", start + revisions.COALESCE_WINDOW * 2 + timedelta(minutes=1))
+    record("2024-01-01", "итог", start + revisions.COALESCE_WINDOW * 2 + timedelta(minutes=2))
+    history = db.list_note_revisions("2024-01-01")
+    assert [db.get_note_revision(revision.id) for revision in history] == ["итог", "первая"]
+
+
+def test_restore_note_revision_becomes_current_note():
+    record("2024-01-01", "- [ ] старое", datetime(2024, 1, 1, 9))
+    db.write_note("2024-01-01", "новое")
+    oldest = db.list_note_revisions("2024-01-01")[-1]
+    assert db.restore_note_revision("2024-01-01", oldest.id) == "- [ ] старое"
+    assert db.fetch_note("2024-01-01").content == "- [ ] старое"
+    assert [item.text for item in db.list_tasks_for_date("2024-01-01")] == ["старое"]
+
+
+def test_restore_within_the_window_keeps_the_text_it_replaces():
+    now = datetime.utcnow()
+    record("2024-01-01", "v1", now - timedelta(hours=1))
+    record("2024-01-01", "v3 typed more", now - timedelta(minutes=1))
+    oldest = db.list_note_revisions("2024-01-01")[-1]
+    db.restore_note_revision("2024-01-01", oldest.id)
+    history = db.list_note_revisions("2024-01-01")
+    assert [db.get_note_revision(revision.id) for revision in history] == ["v1", "v3 typed more", "v1"]
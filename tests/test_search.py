@@ -0,0 +1,9 @@
+from app import db
+
+
+def test_search_snippets_mark_matches_with_the_requested_marks():
+    db.write_note("2024-01-01", "обсудить **важный** отчёт")
+    assert [hit.snippet for hit in db.search_notes_page("отчёт")] == ["обсудить **важный** **отчёт**"]
+    assert [hit.snippet for hit in db.search_notes_page("отчёт", marks=("\x02", "\x03"))] == [
+        "обсудить **важный** \x02отчёт\x03"
+    ]
@@ -0,0 +1,34 @@
+import json
+import sqlite3
+
+from app import db
+
+
+def watch(version):
+    """Deliver the change log to the caches, as ChangeWatcher does."""
+    changes = db.changes_since(version)
+    db.invalidate_changed(changes)
+    return changes[-1].version if changes else version
+
+
+def test_every_settings_write_notifies_with_the_watcher_running():
+    received = []
+    db.settings_store.subscribe("pomodoro", received.append)
+    version = db.change_version()
+    for focus in (30, 35, 30):
+        db.set_setting("pomodoro", {"focus": focus})
+        version = watch(version)
+    assert received == [{"focus": 30}, {"focus": 35}, {"focus": 30}]
+
+
+def test_settings_written_by_another_process_notify_listeners():
+    received = []
+    db.settings_store.subscribe("pomodoro", received.append)
+    assert db.get_setting("pomodoro", {}) == {}
+    version = db.change_version()
+    with sqlite3.connect(db.get_db_path()) as conn:
+        conn.execute("INSERT INTO settings(key, value) VALUES ('pomodoro', ?)", (json.dumps({"focus": 40}),))
+    conn.close()
+    watch(version)
+    assert received == [{"focus": 40}]
+    assert db.get_setting("pomodoro", {}) == {"focus": 40}
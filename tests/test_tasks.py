@@ -0,0 +1,34 @@
+from app import db
+
+
+def task(task_id, text, status="undone", position=0):
+    return db.TaskItem(id=task_id, date="2024-01-01", text=text, status=status, position=position)
+
+
+def test_diff_tasks_keeps_ids_of_moved_toggled_and_edited_lines():
+    existing = [task(1, "a", position=0), task(2, "b", position=1), task(3, "c", position=2)]
+    inserts, updates, deletes = db.diff_tasks(existing, [("b", "done"), ("a", "undone"), ("c edited", "undone")])
+    assert inserts == []
+    assert deletes == []
+    assert sorted(updates, key=lambda update: update[3]) == [
+        ("a", "undone", 1, 1),
+        ("b", "done", 0, 2),
+        ("c edited", "undone", 2, 3),
+    ]
+
+
+def test_diff_tasks_inserts_and_deletes_only_what_changed():
+    existing = [task(1, "a", position=0), task(2, "b", position=1)]
+    inserts, updates, deletes = db.diff_tasks(existing, [("a", "undone")])
+    assert (inserts, updates, deletes) == ([], [], [2])
+    inserts, updates, deletes = db.diff_tasks(existing, [("a", "undone"), ("b", "undone"), ("new", "undone")])
+    assert (inserts, updates, deletes) == ([("new", "undone", 2)], [], [])
+
+
+def test_replace_tasks_for_date_keeps_row_ids():
+    db.write_note("2024-01-01", "- [ ] a\n- [ ] b")
+    ids = {item.text: item.id for item in db.list_tasks_for_date("2024-01-01")}
+    db.write_note("2024-01-01", "- [x] b\n- [ ] a\n- [ ] c")
+    items = db.list_tasks_for_date("2024-01-01")
+    assert [(item.text, item.status) for item in items] == [("b", "done"), ("a", "undone"), ("c", "undone")]
+    assert items[0].id == ids["b"] and items[1].id == ids["a"]
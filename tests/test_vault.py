@@ -0,0 +1,19 @@
+import pytest
+
+from app import vault
+
+
+def test_toggle_under_a_hand_edited_heading_keeps_the_task_in_its_file(tmp_path):
+    root = tmp_path / "vault"
+    (root / "weeks").mkdir(parents=True)
+    week_file = root / "weeks" / "2026-W42.md"
+    week_file.write_text("# Week 2026-W42\n\n## 2026-10-15 четверг\n- [ ] позвонить <!--id:task_1-->\n")
+    vault.index_vault(root)
+
+    assert vault.update_vault_task(root, "task_1", done=True) == {str(week_file.resolve())}
+    assert vault.get_vault_task("task_1").done
+    assert "- [x] позвонить <!--id:task_1-->" in vault.render_source(str(week_file.resolve()))
+
+    with pytest.raises(ValueError):
+        vault.update_vault_task(root, "task_1", done=False, due_date="15.10.2026")
+    assert vault.get_vault_task("task_1").done